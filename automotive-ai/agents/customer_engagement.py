@@ -1,15 +1,24 @@
 import json
-import os
 from typing import Dict, List, Any
-from groq import Groq
 from utils.ueba_monitor import UEBAMonitor
-from utils.voice_synthesis import VoiceSynthesizer
+from storage.base import StorageBackend
+from utils.voice_worker import VoiceWorker, get_voice_worker
+from utils.llm_client import get_llm_client
 
 class CustomerEngagementAgent:
-    def __init__(self, ueba_monitor: UEBAMonitor):
+    def __init__(self, ueba_monitor: UEBAMonitor, store: StorageBackend):
         self.ueba = ueba_monitor
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        self.voice_synth = VoiceSynthesizer()
+        self.store = store
+
+    @property
+    def client(self):
+        # Shared with /chat: one keep-alive connection pool per process
+        return get_llm_client()
+
+    @property
+    def voice_worker(self) -> VoiceWorker:
+        # Speech is synthesized in the background and cached by transcript
+        return get_voice_worker()
 
     def start_conversation(self, vehicle_id: str, diagnosis_result: Dict[str, Any]) -> Dict[str, Any]:
         """Start AI-powered customer conversation"""
@@ -19,8 +28,7 @@ class CustomerEngagementAgent:
             return {"error": permission_check["anomaly"]["message"]}
 
         # Load customer data
-        vehicles = self._load_vehicles()
-        vehicle = next((v for v in vehicles if v["id"] == vehicle_id), None)
+        vehicle = self.store.get_vehicle(vehicle_id)
         if not vehicle:
             return {"error": f"Vehicle {vehicle_id} not found"}
 
@@ -34,27 +42,26 @@ class CustomerEngagementAgent:
         # Generate conversation using Groq
         conversation = self._generate_conversation(customer_info, diagnosis_result)
 
-        # Simulate voice synthesis
-        voice_file = f"conversations/{vehicle_id}_conversation.mp3"
-        os.makedirs('conversations', exist_ok=True)
-        self.voice_synth.generate_voice(conversation["transcript"], voice_file)
+        # Queue voice synthesis without waiting for it; GET /voice/{key} reports when the audio is ready
+        try:
+            voice_key = self.voice_worker.submit(conversation.get("transcript"))
+            voice_file, voice = self.voice_worker.path_for(voice_key), self.voice_worker.status(voice_key)
+        except Exception as e:
+            # The conversation stands without its audio
+            print(f"Voice synthesis for {vehicle_id} failed: {e}")
+            voice_file, voice = None, {"key": None, "status": "failed", "audio_url": None, "stream_url": None}
 
         result = {
             "vehicle_id": vehicle_id,
             "customer": customer_info["name"],
             "conversation": conversation,
             "appointment_booked": conversation.get("appointment_booked", False),
-            "voice_file": voice_file
+            "voice_file": voice_file,
+            "voice": voice
         }
 
         return result
 
-    def _load_vehicles(self) -> List[Dict[str, Any]]:
-        if os.path.exists('data/vehicles.json'):
-            with open('data/vehicles.json', 'r') as f:
-                return json.load(f)
-        return []
-
     def _generate_conversation(self, customer_info: Dict[str, Any], diagnosis_result: Dict[str, Any]) -> Dict[str, Any]:
         """Use Groq to generate persuasive customer conversation"""
         risk_score = diagnosis_result.get("risk_score", 0)
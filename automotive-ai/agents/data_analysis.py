@@ -1,22 +1,75 @@
-import json
-import os
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
 from utils.ueba_monitor import UEBAMonitor
+from storage.base import StorageBackend
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Sensor thresholds shared by the per-vehicle and fleet-wide (vectorized) checks
+OIL_PRESSURE_MIN = 30
+ENGINE_TEMP_MAX = 105
+BRAKE_PAD_MIN = 3
+BATTERY_VOLTAGE_MIN = 12.0
+TIRE_PRESSURE_MIN = 28
+TIRE_PRESSURE_MAX = 35
+# Tire columns in the fleet matrix; widened to the most tires any vehicle reports
+TIRE_COUNT = 4
+
+# Values assumed when a sensor reading is missing
+SENSOR_DEFAULTS = {
+    "oil_pressure": 50,
+    "engine_temp": 90,
+    "brake_pad_thickness": 5,
+    "battery_voltage": 12.5
+}
+
+# Named health-score ranges (inclusive) accepted by the /vehicles health_band filter
+HEALTH_BANDS = {
+    "good": (80, 100),
+    "fair": (50, 79),
+    "poor": (0, 49)
+}
+
+SEVERITY_PENALTIES = {
+    "low": 5,
+    "medium": 15,
+    "high": 30,
+    "critical": 50
+}
+
+# Component -> severity for each rule, in the order the rules are evaluated
+COMPONENT_SEVERITY = {
+    "oil_system": "high",
+    "engine_cooling": "critical",
+    "brake_system": "high",
+    "electrical_system": "medium",
+    "tire_system": "medium"
+}
+
+# Column layout of the fleet sensor matrix: these readings, then one column per tire
+SENSOR_COLUMNS = ["oil_pressure", "engine_temp", "brake_pad_thickness", "battery_voltage"]
 
 class DataAnalysisAgent:
-    def __init__(self, ueba_monitor: UEBAMonitor):
+    def __init__(self, ueba_monitor: UEBAMonitor, store: StorageBackend):
         self.ueba = ueba_monitor
+        self.store = store
+        self._fleet_matrix = None  # (repository version, vehicle ids, sensor matrix)
 
     def analyze_vehicle(self, vehicle_id: str) -> Dict[str, Any]:
         """Analyze vehicle sensor data for anomalies"""
-        # Check permissions
+        return self.authorize(vehicle_id) or self.compute_analysis(vehicle_id)
+
+    def authorize(self, vehicle_id: str) -> Optional[Dict[str, Any]]:
+        """UEBA check (and log entry) for reading a vehicle's data; an error result if it is denied"""
         permission_check = self.ueba.verify_action("DataAnalysis", "read_vehicle_data", {"vehicle_id": vehicle_id})
         if not permission_check["allowed"]:
             return {"error": permission_check["anomaly"]["message"]}
+        return None
 
+    def compute_analysis(self, vehicle_id: str) -> Dict[str, Any]:
+        """The analysis itself; callers must have passed authorize() first"""
         # Load vehicle data
-        vehicles = self._load_vehicles()
-        vehicle = next((v for v in vehicles if v["id"] == vehicle_id), None)
+        vehicle = self.store.get_vehicle(vehicle_id)
         if not vehicle:
             return {"error": f"Vehicle {vehicle_id} not found"}
 
@@ -32,18 +85,18 @@ class DataAnalysisAgent:
 
         return analysis_result
 
-    def _load_vehicles(self) -> List[Dict[str, Any]]:
-        if os.path.exists('data/vehicles.json'):
-            with open('data/vehicles.json', 'r') as f:
-                return json.load(f)
-        return []
+    def vehicle_state(self, vehicle: Dict[str, Any]) -> Dict[str, Any]:
+        """Anomalies and health score of a vehicle record, without a UEBA check (used by the fleet change feed)"""
+        sensors = vehicle.get("sensors", {})
+        anomalies = self._detect_anomalies(sensors)
+        return {"anomalies": anomalies, "health_score": self._calculate_health_score(sensors, anomalies)}
 
     def _detect_anomalies(self, sensors: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Rule-based anomaly detection"""
         anomalies = []
 
         # Oil pressure check
-        if sensors.get("oil_pressure", 50) < 30:
+        if sensors.get("oil_pressure", SENSOR_DEFAULTS["oil_pressure"]) < OIL_PRESSURE_MIN:
             anomalies.append({
                 "component": "oil_system",
                 "severity": "high",
@@ -52,7 +105,7 @@ class DataAnalysisAgent:
             })
 
         # Engine temperature check
-        if sensors.get("engine_temp", 90) > 105:
+        if sensors.get("engine_temp", SENSOR_DEFAULTS["engine_temp"]) > ENGINE_TEMP_MAX:
             anomalies.append({
                 "component": "engine_cooling",
                 "severity": "critical",
@@ -61,7 +114,7 @@ class DataAnalysisAgent:
             })
 
         # Brake pad thickness check
-        if sensors.get("brake_pad_thickness", 5) < 3:
+        if sensors.get("brake_pad_thickness", SENSOR_DEFAULTS["brake_pad_thickness"]) < BRAKE_PAD_MIN:
             anomalies.append({
                 "component": "brake_system",
                 "severity": "high",
@@ -70,7 +123,7 @@ class DataAnalysisAgent:
             })
 
         # Battery voltage check
-        if sensors.get("battery_voltage", 12.5) < 12.0:
+        if sensors.get("battery_voltage", SENSOR_DEFAULTS["battery_voltage"]) < BATTERY_VOLTAGE_MIN:
             anomalies.append({
                 "component": "electrical_system",
                 "severity": "medium",
@@ -81,7 +134,7 @@ class DataAnalysisAgent:
         # Tire pressure check
         tire_pressures = sensors.get("tire_pressure", [])
         for i, pressure in enumerate(tire_pressures):
-            if pressure < 28 or pressure > 35:
+            if pressure < TIRE_PRESSURE_MIN or pressure > TIRE_PRESSURE_MAX:
                 anomalies.append({
                     "component": "tire_system",
                     "severity": "medium",
@@ -95,15 +148,88 @@ class DataAnalysisAgent:
         """Calculate overall health score (0-100)"""
         base_score = 100
 
-        severity_penalties = {
-            "low": 5,
-            "medium": 15,
-            "high": 30,
-            "critical": 50
-        }
-
         for anomaly in anomalies:
             severity = anomaly.get("severity", "medium")
-            base_score -= severity_penalties.get(severity, 15)
+            base_score -= SEVERITY_PENALTIES.get(severity, 15)
+
+        return max(0, base_score)
 
-        return max(0, base_score)
\ No newline at end of file
+    def analyze_fleet(self, bins: int = 10) -> Dict[str, Any]:
+        """Vectorized health analysis of the whole fleet in one pass"""
+        # numpy is only imported by the fleet-wide paths, which keeps startup fast
+        import numpy as np
+        permission_check = self.ueba.verify_action("DataAnalysis", "analyze_sensors", {"scope": "fleet"})
+        if not permission_check["allowed"]:
+            return {"error": permission_check["anomaly"]["message"]}
+
+        vehicle_ids, health_scores, anomaly_counts, component_counts = self._score_fleet()
+        hist_counts, bin_edges = np.histogram(health_scores, bins=bins, range=(0, 100))
+
+        return {
+            "vehicle_count": len(vehicle_ids),
+            "average_health_score": round(float(health_scores.mean()), 2) if len(vehicle_ids) else None,
+            "vehicle_ids": vehicle_ids,
+            "health_scores": health_scores.tolist(),
+            "anomaly_counts": anomaly_counts.tolist(),
+            "vehicles_with_anomalies": component_counts,
+            "health_histogram": {
+                "bin_edges": bin_edges.tolist(),
+                "counts": hist_counts.tolist()
+            }
+        }
+
+    def fleet_health_scores(self):
+        """(vehicle_ids, health_scores) for the whole fleet, without a UEBA check (used for indexing)"""
+        vehicle_ids, health_scores, _, _ = self._score_fleet()
+        return vehicle_ids, health_scores
+
+    def _score_fleet(self):
+        import numpy as np
+        vehicle_ids, matrix = self._get_fleet_matrix()
+        masks = self._fleet_anomaly_masks(matrix)
+
+        penalties = np.zeros(len(vehicle_ids), dtype=np.int64)
+        anomaly_counts = np.zeros(len(vehicle_ids), dtype=np.int64)
+        component_counts = {}
+        for component, mask in masks.items():
+            # Tires have one column per wheel and each out-of-range tire is its own anomaly
+            per_vehicle = mask.sum(axis=1) if mask.ndim == 2 else mask.astype(np.int64)
+            penalties += per_vehicle * SEVERITY_PENALTIES[COMPONENT_SEVERITY[component]]
+            anomaly_counts += per_vehicle
+            component_counts[component] = int((per_vehicle > 0).sum())
+
+        return vehicle_ids, np.maximum(0, 100 - penalties), anomaly_counts, component_counts
+
+    def _get_fleet_matrix(self):
+        """Columnar float matrix of all sensor readings, rebuilt only when the vehicle data changes"""
+        import numpy as np
+        version, vehicles = self.store.vehicles_snapshot()
+        if self._fleet_matrix is not None and self._fleet_matrix[0] == version:
+            return self._fleet_matrix[1], self._fleet_matrix[2]
+
+        # Every tire counts, as in _detect_anomalies; vehicles with fewer are padded with NaN
+        tire_count = max([TIRE_COUNT] + [len(v.get("sensors", {}).get("tire_pressure", [])) for v in vehicles])
+        first_tire = len(SENSOR_COLUMNS)
+        matrix = np.full((len(vehicles), first_tire + tire_count), np.nan)
+        for row, vehicle in enumerate(vehicles):
+            sensors = vehicle.get("sensors", {})
+            for col, name in enumerate(SENSOR_COLUMNS):
+                matrix[row, col] = sensors.get(name, SENSOR_DEFAULTS[name])
+            tires = sensors.get("tire_pressure", [])
+            matrix[row, first_tire:first_tire + len(tires)] = tires
+
+        vehicle_ids = [v["id"] for v in vehicles]
+        self._fleet_matrix = (version, vehicle_ids, matrix)
+        return vehicle_ids, matrix
+
+    def _fleet_anomaly_masks(self, matrix: "np.ndarray") -> Dict[str, "np.ndarray"]:
+        """Same rules as _detect_anomalies, applied as whole-column masks"""
+        tires = matrix[:, len(SENSOR_COLUMNS):]
+        # NaN (missing tire) compares False on both sides, matching the per-vehicle loop
+        return {
+            "oil_system": matrix[:, 0] < OIL_PRESSURE_MIN,
+            "engine_cooling": matrix[:, 1] > ENGINE_TEMP_MAX,
+            "brake_system": matrix[:, 2] < BRAKE_PAD_MIN,
+            "electrical_system": matrix[:, 3] < BATTERY_VOLTAGE_MIN,
+            "tire_system": (tires < TIRE_PRESSURE_MIN) | (tires > TIRE_PRESSURE_MAX)
+        }
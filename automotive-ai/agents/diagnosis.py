@@ -1,33 +1,33 @@
-import json
-import os
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from utils.ueba_monitor import UEBAMonitor
+from storage.base import StorageBackend
 
 class DiagnosisAgent:
-    def __init__(self, ueba_monitor: UEBAMonitor):
+    def __init__(self, ueba_monitor: UEBAMonitor, store: StorageBackend):
         self.ueba = ueba_monitor
+        self.store = store
 
     def diagnose_issues(self, vehicle_id: str, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
         """Diagnose potential failures and calculate risk scores"""
-        # Check permissions
+        return self.authorize(vehicle_id) or self.compute_diagnosis(vehicle_id, analysis_result)
+
+    def authorize(self, vehicle_id: str) -> Optional[Dict[str, Any]]:
+        """UEBA check (and log entry) for predicting a vehicle's failures; an error result if it is denied"""
         permission_check = self.ueba.verify_action("Diagnosis", "predict_failures", {"vehicle_id": vehicle_id})
         if not permission_check["allowed"]:
             return {"error": permission_check["anomaly"]["message"]}
+        return None
 
+    def compute_diagnosis(self, vehicle_id: str, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+        """The diagnosis itself; callers must have passed authorize() first"""
         # Load vehicle data
-        vehicles = self._load_vehicles()
-        vehicle = next((v for v in vehicles if v["id"] == vehicle_id), None)
+        vehicle = self.store.get_vehicle(vehicle_id)
         if not vehicle:
             return {"error": f"Vehicle {vehicle_id} not found"}
 
         anomalies = analysis_result.get("anomalies", [])
         sensors = analysis_result.get("sensors", {})
-        vehicle_info = {
-            "mileage": vehicle.get("mileage", 0),
-            "last_service_km": vehicle.get("last_service_km", 0),
-            "model": vehicle.get("model", ""),
-            "year": vehicle.get("year", 2020)
-        }
+        vehicle_info = self._vehicle_info(vehicle)
 
         risk_score = self._calculate_risk_score(anomalies, sensors, vehicle_info)
         predictions = self._predict_failures(anomalies, vehicle_info)
@@ -42,11 +42,21 @@ class DiagnosisAgent:
 
         return diagnosis_result
 
-    def _load_vehicles(self) -> List[Dict[str, Any]]:
-        if os.path.exists('data/vehicles.json'):
-            with open('data/vehicles.json', 'r') as f:
-                return json.load(f)
-        return []
+    def risk_score_for(self, vehicle: Dict[str, Any], anomalies: List[Dict[str, Any]]) -> int:
+        """Risk score from already-detected anomalies, without a UEBA check (used by fleet-wide paths)"""
+        return self._calculate_risk_score(anomalies, vehicle.get("sensors", {}), self._vehicle_info(vehicle))
+
+    def risk_level_for(self, vehicle: Dict[str, Any], anomalies: List[Dict[str, Any]]) -> str:
+        """Risk level from already-detected anomalies, without a UEBA check (used by the fleet change feed)"""
+        return self._get_risk_level(self.risk_score_for(vehicle, anomalies))
+
+    def _vehicle_info(self, vehicle: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "mileage": vehicle.get("mileage", 0),
+            "last_service_km": vehicle.get("last_service_km", 0),
+            "model": vehicle.get("model", ""),
+            "year": vehicle.get("year", 2020)
+        }
 
     def _calculate_risk_score(self, anomalies: List[Dict[str, Any]], sensors: Dict[str, Any], vehicle_info: Dict[str, Any]) -> int:
         """Calculate risk score 0-100 based on various factors"""
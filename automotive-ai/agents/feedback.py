@@ -1,11 +1,11 @@
-import json
-import os
 from typing import Dict, List, Any
 from utils.ueba_monitor import UEBAMonitor
+from storage.base import StorageBackend
 
 class FeedbackAgent:
-    def __init__(self, ueba_monitor: UEBAMonitor):
+    def __init__(self, ueba_monitor: UEBAMonitor, store: StorageBackend):
         self.ueba = ueba_monitor
+        self.store = store
 
     def collect_feedback(self, vehicle_id: str) -> Dict[str, Any]:
         """Collect post-service customer feedback"""
@@ -15,8 +15,7 @@ class FeedbackAgent:
             return {"error": permission_check["anomaly"]["message"]}
 
         # Load vehicle data
-        vehicles = self._load_vehicles()
-        vehicle = next((v for v in vehicles if v["id"] == vehicle_id), None)
+        vehicle = self.store.get_vehicle(vehicle_id)
         if not vehicle:
             return {"error": f"Vehicle {vehicle_id} not found"}
 
@@ -34,12 +33,6 @@ class FeedbackAgent:
 
         return result
 
-    def _load_vehicles(self) -> List[Dict[str, Any]]:
-        if os.path.exists('data/vehicles.json'):
-            with open('data/vehicles.json', 'r') as f:
-                return json.load(f)
-        return []
-
     def _generate_mock_feedback(self, vehicle: Dict[str, Any]) -> Dict[str, Any]:
         """Generate realistic mock feedback"""
         # Base feedback
@@ -1,12 +1,12 @@
-import json
-import os
 from collections import defaultdict, Counter
 from typing import Dict, List, Any
 from utils.ueba_monitor import UEBAMonitor
+from storage.base import StorageBackend
 
 class ManufacturingInsightsAgent:
-    def __init__(self, ueba_monitor: UEBAMonitor):
+    def __init__(self, ueba_monitor: UEBAMonitor, store: StorageBackend):
         self.ueba = ueba_monitor
+        self.store = store
 
     def analyze_patterns(self) -> Dict[str, Any]:
         """Analyze maintenance data for manufacturing insights - returns RCA/CAPA data"""
@@ -47,11 +47,8 @@ class ManufacturingInsightsAgent:
         return insights
 
     def _load_rca_capa_data(self) -> Dict[str, Any]:
-        """Load RCA/CAPA data from file"""
-        if os.path.exists('data/rca_capa_data.json'):
-            with open('data/rca_capa_data.json', 'r') as f:
-                return json.load(f)
-        return {}
+        """Load RCA/CAPA data from the store"""
+        return self.store.get_rca_capa_data()
 
     def _calculate_component_failures(self, rca_data: Dict[str, Any]) -> Dict[str, int]:
         """Calculate component failures from defects"""
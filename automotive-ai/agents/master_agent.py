@@ -1,25 +1,182 @@
 from agents.data_analysis import DataAnalysisAgent
 from agents.diagnosis import DiagnosisAgent
 from agents.customer_engagement import CustomerEngagementAgent
-from agents.scheduling import SchedulingAgent
+from agents.scheduling import SchedulingAgent, SERVICE_RISK_SCORE
 from agents.feedback import FeedbackAgent
 from agents.manufacturing_insights import ManufacturingInsightsAgent
-from utils.ueba_monitor import UEBAMonitor
-import json
+from utils.ueba_monitor import FleetScope, UEBAMonitor
+from storage import create_storage
+from utils.result_cache import LRUCache
+from utils.job_queue import JobQueue
+from utils.change_feed import FleetChangeFeed
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import cached_property
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Iterator, Optional, Tuple
 import os
+import threading
+import time
+
+if TYPE_CHECKING:
+    from utils.knowledge_index import MaintenanceKnowledgeIndex
+    from utils.vehicle_index import VehicleIndex
+
+# Workflow steps in the order they run; used to report progress
+WORKFLOW_STEPS = ["analysis", "diagnosis", "engagement", "scheduling", "feedback", "manufacturing_insights"]
+# The UEBA-checked actions of those steps, authorized once for a whole fleet run
+WORKFLOW_ACTIONS = [("DataAnalysis", "read_vehicle_data"), ("Diagnosis", "predict_failures"),
+                    ("CustomerEngagement", "initiate_conversation"), ("Scheduling", "book_appointments"),
+                    ("Feedback", "collect_feedback"), ("ManufacturingInsights", "analyze_patterns")]
 
 class MasterAgent:
     def __init__(self):
-        self.ueba = UEBAMonitor()
-        self.data_agent = DataAnalysisAgent(self.ueba)
-        self.diagnosis_agent = DiagnosisAgent(self.ueba)
-        self.engagement_agent = CustomerEngagementAgent(self.ueba)
-        self.scheduling_agent = SchedulingAgent(self.ueba)
-        self.feedback_agent = FeedbackAgent(self.ueba)
-        self.manufacturing_agent = ManufacturingInsightsAgent(self.ueba)
-
-    def orchestrate_maintenance_workflow(self, vehicle_id: str) -> dict:
-        """Main orchestration workflow: analyze → diagnose → engage → schedule → feedback"""
+        # Single data-access layer (JSON files or SQLite) shared by every agent
+        self.store = create_storage()
+        self.ueba = UEBAMonitor(self.store)
+        # Worker agents are created on first use (see the properties below)
+        # Analysis/diagnosis results per vehicle, tagged with the vehicle record version
+        self.results_cache = LRUCache(
+            max_entries=int(os.getenv("RESULT_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+        )
+        # Persistent background queue for workflow runs; its worker count caps in-flight LLM/TTS work
+        self.jobs = JobQueue(
+            db_path=os.getenv("JOB_QUEUE_PATH", "data/jobs.db"),
+            workers=int(os.getenv("JOB_WORKERS", "2"))
+        )
+        self.jobs.register("orchestrate", self._run_orchestrate_job)
+        self.jobs.start()
+        self._vehicle_index = None
+        self._vehicle_index_lock = threading.Lock()
+        # Health/risk/anomaly deltas for GET /fleet/events; the feed thread starts with the first subscriber
+        self.fleet_feed = FleetChangeFeed(
+            self.store, self.fleet_event_state,
+            poll_interval=float(os.getenv("FLEET_EVENTS_POLL_SECONDS", "2")),
+            buffer_size=int(os.getenv("FLEET_EVENTS_BUFFER", "1000"))
+        )
+
+    @cached_property
+    def data_agent(self) -> DataAnalysisAgent:
+        return DataAnalysisAgent(self.ueba, self.store)
+
+    @cached_property
+    def diagnosis_agent(self) -> DiagnosisAgent:
+        return DiagnosisAgent(self.ueba, self.store)
+
+    @cached_property
+    def engagement_agent(self) -> CustomerEngagementAgent:
+        return CustomerEngagementAgent(self.ueba, self.store)
+
+    @cached_property
+    def scheduling_agent(self) -> SchedulingAgent:
+        return SchedulingAgent(self.ueba, self.store)
+
+    @cached_property
+    def feedback_agent(self) -> FeedbackAgent:
+        return FeedbackAgent(self.ueba, self.store)
+
+    @cached_property
+    def manufacturing_agent(self) -> ManufacturingInsightsAgent:
+        return ManufacturingInsightsAgent(self.ueba, self.store)
+
+    @cached_property
+    def knowledge_index(self) -> "MaintenanceKnowledgeIndex":
+        """BM25 retrieval over maintenance history and RCA defects; call ensure_fresh() before searching"""
+        from utils.knowledge_index import MaintenanceKnowledgeIndex  # pulls in numpy
+        return MaintenanceKnowledgeIndex(self.store)
+
+    def fleet_event_state(self, vehicle: Dict[str, Any]) -> Dict[str, Any]:
+        """The per-vehicle state tracked by the fleet change feed"""
+        state = self.data_agent.vehicle_state(vehicle)
+        return {
+            "health_score": state["health_score"],
+            "risk_level": self.diagnosis_agent.risk_level_for(vehicle, state["anomalies"]),
+            "anomalies": sorted({anomaly["component"] for anomaly in state["anomalies"]})
+        }
+
+    def vehicle_index(self) -> "VehicleIndex":
+        """Filter/pagination index over the current vehicle data, rebuilt when the data changes"""
+        version = self.store.vehicles_version()
+        index = self._vehicle_index
+        if index is not None and index.version == version:
+            return index
+        from utils.vehicle_index import VehicleIndex  # pulls in numpy; only needed once /vehicles is hit
+        with self._vehicle_index_lock:
+            if self._vehicle_index is None or self._vehicle_index.version != self.store.vehicles_version():
+                version, vehicles = self.store.vehicles_snapshot()
+                vehicle_ids, health_scores = self.data_agent.fleet_health_scores()
+                self._vehicle_index = VehicleIndex(version, vehicles, dict(zip(vehicle_ids, health_scores.tolist())))
+            return self._vehicle_index
+
+    def get_analysis(self, vehicle_id: str) -> Dict[str, Any]:
+        """Sensor analysis for a vehicle, computed once per record version.
+
+        Every call is checked and logged by UEBA; only the computation is
+        cached. Cached results are shared between callers and must not be mutated.
+        """
+        return self.data_agent.authorize(vehicle_id) or self._compute_analysis(vehicle_id)
+
+    def _compute_analysis(self, vehicle_id: str) -> Dict[str, Any]:
+        version = self.store.vehicle_version(vehicle_id)
+        entry = self._cached_results(vehicle_id, version)
+        if entry:
+            return entry["analysis"]
+
+        analysis = self.data_agent.compute_analysis(vehicle_id)
+        if "error" not in analysis and version is not None:
+            self.results_cache.set(vehicle_id, {"version": version, "analysis": analysis, "diagnosis": None})
+        return analysis
+
+    def get_diagnosis(self, vehicle_id: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """(analysis, diagnosis) for a vehicle; diagnosis is None when the analysis failed"""
+        analysis = self.get_analysis(vehicle_id)
+        if "error" in analysis:
+            return analysis, None
+        denied = self.diagnosis_agent.authorize(vehicle_id)
+        if denied:
+            return analysis, denied
+        return self._compute_diagnosis(vehicle_id, analysis)
+
+    def authorize_diagnosis(self, vehicle_id: str) -> Optional[Dict[str, Any]]:
+        """UEBA checks of both steps behind get_diagnosis(); the first denial, or None"""
+        return self.data_agent.authorize(vehicle_id) or self.diagnosis_agent.authorize(vehicle_id)
+
+    def compute_diagnosis(self, vehicle_id: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """get_diagnosis() without the UEBA checks; callers must have passed authorize_diagnosis() first"""
+        analysis = self._compute_analysis(vehicle_id)
+        if "error" in analysis:
+            return analysis, None
+        return self._compute_diagnosis(vehicle_id, analysis)
+
+    def _compute_diagnosis(self, vehicle_id: str,
+                           analysis: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        version = self.store.vehicle_version(vehicle_id)
+        entry = self._cached_results(vehicle_id, version)
+        if entry and entry["diagnosis"] is not None:
+            return entry["analysis"], entry["diagnosis"]
+
+        diagnosis = self.diagnosis_agent.compute_diagnosis(vehicle_id, analysis)
+        if "error" not in diagnosis and entry:
+            self.results_cache.set(vehicle_id, {"version": version, "analysis": analysis, "diagnosis": diagnosis})
+        return analysis, diagnosis
+
+    def _cached_results(self, vehicle_id: str, version: Optional[int]) -> Optional[Dict[str, Any]]:
+        entry = self.results_cache.get(vehicle_id)
+        if entry is None:
+            return None
+        if entry["version"] != version:
+            # The vehicle record changed since these results were computed
+            self.results_cache.delete(vehicle_id)
+            return None
+        return entry
+
+    def orchestrate_maintenance_workflow(self, vehicle_id: str,
+                                         on_step: Callable[[str, int], None] = None) -> dict:
+        """Main orchestration workflow: analyze → diagnose → engage → schedule → feedback
+
+        on_step(step, progress) is called after each step with a 0-100 progress estimate.
+        """
         workflow_result = {
             "vehicle_id": vehicle_id,
             "steps": [],
@@ -27,57 +184,42 @@ class MasterAgent:
             "final_outcome": None
         }
 
-        try:
-            # Step 1: Data Analysis
-            analysis_result = self.data_agent.analyze_vehicle(vehicle_id)
+        def record(step: str, result: Dict[str, Any]):
             workflow_result["steps"].append({
-                "step": "analysis",
-                "result": analysis_result,
+                "step": step,
+                "result": result,
                 "status": "completed"
             })
+            if on_step:
+                on_step(step, round((WORKFLOW_STEPS.index(step) + 1) * 100 / len(WORKFLOW_STEPS)))
 
-            # Step 2: Diagnosis
-            diagnosis_result = self.diagnosis_agent.diagnose_issues(vehicle_id, analysis_result)
-            workflow_result["steps"].append({
-                "step": "diagnosis",
-                "result": diagnosis_result,
-                "status": "completed"
-            })
+        try:
+            # Steps 1 and 2: Data Analysis and Diagnosis (one UEBA check each)
+            analysis_result, diagnosis_result = self.get_diagnosis(vehicle_id)
+            record("analysis", analysis_result)
+
+            if diagnosis_result is None:
+                diagnosis_result = self.diagnosis_agent.diagnose_issues(vehicle_id, analysis_result)
+            record("diagnosis", diagnosis_result)
 
             # Only proceed if issues detected
             if diagnosis_result.get("risk_score", 0) > 20:  # Threshold for intervention
                 # Step 3: Customer Engagement
                 engagement_result = self.engagement_agent.start_conversation(vehicle_id, diagnosis_result)
-                workflow_result["steps"].append({
-                    "step": "engagement",
-                    "result": engagement_result,
-                    "status": "completed"
-                })
+                record("engagement", engagement_result)
 
                 # Step 4: Scheduling (if customer agrees)
                 if engagement_result.get("appointment_booked", False):
                     schedule_result = self.scheduling_agent.book_appointment(vehicle_id, diagnosis_result)
-                    workflow_result["steps"].append({
-                        "step": "scheduling",
-                        "result": schedule_result,
-                        "status": "completed"
-                    })
+                    record("scheduling", schedule_result)
 
                     # Step 5: Feedback (post-service)
                     feedback_result = self.feedback_agent.collect_feedback(vehicle_id)
-                    workflow_result["steps"].append({
-                        "step": "feedback",
-                        "result": feedback_result,
-                        "status": "completed"
-                    })
+                    record("feedback", feedback_result)
 
                     # Step 6: Manufacturing Insights
                     insights_result = self.manufacturing_agent.analyze_patterns()
-                    workflow_result["steps"].append({
-                        "step": "manufacturing_insights",
-                        "result": insights_result,
-                        "status": "completed"
-                    })
+                    record("manufacturing_insights", insights_result)
 
                     workflow_result["final_outcome"] = "maintenance_scheduled"
                 else:
@@ -93,15 +235,171 @@ class MasterAgent:
 
         return workflow_result
 
+    def submit_workflow(self, vehicle_id: str) -> Dict[str, Any]:
+        """Queue a background workflow run for a vehicle"""
+        if self.store.get_vehicle(vehicle_id) is None:
+            return {"error": "Vehicle not found"}
+        job_id = self.jobs.submit("orchestrate", {"vehicle_id": vehicle_id}, subject=vehicle_id)
+        return {"job_id": job_id, "status": "queued"}
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    def _run_orchestrate_job(self, payload: Dict[str, Any], report: Callable[[str, int], None]) -> dict:
+        result = self.orchestrate_maintenance_workflow(payload["vehicle_id"], on_step=report)
+        if result["status"] == "failed":
+            raise RuntimeError(result.get("error", "Workflow failed"))
+        return result
+
+    def select_vehicles(self, vehicle_ids: List[str] = None, location: str = None, model: str = None,
+                        preferred_service_center: str = None, max_health_score: int = None,
+                        limit: int = None) -> List[str]:
+        """Ids of vehicles matching every given filter, in store order"""
+        wanted = set(vehicle_ids) if vehicle_ids else None
+        selected = []
+        for vehicle in self.store.list_vehicles():
+            if wanted is not None and vehicle["id"] not in wanted:
+                continue
+            if location and vehicle.get("location") != location:
+                continue
+            if model and vehicle.get("model") != model:
+                continue
+            if preferred_service_center and vehicle.get("preferred_service_center") != preferred_service_center:
+                continue
+            selected.append(vehicle["id"])
+
+        if max_health_score is not None and selected:
+            # One vectorized pass over the fleet instead of analyzing every vehicle separately
+            fleet = self.data_agent.analyze_fleet()
+            if "error" in fleet:
+                raise PermissionError(fleet["error"])
+            scores = dict(zip(fleet["vehicle_ids"], fleet["health_scores"]))
+            selected = [vid for vid in selected if scores.get(vid, 100) <= max_health_score]
+
+        return selected[:limit] if limit else selected
+
+    def authorize_fleet(self, vehicle_ids: List[str]) -> FleetScope:
+        """One UEBA check per workflow action for a fleet run; raises PermissionError if one is denied"""
+        return self.ueba.authorize_fleet(WORKFLOW_ACTIONS, len(vehicle_ids))
+
+    def orchestrate_fleet(self, vehicle_ids: List[str], workers: int = None, include_steps: bool = False,
+                          scope: FleetScope = None) -> Iterator[Dict[str, Any]]:
+        """Run the maintenance workflow over many vehicles on a bounded thread pool.
+
+        Yields one outcome per vehicle as soon as it finishes (completion order),
+        then a final {"summary": ...} record with throughput and failure counts.
+        The run is authorized once (scope, from authorize_fleet() if not given),
+        so its per-vehicle checks do not trip the UEBA frequency rule.
+        """
+        scope = scope or self.authorize_fleet(vehicle_ids)
+        workers = max(1, workers or int(os.getenv("FLEET_WORKERS", "8")))
+        started = time.perf_counter()
+        outcomes = Counter()
+        failed = 0
+        completed = 0
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fleet-worker") as pool:
+            pending = set()
+            queue = iter(vehicle_ids)
+            # Keep at most 2 * workers vehicles in flight so memory stays flat for large fleets
+            for vehicle_id in islice(queue, workers * 2):
+                pending.add(pool.submit(scope.run, self._orchestrate_one, vehicle_id, include_steps))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outcome = future.result()
+                    completed += 1
+                    if outcome["status"] != "completed":
+                        failed += 1
+                    outcomes[outcome.get("final_outcome") or outcome["status"]] += 1
+                    yield outcome
+                for vehicle_id in islice(queue, len(done)):
+                    pending.add(pool.submit(scope.run, self._orchestrate_one, vehicle_id, include_steps))
+
+        elapsed = time.perf_counter() - started
+        yield {
+            "summary": {
+                "vehicles": completed,
+                "succeeded": completed - failed,
+                "failed": failed,
+                "outcomes": dict(outcomes),
+                "workers": workers,
+                "elapsed_seconds": round(elapsed, 3),
+                "throughput_per_second": round(completed / elapsed, 2) if elapsed > 0 else None
+            }
+        }
+
+    def schedule_fleet(self, vehicle_ids: List[str], min_risk_score: int = None, idempotency_key: str = None,
+                       dry_run: bool = False) -> Dict[str, Any]:
+        """Book every selected vehicle whose risk score is at least min_risk_score, in one solve"""
+        min_risk_score = SERVICE_RISK_SCORE if min_risk_score is None else min_risk_score
+        wanted = set(vehicle_ids)
+        candidates = []
+        for vehicle in self.store.list_vehicles():
+            if vehicle["id"] not in wanted:
+                continue
+            # Same rules as the per-vehicle diagnosis, without a UEBA check per vehicle
+            anomalies = self.data_agent.vehicle_state(vehicle)["anomalies"]
+            risk_score = self.diagnosis_agent.risk_score_for(vehicle, anomalies)
+            if risk_score >= min_risk_score:
+                candidates.append({"vehicle_id": vehicle["id"], "risk_score": risk_score,
+                                   "preferred_center": vehicle.get("preferred_service_center"),
+                                   "location": vehicle.get("location")})
+        return self.scheduling_agent.schedule_fleet(candidates, idempotency_key, dry_run)
+
+    def _orchestrate_one(self, vehicle_id: str, include_steps: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            result = self.orchestrate_maintenance_workflow(vehicle_id)
+        except Exception as e:
+            result = {"vehicle_id": vehicle_id, "status": "failed", "error": str(e), "steps": []}
+
+        diagnosis = next((step["result"] for step in result["steps"] if step["step"] == "diagnosis"), {})
+        # A step that returned an error (e.g. blocked by UEBA) counts as a failed vehicle
+        step_error = next((step["result"]["error"] for step in result["steps"] if "error" in step["result"]), None)
+        error = result.get("error") or step_error
+        outcome = {
+            "vehicle_id": vehicle_id,
+            "status": "failed" if error else result["status"],
+            "final_outcome": None if error else result.get("final_outcome"),
+            "risk_score": diagnosis.get("risk_score"),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        if error:
+            outcome["error"] = error
+        if include_steps:
+            outcome["steps"] = result["steps"]
+        return outcome
+
     def get_workflow_status(self, vehicle_id: str) -> dict:
-        """Get current status of workflow for a vehicle"""
-        # In a real system, this would check a database
-        # For demo, return mock status
+        """Get current status of workflow for a vehicle (its most recent background job)"""
+        job = self.jobs.latest_for_subject(vehicle_id)
+        if job is None:
+            return {
+                "vehicle_id": vehicle_id,
+                "status": "not_started",
+                "current_step": None,
+                "progress": 0,
+                "next_action": "analysis"
+            }
+
+        current_step = job["current_step"]
+        next_action = None
+        if job["status"] == "queued":
+            next_action = "analysis"
+        elif job["status"] == "running":
+            position = WORKFLOW_STEPS.index(current_step) + 1 if current_step else 0
+            next_action = WORKFLOW_STEPS[position] if position < len(WORKFLOW_STEPS) else None
         return {
             "vehicle_id": vehicle_id,
-            "current_step": "analysis",
-            "progress": 20,
-            "next_action": "diagnosis"
+            "job_id": job["id"],
+            "status": job["status"],
+            "current_step": current_step,
+            "progress": job["progress"],
+            "next_action": next_action,
+            "final_outcome": (job["result"] or {}).get("final_outcome"),
+            "error": job["error"]
         }
 
     def get_agent_status(self) -> dict:
@@ -1,36 +1,67 @@
-import json
-import os
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from utils.ueba_monitor import UEBAMonitor
+from storage.base import StorageBackend, parse_slot_epoch
+from utils.fleet_planner import FleetPlanner, PREFERRED_CENTER, center_match
+from utils.slot_index import SlotIndex
+
+# Times to re-pick a slot when the chosen one was reserved concurrently
+MAX_BOOKING_ATTEMPTS = 5
+
+# Locks serializing requests that share an idempotency key (picked by hash of the key)
+KEY_LOCK_STRIPES = 64
+
+# Days within which a vehicle should be serviced, by urgency
+URGENCY_WINDOW_DAYS = {"urgent": 1, "high": 3, "normal": 7}
+
+# Risk score from which a vehicle needs service ("medium" risk and above)
+SERVICE_RISK_SCORE = 20
+
+def urgency_for(risk_score: int) -> str:
+    return "urgent" if risk_score > 70 else "high" if risk_score > 40 else "normal"
 
 class SchedulingAgent:
-    def __init__(self, ueba_monitor: UEBAMonitor):
+    def __init__(self, ueba_monitor: UEBAMonitor, store: StorageBackend):
         self.ueba = ueba_monitor
-
-    def book_appointment(self, vehicle_id: str, diagnosis_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Book service appointment based on diagnosis and availability"""
+        self.store = store
+        # Each center's free slots, parsed once and sorted for bisect lookups
+        self.slots = SlotIndex(store)
+        self._key_locks = [threading.Lock() for _ in range(KEY_LOCK_STRIPES)]
+
+    def book_appointment(self, vehicle_id: str, diagnosis_result: Dict[str, Any],
+                         idempotency_key: str = None) -> Dict[str, Any]:
+        """Book service appointment based on diagnosis and availability.
+
+        A retried request with the same idempotency_key gets the booking made
+        the first time instead of a second one.
+        """
         # Check permissions
         permission_check = self.ueba.verify_action("Scheduling", "book_appointments", {"vehicle_id": vehicle_id})
         if not permission_check["allowed"]:
             return {"error": permission_check["anomaly"]["message"]}
 
-        # Load service centers
-        centers = self._load_service_centers()
+        # Load service centers (names and capacity; their slots are in the slot index)
+        centers = self.slots.centers()
         if not centers:
             return {"error": "No service centers available"}
 
         # Determine urgency
-        risk_score = diagnosis_result.get("risk_score", 0)
-        urgency = "urgent" if risk_score > 70 else "high" if risk_score > 40 else "normal"
+        urgency = urgency_for(diagnosis_result.get("risk_score", 0))
 
-        # Find best slot
-        booking = self._find_optimal_slot(vehicle_id, centers, urgency)
+        # A retry of a request that already booked gets that booking back. Retries in this process
+        # wait for the original, so it cannot be holding a claimed slot that is not booked yet.
+        with self._key_lock(idempotency_key):
+            booking = self._booking_for_key(idempotency_key, centers) if idempotency_key else None
+            if booking is None:
+                booking = self._reserve_optimal_slot(vehicle_id, centers, urgency, idempotency_key)
+        if booking and booking.pop("vehicle_id", vehicle_id) != vehicle_id:
+            return {"error": "Idempotency key was already used to book another vehicle"}
 
         if booking:
-            # Update availability (in real system, save to database)
-            self._update_availability(centers, booking)
-
             result = {
                 "vehicle_id": vehicle_id,
                 "appointment_booked": True,
@@ -44,7 +75,7 @@ class SchedulingAgent:
                 "vehicle_id": vehicle_id,
                 "appointment_booked": False,
                 "reason": "No available slots",
-                "next_available": self._get_next_available(centers),
+                "next_available": self._get_next_available(),
                 "urgency_level": urgency
             }
 
@@ -52,47 +83,170 @@ class SchedulingAgent:
 
     def get_available_slots(self, center_id: str = None, days_ahead: int = 7) -> Dict[str, Any]:
         """Get available service slots"""
-        centers = self._load_service_centers()
+        limit = days_ahead * 8  # 8 slots per day
 
         if center_id:
-            center = centers.get(center_id)
-            if center:
-                available = [slot for slot in center.get("available_slots", []) if self._is_future_slot(slot)]
-                return {center_id: available[:days_ahead*8]}  # 8 slots per day
+            calendar = self.slots.calendar(center_id)
+            if calendar is not None:
+                return {center_id: calendar.find(datetime.now().timestamp(), limit=limit)}
             else:
                 return {"error": f"Center {center_id} not found"}
 
         # All centers
-        result = {}
-        for cid, center in centers.items():
-            available = [slot for slot in center.get("available_slots", []) if self._is_future_slot(slot)]
-            result[cid] = available[:days_ahead*8]
+        return self.slots.upcoming(limit)
+
+    def schedule_fleet(self, vehicles: List[Dict[str, Any]], idempotency_key: str = None,
+                       dry_run: bool = False) -> Dict[str, Any]:
+        """Assign many vehicles to slots in one solve (see FleetPlanner) and book them.
+
+        vehicles are {vehicle_id, risk_score, preferred_center, location}.
+        With an idempotency_key each vehicle is booked under
+        "<key>:<vehicle_id>", so a retried batch gets back the bookings it
+        already made. dry_run only returns the plan.
+        """
+        permission_check = self.ueba.verify_action("Scheduling", "book_appointments",
+                                                   {"scope": "fleet", "vehicles": len(vehicles)})
+        if not permission_check["allowed"]:
+            return {"error": permission_check["anomaly"]["message"]}
 
-        return result
+        centers = self.slots.centers()
+        if not centers:
+            return {"error": "No service centers available"}
 
-    def _load_service_centers(self) -> Dict[str, Any]:
-        if os.path.exists('data/service_centers.json'):
-            with open('data/service_centers.json', 'r') as f:
-                return json.load(f)
-        return {}
+        started = time.perf_counter()
+        now = time.time()
+        keys = {v["vehicle_id"]: f"{idempotency_key}:{v['vehicle_id']}" for v in vehicles} if idempotency_key else {}
+        pending, replayed = [], []
+        for vehicle in vehicles:
+            urgency = urgency_for(vehicle["risk_score"])
+            record = self.store.get_booking(keys[vehicle["vehicle_id"]]) if keys else None
+            if record is None:
+                pending.append({**vehicle, "urgency_level": urgency,
+                                "deadline": now + URGENCY_WINDOW_DAYS[urgency] * 86400})
+            else:
+                # Booked by an earlier run of this batch; its deadline ran from then
+                booked_at = datetime.fromisoformat(record["created_at"]).timestamp()
+                vehicle = {**vehicle, "urgency_level": urgency,
+                           "deadline": booked_at + URGENCY_WINDOW_DAYS[urgency] * 86400}
+                replayed.append(self._planned(vehicle, record["center_id"], record["slot"], centers))
+
+        planned, unassigned = FleetPlanner(centers, self.slots.free_slots(now), self.slots.booked_per_day()).plan(pending)
+        solve_ms = (time.perf_counter() - started) * 1000
+        rebooked = 0
+        if not dry_run:
+            planned, retry = self._book_plan(planned, centers, keys)
+            for _ in range(MAX_BOOKING_ATTEMPTS):
+                if not retry:
+                    break
+                # Other requests or workers booked some planned slots: plan those vehicles again on fresh data
+                self.slots.refresh()
+                replanned, full = FleetPlanner(centers, self.slots.free_slots(time.time()),
+                                               self.slots.booked_per_day()).plan(retry)
+                unassigned += full
+                booked, retry = self._book_plan(replanned, centers, keys)
+                planned += booked
+                rebooked += len(booked)
+            unassigned += retry
+
+        assignments = [self._fleet_assignment(a, centers) for a in replayed + planned]
+        by_urgency = {}
+        for a in assignments:
+            counts = by_urgency.setdefault(a["urgency_level"], Counter(vehicles=0, within_deadline=0))
+            counts["vehicles"] += 1
+            counts["within_deadline"] += a["within_deadline"]
+        return {
+            "dry_run": dry_run,
+            "assignments": assignments,
+            "unassigned": [{"vehicle_id": v["vehicle_id"], "risk_score": v["risk_score"],
+                            "urgency_level": v["urgency_level"], "reason": "No available slots"} for v in unassigned],
+            "summary": {
+                "vehicles": len(vehicles),
+                "assigned": len(assignments),
+                "unassigned": len(unassigned),
+                "within_deadline": sum(a["within_deadline"] for a in assignments),
+                "at_preferred_center": sum(a["center_match"] == PREFERRED_CENTER for a in assignments),
+                "already_booked": len(replayed),
+                "rebooked": rebooked,
+                "by_urgency": {u: dict(c) for u, c in by_urgency.items()},
+                "solve_ms": round(solve_ms, 1),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        }
+
+    def _book_plan(self, planned: List[Dict[str, Any]], centers: Dict[str, Any],
+                   keys: Dict[str, str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Reserve the planned slots in one batch: (booked, vehicles whose slot was taken since the plan)"""
+        taken = [self.slots.take(a["center_id"], a["slot"]) for a in planned]
+        claimed = [a for a, ok in zip(planned, taken) if ok]
+        reserved = self.store.reserve_slots(
+            [(a["center_id"], a["slot"], a["vehicle_id"], keys.get(a["vehicle_id"])) for a in claimed]
+        ) if claimed else []
+
+        booked, retry = [], [a for a, ok in zip(planned, taken) if not ok]
+        for a, ok in zip(claimed, reserved):
+            if ok:
+                self.slots.booked(a["center_id"], a["slot"])
+                booked.append(a)
+                continue
+            record = self.store.get_booking(keys[a["vehicle_id"]]) if a["vehicle_id"] in keys else None
+            if record is None:
+                retry.append(a)  # someone else booked the slot; it stays out of the index
+            else:
+                # A concurrent run of the same batch booked this vehicle; the planned slot is still free
+                self.slots.release(a["center_id"], a["slot"])
+                booked.append(self._planned(a, record["center_id"], record["slot"], centers))
+        return booked, retry
+
+    def _planned(self, vehicle: Dict[str, Any], center_id: str, slot: str, centers: Dict[str, Any]) -> Dict[str, Any]:
+        """A FleetPlanner-style assignment of vehicle to a slot chosen elsewhere"""
+        epoch = parse_slot_epoch(slot)
+        return {**vehicle, "center_id": center_id, "slot": slot, "slot_epoch": epoch,
+                "center_match": center_match(center_id, vehicle.get("preferred_center"), vehicle.get("location"), centers),
+                "within_deadline": epoch <= vehicle["deadline"]}
+
+    def _fleet_assignment(self, planned: Dict[str, Any], centers: Dict[str, Any]) -> Dict[str, Any]:
+        booking = self._slot_details(planned["slot"])
+        booking["center_id"] = planned["center_id"]
+        booking["center_name"] = centers.get(planned["center_id"], {}).get("name", planned["center_id"])
+        return {
+            "vehicle_id": planned["vehicle_id"],
+            "risk_score": planned["risk_score"],
+            "urgency_level": planned["urgency_level"],
+            "booking_details": booking,
+            "center_match": planned["center_match"],
+            "within_deadline": planned["within_deadline"]
+        }
+
+    def _reserve_optimal_slot(self, vehicle_id: str, centers: Dict[str, Any], urgency: str,
+                              idempotency_key: str = None) -> Dict[str, Any]:
+        """Find the best slot and reserve it; None if nothing is free"""
+        # If another request (or worker process) took the slot in the meantime,
+        # look again since it is no longer listed
+        for _ in range(MAX_BOOKING_ATTEMPTS):
+            booking = self._find_optimal_slot(vehicle_id, centers, urgency)
+            if booking is None:
+                break
+            if self._update_availability(vehicle_id, booking, idempotency_key):
+                return booking
+            # ... unless a concurrent request with the same key has just booked
+            if idempotency_key:
+                booking = self._booking_for_key(idempotency_key, centers)
+                if booking is not None:
+                    return booking
+        # Nothing left (or no luck): a concurrent request with the same key may have taken the last slot
+        return self._booking_for_key(idempotency_key, centers) if idempotency_key else None
 
     def _find_optimal_slot(self, vehicle_id: str, centers: Dict[str, Any], urgency: str) -> Dict[str, Any]:
         """Find the best available slot based on urgency and location"""
         # Load vehicle for preferred center
-        vehicles = self._load_vehicles()
-        vehicle = next((v for v in vehicles if v["id"] == vehicle_id), None)
+        vehicle = self.store.get_vehicle(vehicle_id)
         preferred_center = vehicle.get("preferred_service_center", "Center_A") if vehicle else "Center_A"
 
         # Priority order based on urgency
-        if urgency == "urgent":
-            time_window = 1  # Next day
-        elif urgency == "high":
-            time_window = 3  # Next 3 days
-        else:
-            time_window = 7  # Next week
+        time_window = URGENCY_WINDOW_DAYS[urgency]
 
         # Check preferred center first
-        booking = self._find_slot_in_center(centers.get(preferred_center), time_window)
+        booking = self._find_slot_in_center(preferred_center, time_window)
         if booking:
             booking["center_id"] = preferred_center
             booking["center_name"] = centers[preferred_center]["name"]
@@ -101,7 +255,7 @@ class SchedulingAgent:
         # Check other centers
         for cid, center in centers.items():
             if cid != preferred_center:
-                booking = self._find_slot_in_center(center, time_window)
+                booking = self._find_slot_in_center(cid, time_window)
                 if booking:
                     booking["center_id"] = cid
                     booking["center_name"] = center["name"]
@@ -109,40 +263,53 @@ class SchedulingAgent:
 
         return None
 
-    def _find_slot_in_center(self, center: Dict[str, Any], days_ahead: int) -> Dict[str, Any]:
+    def _find_slot_in_center(self, center_id: str, days_ahead: int) -> Dict[str, Any]:
         """Find first available slot in center within days_ahead"""
-        if not center:
-            return None
-
-        available_slots = center.get("available_slots", [])
-        cutoff_date = datetime.now() + timedelta(days=days_ahead)
-
-        for slot in available_slots:
-            slot_datetime = datetime.fromisoformat(slot.replace('Z', '+00:00'))
-            if slot_datetime > datetime.now() and slot_datetime < cutoff_date:
-                return {
-                    "date_time": slot,
-                    "duration": "2 hours",  # Standard service time
-                    "technician": f"Technician_{slot_datetime.hour % 3 + 1}"  # Mock assignment
-                }
+        now = datetime.now()
+        cutoff_date = now + timedelta(days=days_ahead)
 
-        return None
+        # Claimed: no other request in this process is offered the slot while we reserve it
+        slot = self.slots.claim(center_id, now.timestamp(), cutoff_date.timestamp())
+        if slot is None:
+            return None
 
-    def _update_availability(self, centers: Dict[str, Any], booking: Dict[str, Any]):
-        """Remove booked slot from availability (mock)"""
-        center_id = booking.get("center_id")
-        slot = booking.get("date_time")
-        if center_id in centers and slot in centers[center_id].get("available_slots", []):
-            centers[center_id]["available_slots"].remove(slot)
-            # In real system, save back to file/database
-
-    def _is_future_slot(self, slot: str) -> bool:
-        """Check if slot is in the future"""
-        try:
-            slot_datetime = datetime.fromisoformat(slot.replace('Z', '+00:00'))
-            return slot_datetime > datetime.now()
-        except:
-            return False
+        return self._slot_details(slot)
+
+    def _slot_details(self, slot: str) -> Dict[str, Any]:
+        slot_datetime = datetime.fromisoformat(slot.replace('Z', '+00:00'))
+        return {
+            "date_time": slot,
+            "duration": "2 hours",  # Standard service time
+            "technician": f"Technician_{slot_datetime.hour % 3 + 1}"  # Mock assignment
+        }
+
+    def _key_lock(self, idempotency_key: str = None):
+        if not idempotency_key:
+            return nullcontext()
+        return self._key_locks[hash(idempotency_key) % KEY_LOCK_STRIPES]
+
+    def _booking_for_key(self, idempotency_key: str, centers: Dict[str, Any]) -> Dict[str, Any]:
+        """booking_details (plus the booked vehicle_id) of the booking made with idempotency_key, or None"""
+        record = self.store.get_booking(idempotency_key)
+        if record is None:
+            return None
+        booking = self._slot_details(record["slot"])
+        booking["center_id"] = record["center_id"]
+        booking["center_name"] = centers.get(record["center_id"], {}).get("name", record["center_id"])
+        booking["vehicle_id"] = record["vehicle_id"]
+        return booking
+
+    def _update_availability(self, vehicle_id: str, booking: Dict[str, Any], idempotency_key: str = None) -> bool:
+        """Remove booked slot from availability through the storage backend"""
+        center_id, slot = booking.get("center_id"), booking.get("date_time")
+        reserved = self.store.reserve_slot(center_id, slot, vehicle_id, idempotency_key)
+        if reserved:
+            self.slots.booked(center_id, slot)
+        elif idempotency_key and self.store.get_booking(idempotency_key):
+            # Refused because the key already booked another slot; this one is still free
+            self.slots.release(center_id, slot)
+        # Otherwise someone else booked it first, and it stays out of the index
+        return reserved
 
     def _estimate_cost(self, diagnosis_result: Dict[str, Any]) -> str:
         """Estimate service cost based on diagnosis"""
@@ -182,18 +349,7 @@ class SchedulingAgent:
 
         return parts
 
-    def _get_next_available(self, centers: Dict[str, Any]) -> Dict[str, Any]:
+    def _get_next_available(self) -> Dict[str, Any]:
         """Get next available slots across all centers"""
-        next_slots = {}
-        for cid, center in centers.items():
-            available = [slot for slot in center.get("available_slots", []) if self._is_future_slot(slot)]
-            if available:
-                next_slots[cid] = sorted(available)[:3]  # Next 3 slots
-
-        return next_slots
-
-    def _load_vehicles(self) -> List[Dict[str, Any]]:
-        if os.path.exists('data/vehicles.json'):
-            with open('data/vehicles.json', 'r') as f:
-                return json.load(f)
-        return []
\ No newline at end of file
+        # Next 3 slots of each center that has any
+        return {cid: slots for cid, slots in self.slots.upcoming(3).items() if slots}
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""Booking contention benchmark: concurrent /schedule bookings, checked for double bookings.
+
+Builds a temporary data directory with --centers centers of hourly slots over
+--days days. --threads threads then book --requests appointments through
+SchedulingAgent.book_appointment, all competing for the earliest slots. Every
+request is sent twice with the same idempotency key, as a client retrying
+after a timeout would. The run then checks the stored bookings:
+- no (center, slot) pair is booked twice;
+- each key holds exactly one booking;
+- both copies of a request got the same slot.
+It runs against the JSON backend (booking ledger) and the SQLite backend.
+
+Usage (from automotive-ai/):
+    python benchmarks/booking_bench.py [--requests 1000] [--threads 200] [--centers 20] [--days 30]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("UEBA_RATE_LIMIT", "100000000")  # the benchmark is one very busy agent
+
+from agents.scheduling import SchedulingAgent
+from storage.importer import import_json
+from storage.json_store import JSONStorage
+from storage.sqlite_store import SQLiteStorage
+from utils.ueba_monitor import UEBAMonitor
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+def build_data(directory: str, centers: int, days: int):
+    for name in ("vehicles.json", "maintenance_history.json", "rca_capa_data.json"):
+        shutil.copy(os.path.join(DATA_DIR, name), directory)
+    start = (datetime.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    slots = [(start + timedelta(days=d, hours=h)).isoformat() for d in range(days) for h in range(9, 18)]
+    data = {f"Center_{chr(ord('A') + i)}" if i < 26 else f"Center_{i}":
+            {"name": f"AutoCare {i}", "location": "Mumbai", "capacity": 20, "available_slots": slots}
+            for i in range(centers)}
+    with open(os.path.join(directory, "service_centers.json"), "w") as f:
+        json.dump(data, f)
+
+def stored_bookings(backend: str, directory: str):
+    """[(center_id, slot, idempotency_key)] exactly as persisted"""
+    if backend == "json":
+        with open(os.path.join(directory, "bookings.jsonl")) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return [(r["center_id"], r["slot"], r["idempotency_key"]) for r in records]
+    conn = sqlite3.connect(os.path.join(directory, "bench.db"))
+    return list(conn.execute("SELECT center_id, slot_time, idempotency_key FROM bookings"))
+
+def run(backend: str, args) -> dict:
+    directory = tempfile.mkdtemp(prefix=f"booking-bench-{backend}-")
+    try:
+        build_data(directory, args.centers, args.days)
+        if backend == "json":
+            store = JSONStorage(directory)
+        else:
+            import_json(directory, os.path.join(directory, "bench.db"))
+            store = SQLiteStorage(os.path.join(directory, "bench.db"))
+        agent = SchedulingAgent(UEBAMonitor(store), store)
+        vehicle_ids = [v["id"] for v in store.list_vehicles()]
+        rng = random.Random(args.seed)
+        requests = [(f"req-{i}", rng.choice(vehicle_ids)) for i in range(args.requests)] * 2
+        rng.shuffle(requests)
+        latencies, results = [], {}
+
+        def one(request):
+            key, vehicle_id = request
+            begin = time.perf_counter()
+            result = agent.book_appointment(vehicle_id, {"risk_score": 10}, idempotency_key=key)
+            latencies.append((time.perf_counter() - begin) * 1000)
+            slot = result.get("booking_details", {})
+            results.setdefault(key, []).append((slot.get("center_id"), slot.get("date_time")))
+
+        agent.slots.centers()  # build the slot index before timing
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(one, requests))
+        elapsed = time.perf_counter() - start
+
+        rows = stored_bookings(backend, directory)
+        latencies.sort()
+        return {
+            "throughput": len(requests) / elapsed,
+            "p50": statistics.median(latencies),
+            "p95": latencies[int(len(latencies) * 0.95) - 1],
+            "booked": len(rows),
+            "double_booked": sum(n - 1 for n in Counter((c, s) for c, s, _ in rows).values() if n > 1),
+            "duplicate_keys": sum(n - 1 for n in Counter(k for _, _, k in rows).values() if n > 1),
+            "replay_mismatches": sum(1 for got in results.values() if len(set(got)) != 1),
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--centers", type=int, default=20)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{args.requests} bookings, each sent twice with one idempotency key, {args.threads} threads, "
+          f"{args.centers} centers x {args.days * 9} slots")
+    for backend in ("json", "sqlite"):
+        r = run(backend, args)
+        print(f"{backend:<7} {r['throughput']:7.0f} req/s  p50={r['p50']:7.1f} ms  p95={r['p95']:7.1f} ms  "
+              f"booked={r['booked']}  double-booked={r['double_booked']}  duplicate keys={r['duplicate_keys']}  "
+              f"replay mismatches={r['replay_mismatches']}")
+
+if __name__ == "__main__":
+    main_cli()
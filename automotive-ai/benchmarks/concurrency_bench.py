@@ -0,0 +1,91 @@
+"""Concurrency benchmark: /vehicles latency while slow /chat calls are in flight.
+
+Starts the API in-process with uvicorn, using the local stand-in LLM
+(LLM_BACKEND=local) with --llm-latency seconds per reply and the response
+cache off (so no network or API key is needed, and every /chat call waits
+on the model), then measures /vehicles latency on its own and again while
+--chat-clients /chat requests are running.
+
+Usage (from automotive-ai/):
+    python benchmarks/concurrency_bench.py [--chat-clients 16] [--llm-latency 2.0]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import httpx
+import uvicorn
+
+import main
+
+def start_server(port: int) -> uvicorn.Server:
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+async def measure_vehicles(client: httpx.AsyncClient, requests: int) -> list:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get("/vehicles")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def summarize(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<32} p50={statistics.median(latencies):7.2f} ms  p95={p95:7.2f} ms  max={latencies[-1]:7.2f} ms")
+
+async def run(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await client.get("/vehicles")  # warm up
+        idle = await measure_vehicles(client, args.requests)
+
+        chat_start = time.perf_counter()
+        chats = [
+            asyncio.create_task(client.post("/chat", json={"message": "How is my car?", "history": []}))
+            for _ in range(args.chat_clients)
+        ]
+        await asyncio.sleep(0.1)  # let the chat requests reach the LLM call
+        busy = await measure_vehicles(client, args.requests)
+        await asyncio.gather(*chats)
+        chat_elapsed = time.perf_counter() - chat_start
+
+    print(f"{args.chat_clients} concurrent /chat calls, simulated LLM latency {args.llm_latency}s, "
+          f"AGENT_POOL_SIZE={os.getenv('AGENT_POOL_SIZE', '8')}")
+    summarize("/vehicles (idle)", idle)
+    summarize("/vehicles (during /chat load)", busy)
+    print(f"/chat batch finished in {chat_elapsed:.2f} s")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chat-clients", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # Read when the LLM client is first built, i.e. on the first /chat call
+    os.environ.update(LLM_BACKEND="local", LOCAL_LLM_LATENCY_SECONDS=str(args.llm_latency),
+                      LOCAL_LLM_TOKENS_PER_SECOND="0", LLM_CACHE_SIZE="0")
+    server = start_server(args.port)
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.should_exit = True
+
+if __name__ == "__main__":
+    main_cli()
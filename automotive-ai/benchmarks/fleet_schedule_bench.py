@@ -0,0 +1,163 @@
+"""Fleet scheduling benchmark: one-by-one bookings vs one POST /fleet/schedule solve.
+
+Builds a temporary data directory with --vehicles synthetic vehicles spread
+over 8 cities and --centers centers (6-9 hourly slots a day over --days
+days, starting today). Every vehicle whose risk score makes it need service
+is then booked twice, each time on fresh data:
+- one by one, in fleet order, through SchedulingAgent.book_appointment,
+  as a loop over POST /vehicles/{id}/schedule would;
+- in one solve, through MasterAgent.schedule_fleet (POST /fleet/schedule).
+For each it reports the bookings made, how many meet the urgency deadline
+(urgent: 1 day, high: 3, normal: 7), overall and for urgent vehicles, the
+share at the preferred center and the wall time. One by one, a vehicle
+with no slot by its deadline is not booked. The solve alone is also timed with dry_run on a
+fleet of --large-vehicles.
+
+Usage (from automotive-ai/):
+    python benchmarks/fleet_schedule_bench.py [--vehicles 20000] [--centers 200] [--days 14] [--large-vehicles 50000]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("UEBA_RATE_LIMIT", "100000000")  # the benchmark is one very busy agent
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from agents.master_agent import MasterAgent
+from agents.scheduling import URGENCY_WINDOW_DAYS, urgency_for
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+CITIES = ["Mumbai", "Delhi", "Pune", "Chennai", "Bengaluru", "Hyderabad", "Kolkata", "Jaipur"]
+
+def build_data(directory: str, vehicles: int, centers: int, days: int, seed: int):
+    rng = random.Random(seed)
+    for name in ("maintenance_history.json", "rca_capa_data.json"):
+        shutil.copy(os.path.join(DATA_DIR, name), directory)
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    center_ids = [f"Center_{i:04d}" for i in range(centers)]
+    data = {}
+    for i, cid in enumerate(center_ids):
+        # As in generate_data.py: hourly slots from 9:00, capacity of them a day
+        capacity = rng.randint(6, 9)
+        data[cid] = {"name": f"AutoCare {CITIES[i % len(CITIES)]} {i}", "location": CITIES[i % len(CITIES)],
+                     "capacity": capacity,
+                     "available_slots": [(today + timedelta(days=d, hours=9 + h)).isoformat()
+                                         for d in range(days) for h in range(capacity)]}
+    with open(os.path.join(directory, "service_centers.json"), "w") as f:
+        json.dump(data, f)
+
+    fleet = []
+    for i in range(vehicles):
+        mileage = rng.randint(5000, 120000)
+        center = rng.choice(center_ids)
+        fleet.append({
+            "id": f"VEH{i:06d}",
+            "model": rng.choice(["Maruti Swift", "Hyundai Creta", "Tata Nexon", "Mahindra Scorpio S11"]),
+            "year": rng.randint(2016, 2025),
+            "mileage": mileage,
+            "last_service_km": max(0, mileage - int(rng.expovariate(1 / 5000))),
+            "sensors": {
+                "oil_pressure": 25 if rng.random() < 0.05 else 45,
+                "engine_temp": 110 if rng.random() < 0.03 else 92,
+                "brake_pad_thickness": 2.5 if rng.random() < 0.08 else 6,
+                "battery_voltage": 11.8 if rng.random() < 0.1 else 12.6,
+                "tire_pressure": [26 if rng.random() < 0.03 else 32 for _ in range(4)]
+            },
+            # Most owners use a center in their own city
+            "location": data[center]["location"] if rng.random() < 0.9 else rng.choice(CITIES),
+            "preferred_service_center": center
+        })
+    with open(os.path.join(directory, "vehicles.json"), "w") as f:
+        json.dump(fleet, f)
+
+@contextlib.contextmanager
+def master_on(directory: str):
+    os.environ.update(DATA_DIR=directory, STORAGE_BACKEND="json", BOOKING_LEDGER_FSYNC="never",
+                      JOB_QUEUE_PATH=os.path.join(directory, "jobs.db"))
+    master = MasterAgent()
+    try:
+        # The UEBA monitor prints every action it logs
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield master
+    finally:
+        master.jobs.stop()
+
+def report(name: str, assignments: list, elapsed: float):
+    urgent = [a for a in assignments if a["urgency_level"] == "urgent"]
+    print(f"{name:<12} booked={len(assignments):6d}  on time={sum(a['within_deadline'] for a in assignments):6d}  "
+          f"urgent on time={sum(a['within_deadline'] for a in urgent):5d}  "
+          f"at preferred center={sum(a['at_preferred'] for a in assignments) / max(1, len(assignments)):6.1%}  "
+          f"{elapsed:7.2f} s")
+
+def one_by_one(directory: str) -> tuple:
+    with master_on(directory) as master:
+        started = time.perf_counter()
+        now = time.time()
+        assignments = []
+        for vehicle in master.store.list_vehicles():
+            anomalies = master.data_agent.vehicle_state(vehicle)["anomalies"]
+            risk_score = master.diagnosis_agent.risk_score_for(vehicle, anomalies)
+            if risk_score < 20:
+                continue
+            result = master.scheduling_agent.book_appointment(vehicle["id"], {"risk_score": risk_score})
+            if not result.get("appointment_booked"):
+                continue
+            urgency = urgency_for(risk_score)
+            booking = result["booking_details"]
+            deadline = now + URGENCY_WINDOW_DAYS[urgency] * 86400
+            assignments.append({"urgency_level": urgency,
+                                "within_deadline": datetime.fromisoformat(booking["date_time"]).timestamp() <= deadline,
+                                "at_preferred": booking["center_id"] == vehicle["preferred_service_center"]})
+        return assignments, time.perf_counter() - started
+
+def batch(directory: str, dry_run: bool = False) -> tuple:
+    with master_on(directory) as master:
+        started = time.perf_counter()
+        result = master.schedule_fleet(master.select_vehicles(), dry_run=dry_run)
+        elapsed = time.perf_counter() - started
+    assignments = [{**a, "at_preferred": a["center_match"] == "preferred"} for a in result["assignments"]]
+    return assignments, elapsed, result["summary"]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=20000)
+    parser.add_argument("--centers", type=int, default=200)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--large-vehicles", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = {}
+    for name, runner in (("one by one", one_by_one), ("fleet solve", batch)):
+        directory = tempfile.mkdtemp(prefix="fleet-schedule-bench-")
+        try:
+            build_data(directory, args.vehicles, args.centers, args.days, args.seed)
+            results[name] = runner(directory)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    print(f"{args.vehicles} vehicles ({results['fleet solve'][2]['vehicles']} need service), "
+          f"{args.centers} centers x {args.days} days")
+    for name, (assignments, elapsed, *_) in results.items():
+        report(name, assignments, elapsed)
+
+    directory = tempfile.mkdtemp(prefix="fleet-schedule-bench-")
+    try:
+        build_data(directory, args.large_vehicles, args.centers, args.days, args.seed)
+        _, elapsed, summary = batch(directory, dry_run=True)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print(f"dry run, {args.large_vehicles} vehicles ({summary['vehicles']} need service): "
+          f"solve {summary['solve_ms']:.0f} ms, request {elapsed:.2f} s")
+
+if __name__ == "__main__":
+    main_cli()
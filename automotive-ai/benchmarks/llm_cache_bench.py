@@ -0,0 +1,85 @@
+"""LLM cache benchmark: /chat throughput with and without the response cache, fully offline.
+
+Uses the local stand-in LLM (LLM_BACKEND=local) with --llm-latency seconds
+per reply and sends --requests chat requests from --threads threads. The
+requests are drawn from --vehicles x --questions distinct prompts, so most
+of them repeat an earlier prompt, as happens when a dashboard asks about
+the same vehicles over and over.
+
+Usage (from automotive-ai/):
+    python benchmarks/llm_cache_bench.py [--requests 400] [--threads 8] [--llm-latency 0.3]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import main
+from utils import llm_client
+
+QUESTIONS = [
+    "How is my car?",
+    "What are the predicted issues?",
+    "Should I book a service?",
+    "How much will the repair cost?",
+    "Explain battery health",
+]
+
+def run(requests, threads: int, cache_size: int) -> dict:
+    os.environ["LLM_CACHE_SIZE"] = str(cache_size)
+    llm_client._shared_client = None  # rebuilt with this cache setting on the next call
+    latencies = []
+
+    def one(request):
+        start = time.perf_counter()
+        main._chat_with_ai(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, requests))
+    elapsed = time.perf_counter() - start
+    backend = llm_client._shared_gateway.backend
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "throughput": len(requests) / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "llm_calls": backend.calls,
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--vehicles", type=int, default=10)
+    parser.add_argument("--questions", type=int, default=len(QUESTIONS))
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.update(LLM_BACKEND="local", LOCAL_LLM_LATENCY_SECONDS=str(args.llm_latency),
+                      LOCAL_LLM_TOKENS_PER_SECOND="0", LLM_CACHE_PATH="")
+    vehicle_ids = [v["id"] for v in main.master_agent.store.list_vehicles()[:args.vehicles]]
+    questions = QUESTIONS[:args.questions]
+    rng = random.Random(args.seed)
+    requests = [main.ChatRequest(message=rng.choice(questions), vehicle_id=rng.choice(vehicle_ids))
+                for _ in range(args.requests)]
+    main._chat_with_ai(requests[0])  # warm the chat context and diagnosis caches
+
+    print(f"{args.requests} /chat requests, {len(vehicle_ids) * len(questions)} distinct prompts, "
+          f"{args.threads} threads, simulated LLM latency {args.llm_latency}s")
+    for label, cache_size in (("cache off", 0), ("cache on", 1024)):
+        r = run(requests, args.threads, cache_size)
+        print(f"{label:<10} {r['throughput']:8.1f} req/s  p50={r['p50']:7.1f} ms  p95={r['p95']:7.1f} ms  "
+              f"LLM calls={r['llm_calls']}")
+
+if __name__ == "__main__":
+    main_cli()
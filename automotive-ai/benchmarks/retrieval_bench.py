@@ -0,0 +1,78 @@
+"""Retrieval benchmark: /chat snippet search latency as maintenance history grows.
+
+Builds the BM25 index used for chat grounding over synthetic maintenance
+records (drawn from the same components, models and centers as the sample
+data) at each --sizes, then reports the index build rate, the latency of
+appending --append records incrementally, and the latency of top-5 searches.
+
+Usage (from automotive-ai/):
+    python benchmarks/retrieval_bench.py [--sizes 10000 100000 1000000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.knowledge_index import _history_snippet, _history_text
+from utils.text_index import BM25Index
+
+COMPONENTS = ["Brake Pads", "Oil Change", "Battery Replacement", "Transmission Service", "Engine Tune-up",
+              "Coolant Flush", "Tire Rotation", "Air Filter", "Spark Plugs", "Suspension Check"]
+MODELS = ["Maruti Swift", "Hyundai Creta", "Tata Nexon", "Mahindra Scorpio", "Honda City", "Kia Seltos",
+          "Toyota Fortuner", "Volkswagen Polo"]
+QUESTIONS = ["Any known brake issues?", "When was the oil last changed?", "Is the battery failing?",
+             "How much did transmission work cost?", "Coolant problems on the Creta?"]
+
+def synthetic_records(count: int, rng: random.Random, start: int = 0):
+    for i in range(start, start + count):
+        yield {
+            "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "vehicle_id": f"VEH{i % 50000:05d}",
+            "component": rng.choice(COMPONENTS),
+            "cost": rng.randint(500, 25000),
+            "service_center": f"Center_{rng.choice('ABCDEFGH')}",
+            "model": rng.choice(MODELS),
+            "failure_type": rng.choice(["Preventive", "Corrective"]),
+        }
+
+def documents(records, start: int):
+    return ((("history", start + i), _history_text(r), _history_snippet(r)) for i, r in enumerate(records))
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--append", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'records':>10} {'build':>12} {'append x' + str(args.append):>14} {'search p50':>11} {'search p95':>11}")
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        index = BM25Index()
+        start = time.perf_counter()
+        index.add_many(documents(synthetic_records(size, rng), 0))
+        index.merge()
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index.add_many(documents(synthetic_records(args.append, rng, size), size))
+        append_ms = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for i in range(args.queries):
+            query = f"{rng.choice(QUESTIONS)} VEH{rng.randrange(50000):05d} {rng.choice(MODELS)}"
+            start = time.perf_counter()
+            index.search(query, 5)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"{size:>10} {size / build:>8.0f} /s {append_ms:>11.1f} ms "
+              f"{statistics.median(latencies):>8.2f} ms {p95:>8.2f} ms")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,106 @@
+"""Startup benchmark: how long a fresh process takes to import main.py and build the app.
+
+Runs each measurement in a new interpreter (nothing warm in sys.modules) and
+reports the median wall time of `import main`, which includes constructing
+MasterAgent. It also parses a `python -X importtime` trace to list the
+slowest imports, and times the heavy modules that are now deferred to first use.
+
+Usage (from automotive-ai/):
+    python benchmarks/startup_bench.py [--runs 7] [--top 15] [--report benchmarks/startup_report.md]
+"""
+import argparse
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use rather than at startup
+DEFERRED_MODULES = ["groq", "edge_tts", "numpy"]
+
+TIMED_IMPORT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [m for m in {deferred!r} if m in sys.modules]
+print(f"{{elapsed}}|{{','.join(loaded)}}")
+"""
+
+def run_python(code: str, extra_args=()) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=APP_DIR)
+    env.setdefault("GROQ_API_KEY", "benchmark")
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", code],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+def time_import(module: str, runs: int):
+    timings, loaded = [], ""
+    for _ in range(runs):
+        output = run_python(TIMED_IMPORT.format(module=module, deferred=DEFERRED_MODULES)).stdout
+        # The app may print log lines; the timing is the last line
+        elapsed, loaded = output.strip().splitlines()[-1].split("|")
+        timings.append(float(elapsed))
+    return timings, [m for m in loaded.split(",") if m]
+
+def slowest_imports(top: int):
+    """Parse `-X importtime` (stderr) into (cumulative_us, self_us, module), slowest first"""
+    trace = run_python("import main", extra_args=("-X", "importtime")).stderr
+    rows = []
+    for line in trace.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--report", help="write a Markdown report to this path")
+    args = parser.parse_args()
+
+    startup, loaded = time_import("main", args.runs)
+    deferred = {module: statistics.median(time_import(module, args.runs)[0]) for module in DEFERRED_MODULES}
+
+    lines = [
+        "# Startup benchmark",
+        "",
+        f"Python {platform.python_version()} on {platform.system()} {platform.machine()}, "
+        f"median of {args.runs} fresh processes.",
+        "",
+        "| Measurement | Median | Min | Max |",
+        "|-------------|--------|-----|-----|",
+        f"| `import main` (app + MasterAgent) | {statistics.median(startup) * 1000:.0f} ms "
+        f"| {min(startup) * 1000:.0f} ms | {max(startup) * 1000:.0f} ms |",
+        "",
+        "Deferred modules loaded at startup: " + (", ".join(loaded) if loaded else "none"),
+        "",
+        "## Deferred imports (cost moved off startup)",
+        "",
+        "| Module | Import time on its own |",
+        "|--------|------------------------|",
+    ]
+    lines += [f"| `{module}` | {seconds * 1000:.0f} ms |" for module, seconds in deferred.items()]
+    lines += [
+        "",
+        f"## Slowest imports at startup (`python -X importtime`, top {args.top})",
+        "",
+        "| Cumulative | Self | Module |",
+        "|------------|------|--------|",
+    ]
+    lines += [f"| {cum / 1000:.1f} ms | {own / 1000:.1f} ms | `{module.strip()}` |"
+              for cum, own, module in slowest_imports(args.top)]
+    report = "\n".join(lines) + "\n"
+
+    print(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(report)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,75 @@
+"""Voice benchmark: time to first audio and to the full conversation, fully offline.
+
+Uses the local stand-in synthesizer (VOICE_BACKEND=local) with --tts-latency
+seconds per call. Synthesizes --conversations engagement transcripts for
+different customers, first one sentence at a time (--concurrency 1, close
+to speaking the whole transcript as one blob), then with --concurrency
+parallel sentences. Each transcript opens with its own greeting; the
+rest repeats across conversations, so the report separates the first
+(cold) conversation from later (warm) ones, and counts how many sentences
+actually had to be synthesized.
+
+Usage (from automotive-ai/):
+    python benchmarks/voice_bench.py [--conversations 20] [--concurrency 4] [--tts-latency 0.3]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.local_tts import LocalSynthesizer
+from utils.voice_worker import VoiceWorker, split_phrases, split_turns
+
+NAMES = ["Rajesh Kumar", "Priya Sharma", "Amit Patel", "Sneha Reddy", "Vikram Singh", "Ananya Iyer"]
+MODELS = ["Maruti Swift", "Hyundai Creta", "Tata Nexon", "Mahindra Scorpio", "Honda City", "Kia Seltos"]
+
+def transcript(i: int) -> str:
+    return (f"Agent Maya: Hello {NAMES[i % len(NAMES)]}, this is Maya from AutoCare. "
+            f"Our monitoring shows your {MODELS[i % len(MODELS)]} VEH{i:03d} needs attention soon.\n\n"
+            "Customer: I'm busy this week.\n\n"
+            "Agent Maya: We can pick the car up and return it the same day. It only takes a few hours.\n\n"
+            "Customer: Okay, book it.\n\n"
+            "Agent Maya: Done, you'll get a confirmation shortly. Thank you for choosing AutoCare!")
+
+async def run(worker: VoiceWorker, transcripts) -> dict:
+    first, full = [], []
+    for text in transcripts:
+        start = time.perf_counter()
+        key = worker.submit(text)
+        got_first = None
+        async for _ in worker.stream(key):
+            if got_first is None:
+                got_first = time.perf_counter() - start
+        await worker.wait(key, 60)  # the assembled conversation file
+        first.append(got_first * 1000)
+        full.append((time.perf_counter() - start) * 1000)
+    # The first conversation is cold; later ones share everything but their opening lines
+    return {"cold_first": first[0], "cold_full": full[0],
+            "warm_first": statistics.median(first[1:] or first), "warm_full": statistics.median(full[1:] or full)}
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    transcripts = [transcript(i) for i in range(args.conversations)]
+    phrases = sum(len(split_phrases(text)) for t in transcripts for _, text in split_turns(t))
+    print(f"{args.conversations} conversations, {phrases} sentences, simulated TTS latency {args.tts_latency}s")
+    for label, concurrency in (("sequential", 1), (f"parallel x{args.concurrency}", args.concurrency)):
+        synthesizer = LocalSynthesizer(latency_seconds=args.tts_latency)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            worker = VoiceWorker(synthesizer, cache_dir=cache_dir, max_concurrency=concurrency)
+            r = asyncio.run(run(worker, transcripts))
+        print(f"{label:<14} cold: first audio {r['cold_first']:6.0f} ms, full {r['cold_full']:6.0f} ms   "
+              f"warm p50: first audio {r['warm_first']:6.0f} ms, full {r['warm_full']:6.0f} ms   "
+              f"synthesized {synthesizer.calls}/{phrases} sentences")
+
+if __name__ == "__main__":
+    main_cli()
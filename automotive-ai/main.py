@@ -1,15 +1,39 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import asyncio
 import json
 import os
+import re
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
 from agents.master_agent import MasterAgent
-
-app = FastAPI(title="Automotive Predictive Maintenance API", version="1.0.0")
+from agents.data_analysis import HEALTH_BANDS
+from utils.executor import get_agent_pool, run_in_agent_pool
+from utils.llm_client import get_llm_client, llm_metrics
+from utils.chat_context import (CHAT_PROMPT_TOKEN_BUDGET, CHAT_RETRIEVAL_FIRST_BUILD_WAIT_SECONDS, CHAT_RETRIEVAL_TOP_K,
+                                ChatContextCache, estimate_tokens, fit_history, fit_sections)
+from utils.response_cache import ResponseCache
+from utils.voice_worker import get_voice_worker
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the first retrieval index build in the background (it imports NumPy and reads all
+    # history), so startup does not wait for it
+    threading.Thread(target=lambda: master_agent.knowledge_index.ensure_fresh(), name="knowledge-index-build",
+                     daemon=True).start()
+    yield
+
+app = FastAPI(title="Automotive Predictive Maintenance API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -18,56 +42,80 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Initialize master agent
 master_agent = MasterAgent()
 
+# Serialized + gzipped bodies of the read-mostly dashboard endpoints, keyed by data version
+response_cache = ResponseCache(max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")))
+
+def _cached_json(request: Request, key, version, build) -> Response:
+    """Serve build()'s JSON from the response cache with ETag / If-None-Match and gzip support"""
+    cached = response_cache.get_or_build(key, version, build)
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if cached.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if cached.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(cached.gzipped, media_type="application/json", headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
 @app.get("/")
 async def root():
     return {"message": "Automotive Predictive Maintenance API", "status": "running"}
 
 @app.get("/vehicles")
-async def get_vehicles():
-    """List all vehicles"""
-    try:
-        with open('data/vehicles.json', 'r') as f:
-            vehicles = json.load(f)
-        return {"vehicles": vehicles, "count": len(vehicles)}
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Vehicles data not found")
+def get_vehicles(request: Request, location: Optional[str] = None, model: Optional[str] = None,
+                 preferred_service_center: Optional[str] = None, health_band: Optional[str] = None,
+                 min_health: Optional[int] = None, max_health: Optional[int] = None,
+                 fields: Optional[str] = None, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """List vehicles (ordered by id), with optional filters, field projection and cursor pagination"""
+    if limit is not None and (limit < 1 or limit > 1000):
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    if health_band is not None:
+        if health_band not in HEALTH_BANDS:
+            raise HTTPException(status_code=400, detail=f"health_band must be one of {', '.join(HEALTH_BANDS)}")
+        band_min, band_max = HEALTH_BANDS[health_band]
+        min_health = band_min if min_health is None else max(min_health, band_min)
+        max_health = band_max if max_health is None else min(max_health, band_max)
+
+    def build():
+        index = master_agent.vehicle_index()
+        if not index.ids:
+            raise HTTPException(status_code=404, detail="Vehicles data not found")
+        filters = {"location": location, "model": model, "preferred_service_center": preferred_service_center}
+        projection = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        return index.query(filters, min_health, max_health, cursor, limit, projection)
+
+    # Each distinct query gets its own cached body
+    key = ("vehicles", str(request.query_params))
+    return _cached_json(request, key, master_agent.store.data_version("vehicles"), build)
 
 @app.get("/vehicles/{vehicle_id}")
-async def get_vehicle(vehicle_id: str):
+def get_vehicle(vehicle_id: str):
     """Get vehicle details"""
-    try:
-        with open('data/vehicles.json', 'r') as f:
-            vehicles = json.load(f)
-        vehicle = next((v for v in vehicles if v["id"] == vehicle_id), None)
-        if not vehicle:
-            raise HTTPException(status_code=404, detail="Vehicle not found")
-        return vehicle
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Vehicles data not found")
+    vehicle = master_agent.store.get_vehicle(vehicle_id)
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    return vehicle
 
 @app.get("/vehicles/{vehicle_id}/health")
-async def get_vehicle_health(vehicle_id: str):
+def get_vehicle_health(vehicle_id: str):
     """Get vehicle health analysis"""
-    result = master_agent.data_agent.analyze_vehicle(vehicle_id)
+    result = master_agent.get_analysis(vehicle_id)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     return result
 
 @app.post("/vehicles/{vehicle_id}/predict")
-async def predict_failures(vehicle_id: str):
+def predict_failures(vehicle_id: str):
     """Predict vehicle failures"""
-    # First get analysis
-    analysis = master_agent.data_agent.analyze_vehicle(vehicle_id)
+    # Analysis then diagnosis, shared with the other endpoints through the result cache
+    analysis, result = master_agent.get_diagnosis(vehicle_id)
     if "error" in analysis:
         raise HTTPException(status_code=400, detail=analysis["error"])
-
-    # Then diagnose
-    result = master_agent.diagnosis_agent.diagnose_issues(vehicle_id, analysis)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     return result
@@ -75,12 +123,14 @@ async def predict_failures(vehicle_id: str):
 @app.post("/vehicles/{vehicle_id}/engage")
 async def engage_customer(vehicle_id: str):
     """Start customer engagement conversation"""
+    # The LLM call blocks, so the pipeline runs on the bounded agent pool (speech is synthesized in the background)
+    return await run_in_agent_pool(_engage_customer, vehicle_id)
+
+def _engage_customer(vehicle_id: str) -> dict:
     # Get diagnosis first
-    analysis = master_agent.data_agent.analyze_vehicle(vehicle_id)
+    analysis, diagnosis = master_agent.get_diagnosis(vehicle_id)
     if "error" in analysis:
         raise HTTPException(status_code=400, detail=analysis["error"])
-
-    diagnosis = master_agent.diagnosis_agent.diagnose_issues(vehicle_id, analysis)
     if "error" in diagnosis:
         raise HTTPException(status_code=400, detail=diagnosis["error"])
 
@@ -89,67 +139,258 @@ async def engage_customer(vehicle_id: str):
         raise HTTPException(status_code=400, detail=result["error"])
     return result
 
+AUDIO_KEY_RE = re.compile(r"[0-9a-f]{64}")
+
+@app.get("/voice/{key}")
+async def get_voice_status(key: str, wait: float = 0):
+    """Status and URL of a conversation's audio (key from the engage response's "voice").
+
+    With wait, the request is held for up to that many seconds (at most 30) and
+    answers as soon as the audio is ready.
+    """
+    if not AUDIO_KEY_RE.fullmatch(key):
+        raise HTTPException(status_code=404, detail="Unknown audio key")
+    status = await get_voice_worker().wait(key, min(max(wait, 0), 30))
+    if status["status"] == "unknown":
+        raise HTTPException(status_code=404, detail="Unknown audio key")
+    return status
+
+@app.get("/audio/{key}.mp3")
+def get_audio(key: str):
+    """Synthesized conversation audio; content-addressed, so it never changes"""
+    path = get_voice_worker().path_for(key) if AUDIO_KEY_RE.fullmatch(key) else None
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return FileResponse(path, media_type="audio/mpeg", headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+@app.get("/audio/{key}/stream")
+def stream_audio(key: str):
+    """Conversation audio as a chunked MP3 stream that starts with the first synthesized sentence"""
+    chunks = get_voice_worker().stream(key) if AUDIO_KEY_RE.fullmatch(key) else None
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return StreamingResponse(chunks, media_type="audio/mpeg", headers={"Cache-Control": "no-cache"})
+
 @app.post("/vehicles/{vehicle_id}/schedule")
-async def schedule_service(vehicle_id: str):
-    """Book service appointment"""
+def schedule_service(vehicle_id: str, idempotency_key: Optional[str] = Header(None)):
+    """Book service appointment; a retry with the same Idempotency-Key header returns the original booking"""
     # Get diagnosis first
-    analysis = master_agent.data_agent.analyze_vehicle(vehicle_id)
+    analysis, diagnosis = master_agent.get_diagnosis(vehicle_id)
     if "error" in analysis:
         raise HTTPException(status_code=400, detail=analysis["error"])
-
-    diagnosis = master_agent.diagnosis_agent.diagnose_issues(vehicle_id, analysis)
     if "error" in diagnosis:
         raise HTTPException(status_code=400, detail=diagnosis["error"])
 
-    result = master_agent.scheduling_agent.book_appointment(vehicle_id, diagnosis)
+    result = master_agent.scheduling_agent.book_appointment(vehicle_id, diagnosis, idempotency_key)
     return result
 
 @app.post("/vehicles/{vehicle_id}/orchestrate")
 async def orchestrate_workflow(vehicle_id: str):
     """Run full orchestration workflow"""
-    result = master_agent.orchestrate_maintenance_workflow(vehicle_id)
+    result = await run_in_agent_pool(master_agent.orchestrate_maintenance_workflow, vehicle_id)
     return result
 
-@app.get("/service-centers")
-async def get_service_centers():
-    """Get available service slots"""
-    result = master_agent.scheduling_agent.get_available_slots()
+@app.post("/vehicles/{vehicle_id}/orchestrate/jobs", status_code=202)
+def submit_orchestration_job(vehicle_id: str):
+    """Queue the orchestration workflow in the background; poll the returned job for progress"""
+    job = master_agent.submit_workflow(vehicle_id)
+    if "error" in job:
+        raise HTTPException(status_code=404, detail=job["error"])
+    job["status_url"] = f"/jobs/{job['job_id']}"
+    return job
+
+@app.get("/vehicles/{vehicle_id}/workflow-status")
+def get_workflow_status(vehicle_id: str):
+    """Status of the vehicle's most recent background workflow"""
+    return master_agent.get_workflow_status(vehicle_id)
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status, per-step progress and (once finished) the result of a background job"""
+    job = master_agent.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/fleet/health")
+def get_fleet_health(bins: int = 10):
+    """Vectorized health scores and histograms for the whole fleet"""
+    if bins < 1:
+        raise HTTPException(status_code=400, detail="bins must be at least 1")
+    result = master_agent.data_agent.analyze_fleet(bins)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
     return result
 
-@app.get("/manufacturing/insights")
-async def get_manufacturing_insights():
-    """Get RCA/CAPA manufacturing analysis"""
-    result = master_agent.manufacturing_agent.analyze_patterns()
+def _sse(event_id: int, event: str, data) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+@app.get("/fleet/events")
+async def fleet_events(request: Request, snapshot: bool = False, last_event_id: Optional[int] = None):
+    """Server-sent events: one compact delta per change in a vehicle's health score, risk level or anomalies.
+
+    Resumes after the Last-Event-ID header (or last_event_id query parameter) when that event is
+    still buffered; otherwise, or when snapshot=true, a full "snapshot" event is sent first.
+    """
+    header = request.headers.get("last-event-id")
+    if header:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    feed = master_agent.fleet_feed
+    # Computing the baseline state blocks, so it runs off the event loop
+    await run_in_threadpool(feed.start)
+
+    async def stream():
+        token, wakeup = feed.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            last = last_event_id
+            pending = feed.events_since(last) if last is not None else []
+            while True:
+                if pending is None or (last is None and snapshot):
+                    # Too far behind to resume (or asked for it): send the full state, then deltas after it
+                    snap_id, states = feed.snapshot()
+                    yield await run_in_threadpool(_sse, snap_id, "snapshot", {"vehicles": states})
+                    last = snap_id
+                    pending = feed.events_since(last)
+                    continue
+                if last is None:
+                    last = feed.last_event_id()
+                for event_id, delta in pending:
+                    yield _sse(event_id, "delta", delta)
+                    last = event_id
+
+                if await request.is_disconnected():
+                    break
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                wakeup.clear()
+                pending = feed.events_since(last)
+        finally:
+            feed.unsubscribe(token)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+class FleetOrchestrateRequest(BaseModel):
+    vehicle_ids: Optional[List[str]] = None
+    location: Optional[str] = None
+    model: Optional[str] = None
+    preferred_service_center: Optional[str] = None
+    max_health_score: Optional[int] = None
+    limit: Optional[int] = None
+    workers: Optional[int] = None
+    include_steps: bool = False
+
+@app.post("/fleet/orchestrate")
+def orchestrate_fleet(request: FleetOrchestrateRequest):
+    """Run the maintenance workflow over a filtered set of vehicles, streaming NDJSON results"""
+    try:
+        vehicle_ids = master_agent.select_vehicles(
+            request.vehicle_ids, request.location, request.model, request.preferred_service_center,
+            request.max_health_score, request.limit
+        )
+        scope = master_agent.authorize_fleet(vehicle_ids)
+    except PermissionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def stream():
+        for record in master_agent.orchestrate_fleet(vehicle_ids, request.workers, request.include_steps, scope):
+            yield json.dumps(record, default=str) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+class FleetScheduleRequest(BaseModel):
+    vehicle_ids: Optional[List[str]] = None
+    location: Optional[str] = None
+    model: Optional[str] = None
+    preferred_service_center: Optional[str] = None
+    max_health_score: Optional[int] = None
+    min_risk_score: Optional[int] = None
+    limit: Optional[int] = None
+    dry_run: bool = False
+
+@app.post("/fleet/schedule")
+def schedule_fleet(request: FleetScheduleRequest, idempotency_key: Optional[str] = Header(None)):
+    """Book every selected vehicle that needs service in one solve, most urgent first; dry_run only plans.
+
+    A retry with the same Idempotency-Key header keeps the bookings the first run made.
+    """
+    try:
+        vehicle_ids = master_agent.select_vehicles(
+            request.vehicle_ids, request.location, request.model, request.preferred_service_center,
+            request.max_health_score, request.limit
+        )
+    except PermissionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result = master_agent.schedule_fleet(vehicle_ids, request.min_risk_score, idempotency_key, request.dry_run)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     return result
 
+@app.get("/service-centers")
+def get_service_centers(request: Request):
+    """Get available service slots"""
+    # Only future slots are listed, so the cached list is also rebuilt every minute
+    version = (master_agent.store.data_version("service_centers"), int(time.time() // 60))
+    return _cached_json(request, "service-centers", version, master_agent.scheduling_agent.get_available_slots)
+
+@app.get("/manufacturing/insights")
+def get_manufacturing_insights(request: Request):
+    """Get RCA/CAPA manufacturing analysis"""
+    def build():
+        result = master_agent.manufacturing_agent.analyze_patterns()
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return result
+
+    return _cached_json(request, "manufacturing-insights", master_agent.store.data_version("rca_capa"), build)
+
 @app.get("/security/logs")
-async def get_security_logs(limit: int = 50):
+def get_security_logs(limit: int = 50):
     """Get UEBA security logs"""
     logs = master_agent.ueba.get_logs(limit)
     return {"logs": logs, "security_score": master_agent.ueba.get_security_score()}
 
+@app.get("/security/logs/query")
+def query_security_logs(agent: Optional[str] = None, action: Optional[str] = None,
+                        success: Optional[bool] = None, since: Optional[str] = None,
+                        until: Optional[str] = None, cursor: Optional[str] = None, limit: int = 50):
+    """Filtered UEBA log query with cursor pagination (newest first)"""
+    if limit < 1 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    try:
+        return master_agent.ueba.query_logs(agent, action, success, since, until, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/security/check-action")
-async def check_agent_action(agent: str, action: str, data: dict = None):
+def check_agent_action(agent: str, action: str, data: dict = None):
     """Verify agent action for security"""
     result = master_agent.ueba.verify_action(agent, action, data)
     return result
 
 @app.get("/agent-status")
-async def get_agent_status():
+def get_agent_status():
     """Get status of all agents"""
     return master_agent.get_agent_status()
 
+@app.get("/llm/metrics")
+def get_llm_metrics():
+    """LLM gateway (queue depth, in-flight calls, circuit state, fallback rate) and response cache counters"""
+    return llm_metrics()
+
 @app.get("/feedback/summary")
-async def get_feedback_summary():
+def get_feedback_summary():
     """Get feedback summary statistics"""
     return master_agent.feedback_agent.get_feedback_summary()
 
 # ============= AI Chat Endpoint =============
-from pydantic import BaseModel
-from typing import List, Optional
-from groq import Groq
 
 class ChatMessage(BaseModel):
     role: str  # "user" or "assistant"
@@ -163,27 +404,25 @@ class ChatRequest(BaseModel):
 @app.post("/chat")
 async def chat_with_ai(request: ChatRequest):
     """AI Assistant chat endpoint with knowledge of vehicle data"""
+    # Context building and the Groq call block, so they run on the bounded agent pool
+    return await run_in_agent_pool(_chat_with_ai, request)
+
+CHAT_MODEL = "llama-3.1-8b-instant"
+
+def _chat_fallback(e: Exception) -> dict:
+    return {
+        "response": f"I apologize, but I'm having trouble processing your request. Please try again. Error: {str(e)}",
+        "error": str(e)
+    }
+
+def _chat_with_ai(request: ChatRequest) -> dict:
     try:
-        # Gather context from the API
-        context_data = await _gather_chat_context(request.vehicle_id)
-        
-        # Build system prompt with API knowledge
-        system_prompt = _build_system_prompt(context_data)
+        messages, context_data = _build_chat_messages(request)
         
-        # Build conversation messages
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history
-        for msg in request.history[-10:]:  # Keep last 10 messages for context
-            messages.append({"role": msg.role, "content": msg.content})
-        
-        # Add current user message
-        messages.append({"role": "user", "content": request.message})
-        
-        # Call Groq LLM
-        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        # Call Groq LLM over the shared, keep-alive connection pool
+        client = get_llm_client()
         completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
+            model=CHAT_MODEL,
             messages=messages,
             temperature=0.7,
             max_tokens=1024,
@@ -193,115 +432,210 @@ async def chat_with_ai(request: ChatRequest):
         
         return {
             "response": response_text,
-            "context_used": {
-                "vehicle_count": len(context_data.get("vehicles", [])),
-                "has_vehicle_context": request.vehicle_id is not None
-            }
+            "context_used": _context_used(request, context_data)
         }
         
     except Exception as e:
-        return {
-            "response": f"I apologize, but I'm having trouble processing your request. Please try again. Error: {str(e)}",
-            "error": str(e)
-        }
+        return _chat_fallback(e)
 
-async def _gather_chat_context(vehicle_id: Optional[str] = None) -> dict:
-    """Gather relevant data from APIs for chat context"""
-    context = {}
+@app.post("/chat/stream")
+async def chat_with_ai_stream(request: ChatRequest):
+    """Streaming /chat: newline-delimited JSON events, with tokens forwarded as the model produces them.
+
+    Events are {"type": "token", "text": ...} for each piece of the reply, then either
+    {"type": "done", "response": <full text>, "context_used": ...} or, if anything fails,
+    {"type": "error", "response": <fallback text>, "error": ...}.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    disconnected = threading.Event()
+
+    def emit(event: dict):
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, event)
+        except RuntimeError:
+            disconnected.set()  # the event loop has shut down
+
+    def produce():
+        # Runs on the agent pool and owns the upstream stream from start to close
+        completion = None
+        parts = []
+        try:
+            messages, context_data = _build_chat_messages(request)
+            completion = get_llm_client().chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1024,
+                stream=True,
+            )
+            for chunk in completion:
+                if disconnected.is_set():
+                    return
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    parts.append(text)
+                    emit({"type": "token", "text": text})
+            emit({"type": "done", "response": "".join(parts), "context_used": _context_used(request, context_data)})
+        except Exception as e:
+            emit({"type": "error", **_chat_fallback(e)})
+        finally:
+            if completion is not None:
+                completion.close()
+
+    async def stream():
+        get_agent_pool().submit(produce)
+        try:
+            while True:
+                event = await events.get()
+                yield _ndjson(event)
+                if event["type"] != "token":
+                    break
+        finally:
+            # Also reached when the client goes away mid-reply: stop reading from the model
+            disconnected.set()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+def _build_chat_messages(request: ChatRequest):
+    """(messages for the LLM, context snapshot) for a chat request"""
+    # Versioned snapshot of the prompt sections (rendered once per data version)
+    context_data = _gather_chat_context(request.vehicle_id)
+    # Plus the few history records and known defects that match this question
+    context_data = {**context_data, "retrieved": _retrieve_chat_snippets(request)}
+    
+    # The system prompt and history share the token budget left after the new message
+    budget = CHAT_PROMPT_TOKEN_BUDGET - estimate_tokens(request.message)
+    system_prompt = _build_system_prompt(context_data, budget)
+    
+    # Build conversation messages
+    messages = [{"role": "system", "content": system_prompt}]
+    
+    # Add as much recent history (last 10 messages at most) as still fits
+    history = [{"role": msg.role, "content": msg.content} for msg in request.history[-10:]]
+    messages.extend(fit_history(history, budget - estimate_tokens(system_prompt)))
     
+    # Add current user message
+    messages.append({"role": "user", "content": request.message})
+    return messages, context_data
+
+def _context_used(request: ChatRequest, context_data: dict) -> dict:
+    return {
+        "vehicle_count": context_data["vehicle_count"],
+        "has_vehicle_context": request.vehicle_id is not None,
+        "retrieved_snippets": max(len(context_data.get("retrieved", [])) - 1, 0)
+    }
+
+def _retrieve_chat_snippets(request: ChatRequest) -> List[str]:
+    """Prompt section with the top-k maintenance records and RCA defects for the question"""
+    query = request.message
     try:
-        # Load vehicles
-        with open('data/vehicles.json', 'r') as f:
-            vehicles = json.load(f)
-            context["vehicles"] = vehicles
-            context["vehicle_summary"] = [
-                {"id": v["id"], "model": v["model"], "owner": v["owner"], "health": v.get("health_score", "N/A")} 
-                for v in vehicles[:10]
-            ]
-    except:
-        context["vehicles"] = []
+        if request.vehicle_id:
+            # Bias retrieval towards the selected vehicle's own records and its model's defects
+            vehicle = master_agent.store.get_vehicle(request.vehicle_id) or {}
+            query += f" {request.vehicle_id} {vehicle.get('model', '')}"
+        knowledge = master_agent.knowledge_index
+        # Signals the background refresh without waiting and searches the current index in the meantime,
+        # except before the first build, which is waited for (briefly) so early chats are grounded too
+        knowledge.ensure_fresh(timeout=0 if knowledge.built else CHAT_RETRIEVAL_FIRST_BUILD_WAIT_SECONDS)
+        snippets = knowledge.search(query, k=CHAT_RETRIEVAL_TOP_K)
+    except Exception as e:
+        print(f"Chat retrieval unavailable: {e}")
+        return []
+    if not snippets:
+        return []
+    return ["Relevant maintenance records and known defects:"] + [f"- {snippet}" for snippet in snippets]
+
+# Rendered prompt sections: fleet overview, service centers and one entry per selected vehicle
+chat_context_cache = ChatContextCache(max_entries=int(os.getenv("RESULT_CACHE_SIZE", "1024")))
+
+def _gather_chat_context(vehicle_id: Optional[str] = None) -> dict:
+    """Snapshot of the prompt sections for a chat, each reused until its data version changes"""
+    store = master_agent.store
+    context = {}
     
     try:
-        # Load service centers
-        with open('data/service_centers.json', 'r') as f:
-            context["service_centers"] = json.load(f)
+        context["fleet"] = chat_context_cache.get_or_build("fleet", store.vehicles_version(), _render_fleet_summary)
+        # The whole fleet, not just the vehicles summarized in the prompt
+        context["vehicle_count"] = len(master_agent.vehicle_index().ids)
     except:
-        context["service_centers"] = []
+        context["fleet"] = []
+        context["vehicle_count"] = 0
     
     try:
-        # Load maintenance history
-        with open('data/maintenance_history.json', 'r') as f:
-            context["maintenance_history"] = json.load(f)
+        context["service_centers"] = chat_context_cache.get_or_build(
+            "service_centers", store.data_version("service_centers"), _render_service_centers)
     except:
-        context["maintenance_history"] = []
+        context["service_centers"] = []
     
-    # If specific vehicle requested, get detailed info
+    # If specific vehicle requested, add its details, health analysis and predictions
+    context["vehicle"] = []
     if vehicle_id:
         try:
-            vehicle = next((v for v in context.get("vehicles", []) if v["id"] == vehicle_id), None)
-            if vehicle:
-                context["selected_vehicle"] = vehicle
-                # Get health analysis
-                analysis = master_agent.data_agent.analyze_vehicle(vehicle_id)
-                if "error" not in analysis:
-                    context["vehicle_health"] = analysis
-                # Get predictions
-                diagnosis = master_agent.diagnosis_agent.diagnose_issues(vehicle_id, analysis)
-                if "error" not in diagnosis:
-                    context["vehicle_diagnosis"] = diagnosis
+            version = store.vehicle_version(vehicle_id)
+            # Checked on every chat, since a cached section skips the agents that would check it
+            denied = master_agent.authorize_diagnosis(vehicle_id) if version is not None else None
+            if denied:
+                print(f"Chat context for {vehicle_id} denied: {denied['error']}")
+            elif version is not None:
+                context["vehicle"] = chat_context_cache.get_or_build(
+                    ("vehicle", vehicle_id), version, lambda: _render_vehicle(vehicle_id))
         except Exception as e:
-            context["vehicle_error"] = str(e)
+            print(f"Chat context for {vehicle_id} unavailable: {e}")
     
     return context
 
-def _build_system_prompt(context: dict) -> str:
-    """Build system prompt with API knowledge"""
-    
-    vehicles_info = ""
-    if context.get("vehicle_summary"):
-        vehicles_info = "Available vehicles in the system:\n"
-        for v in context["vehicle_summary"]:
-            vehicles_info += f"- {v['id']}: {v['model']} (Owner: {v['owner']})\n"
-    
-    service_centers_info = ""
-    if context.get("service_centers"):
-        service_centers_info = "\nService Centers:\n"
-        centers = context["service_centers"]
-        # Handle both dict and list formats
-        if isinstance(centers, dict):
-            for center_id, center in list(centers.items())[:5]:
-                service_centers_info += f"- {center.get('name', center_id)}: {center.get('location', 'Unknown location')}\n"
-        else:
-            for center in centers[:5]:
-                service_centers_info += f"- {center.get('name', 'Unknown')}: {center.get('location', 'Unknown location')}\n"
-    
-    selected_vehicle_info = ""
-    if context.get("selected_vehicle"):
-        v = context["selected_vehicle"]
-        selected_vehicle_info = f"""
-Currently Selected Vehicle:
-- ID: {v.get('id')}
-- Model: {v.get('model')}
-- Owner: {v.get('owner')}
-- Mileage: {v.get('mileage', 'N/A')} km
-- Last Service: {v.get('last_service', 'N/A')}
-"""
-        if context.get("vehicle_health"):
-            h = context["vehicle_health"]
-            selected_vehicle_info += f"""
-Health Analysis:
-- Health Score: {h.get('health_score', 'N/A')}/100
-- Risk Level: {h.get('risk_level', 'N/A')}
-- Critical Alerts: {len(h.get('alerts', []))}
-"""
-        if context.get("vehicle_diagnosis"):
-            d = context["vehicle_diagnosis"]
-            if d.get("predicted_failures"):
-                selected_vehicle_info += "\nPredicted Issues:\n"
-                for p in d["predicted_failures"][:3]:
-                    selected_vehicle_info += f"- {p.get('component')}: {p.get('failure_type')} (Probability: {p.get('probability', 'N/A')}%, Cost: ₹{p.get('cost_estimate', 'N/A')})\n"
-
-    system_prompt = f"""You are Maya, an expert AI assistant for AutoAide - an automotive predictive maintenance platform. You help customers with:
+def _render_fleet_summary() -> List[str]:
+    # Only the 10 summarized vehicles are read, through the vehicle index
+    page = master_agent.vehicle_index().query(limit=10, fields=("model", "owner"))
+    return ["Available vehicles in the system:"] + [
+        f"- {v['id']}: {v['model']} (Owner: {v['owner']})" for v in page["vehicles"]
+    ]
+
+def _render_service_centers() -> List[str]:
+    centers = master_agent.store.get_service_centers()
+    # Handle both dict and list formats
+    if isinstance(centers, dict):
+        centers = [{"name": center_id, **center} for center_id, center in centers.items()]
+    return ["Service Centers:"] + [
+        f"- {center.get('name', 'Unknown')}: {center.get('location', 'Unknown location')}" for center in centers[:5]
+    ]
+
+def _render_vehicle(vehicle_id: str) -> List[List[str]]:
+    """Sections about one vehicle: its record, health analysis and predicted issues"""
+    v = master_agent.store.get_vehicle(vehicle_id)
+    if not v:
+        return []
+    sections = [[
+        "Currently Selected Vehicle:",
+        f"- ID: {v.get('id')}",
+        f"- Model: {v.get('model')}",
+        f"- Owner: {v.get('owner')}",
+        f"- Mileage: {v.get('mileage', 'N/A')} km",
+        f"- Last Service: {v.get('last_service', 'N/A')}",
+    ]]
+    # Health analysis and predictions (cached per vehicle version); _gather_chat_context checked UEBA
+    analysis, diagnosis = master_agent.compute_diagnosis(vehicle_id)
+    if "error" not in analysis:
+        sections.append([
+            "Health Analysis:",
+            f"- Health Score: {analysis.get('health_score', 'N/A')}/100",
+            f"- Risk Level: {analysis.get('risk_level', 'N/A')}",
+            f"- Critical Alerts: {len(analysis.get('alerts', []))}",
+        ])
+    if diagnosis and "error" not in diagnosis and diagnosis.get("predicted_failures"):
+        sections.append(["Predicted Issues:"] + [
+            f"- {p.get('component')}: {p.get('failure_type')} (Probability: {p.get('probability', 'N/A')}%, "
+            f"Cost: ₹{p.get('cost_estimate', 'N/A')})"
+            for p in diagnosis["predicted_failures"][:3]
+        ])
+    return sections
+
+SYSTEM_PROMPT_TEMPLATE = """You are Maya, an expert AI assistant for AutoAide - an automotive predictive maintenance platform. You help customers with:
 
 1. **Vehicle Diagnostics**: Explain sensor data, health scores, and potential issues
 2. **Failure Predictions**: Describe predicted failures and their urgency
@@ -310,9 +644,7 @@ Health Analysis:
 5. **Cost Estimates**: Explain repair costs and priorities
 
 Your Knowledge Base:
-{vehicles_info}
-{service_centers_info}
-{selected_vehicle_info}
+{knowledge}
 
 Guidelines:
 - Be helpful, professional, and concise
@@ -325,7 +657,14 @@ Guidelines:
 
 Remember: You have access to real-time vehicle sensor data, maintenance history, and predictive analytics."""
 
-    return system_prompt
+def _build_system_prompt(context: dict, token_budget: int = CHAT_PROMPT_TOKEN_BUDGET) -> str:
+    """Render the system prompt from a context snapshot within token_budget tokens"""
+    available = token_budget - estimate_tokens(SYSTEM_PROMPT_TEMPLATE.format(knowledge=""))
+    # The selected vehicle matters most, then retrieved records, the fleet overview and the service centers
+    sections = fit_sections(context.get("vehicle", []) + [context.get("retrieved", []), context.get("fleet", []),
+                                                          context.get("service_centers", [])], available)
+    knowledge = "\n\n".join("\n".join(lines) for lines in sections)
+    return SYSTEM_PROMPT_TEMPLATE.format(knowledge=knowledge)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,34 @@
+import os
+
+def create_storage():
+    """Build the storage backend selected by STORAGE_BACKEND (json | sqlite)"""
+    backend = os.getenv("STORAGE_BACKEND", "json").lower()
+    if backend == "sqlite":
+        from storage.sqlite_store import SQLiteStorage
+        return SQLiteStorage(os.getenv("SQLITE_PATH", "data/automotive.db"))
+    if backend == "json":
+        from storage.json_store import JSONStorage
+        return JSONStorage(
+            os.getenv("DATA_DIR", "data"),
+            log_batch_size=int(os.getenv("AUDIT_LOG_BATCH_SIZE", "64")),
+            log_flush_interval_ms=int(os.getenv("AUDIT_LOG_FLUSH_MS", "200")),
+            log_fsync=os.getenv("AUDIT_LOG_FSYNC", "flush"),
+            log_segment_entries=int(os.getenv("AUDIT_LOG_SEGMENT_ENTRIES", "10000")),
+            shared_state=_shared_state(),
+            booking_fsync=os.getenv("BOOKING_LEDGER_FSYNC", "always")
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+def _shared_state():
+    """SQLite store for logs and bookings shared by all worker processes, if configured.
+
+    Enabled by SHARED_STATE_DB, or automatically when WEB_CONCURRENCY asks for
+    more than one worker.
+    """
+    path = os.getenv("SHARED_STATE_DB")
+    if not path and int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        path = "data/shared_state.db"
+    if not path:
+        return None
+    from storage.sqlite_store import SQLiteStorage
+    return SQLiteStorage(path)
@@ -0,0 +1,147 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+def parse_slot_epoch(slot: str) -> float:
+    """Convert an ISO slot string (optionally 'Z'-suffixed) to epoch seconds"""
+    return datetime.fromisoformat(slot.replace('Z', '+00:00')).timestamp()
+
+def counts_toward_rate_limit(entry: Dict[str, Any]) -> bool:
+    """Whether a security log entry counts for the UEBA frequency rule.
+
+    Denied attempts do not, and neither do per-vehicle actions of a fleet
+    run (data has "fleet_authorized"), which was checked once as a whole.
+    """
+    return bool(entry.get("success", True)) and not (entry.get("data") or {}).get("fleet_authorized")
+
+class StorageBackend(ABC):
+    """Data-access interface shared by all agents.
+
+    Implementations: JSONStorage (the flat files under data/) and
+    SQLiteStorage (a local, indexed SQLite database in WAL mode).
+    """
+
+    # True when logs and bookings live somewhere every worker process sees
+    # (safe under `uvicorn --workers N`); False for per-process state
+    shared = False
+
+    # ----- Vehicles -----
+
+    @abstractmethod
+    def get_vehicle(self, vehicle_id: str) -> Optional[Dict[str, Any]]:
+        """Return one vehicle record, or None if it does not exist"""
+
+    @abstractmethod
+    def list_vehicles(self) -> List[Dict[str, Any]]:
+        """Return all vehicle records"""
+
+    @abstractmethod
+    def vehicles_snapshot(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return (version, vehicles); version changes whenever any vehicle changes"""
+
+    def vehicles_version(self) -> int:
+        return self.vehicles_snapshot()[0]
+
+    @abstractmethod
+    def vehicle_version(self, vehicle_id: str) -> Optional[int]:
+        """Version of one vehicle record, changed whenever that record changes; None if missing"""
+
+    @abstractmethod
+    def vehicle_versions(self) -> Dict[str, int]:
+        """{vehicle_id: record version} for every vehicle (used to find changed records)"""
+
+    @abstractmethod
+    def data_version(self, dataset: str) -> Any:
+        """Opaque token that changes whenever a dataset changes.
+
+        dataset is one of "vehicles", "service_centers" or "rca_capa".
+        """
+
+    # ----- Service centers and slots -----
+
+    @abstractmethod
+    def get_service_centers(self) -> Dict[str, Any]:
+        """Return {center_id: center} with each center's remaining available_slots"""
+
+    @abstractmethod
+    def get_service_center(self, center_id: str) -> Optional[Dict[str, Any]]:
+        """Return one center (with available_slots), or None"""
+
+    @abstractmethod
+    def find_slots(self, center_id: str, start: float, end: float, limit: int = 1) -> List[str]:
+        """Return up to limit available slots of a center with start < slot time < end (epoch seconds)"""
+
+    @abstractmethod
+    def reserve_slot(self, center_id: str, slot: str, vehicle_id: str, idempotency_key: str = None) -> bool:
+        """Atomically remove a slot from availability and record the booking.
+
+        False if the slot was already taken or idempotency_key already names
+        another booking (see get_booking).
+        """
+
+    def reserve_slots(self, bookings: List[Tuple[str, str, str, Optional[str]]]) -> List[bool]:
+        """reserve_slot() for many (center_id, slot, vehicle_id, idempotency_key); one result per booking.
+
+        Backends override it to commit the whole batch at once.
+        """
+        return [self.reserve_slot(*booking) for booking in bookings]
+
+    @abstractmethod
+    def get_booking(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """The booking {center_id, slot, vehicle_id, idempotency_key, created_at} made with a key, or None"""
+
+    @abstractmethod
+    def booked_slots(self, center_id: str = None) -> set:
+        """{(center_id, slot)} of every booking, optionally for one center"""
+
+    # ----- Maintenance and manufacturing data -----
+
+    @abstractmethod
+    def get_maintenance_history(self, vehicle_id: str = None) -> List[Dict[str, Any]]:
+        """Return maintenance records, optionally for a single vehicle"""
+
+    @abstractmethod
+    def append_maintenance_history(self, records: List[Dict[str, Any]]):
+        """Add maintenance records after the existing ones"""
+
+    @abstractmethod
+    def maintenance_history_changes(self, cursor: Any = None) -> Tuple[Any, List[Dict[str, Any]], bool]:
+        """(new cursor, records, reset) describing history changes since cursor.
+
+        Normally records are the ones appended since cursor and reset is
+        False. If cursor is None, or the history was rewritten since then,
+        records is the whole history and reset is True.
+        """
+
+    @abstractmethod
+    def get_rca_capa_data(self) -> Dict[str, Any]:
+        """Return the RCA/CAPA manufacturing quality document"""
+
+    # ----- UEBA security logs -----
+
+    @abstractmethod
+    def load_logs(self) -> List[Dict[str, Any]]:
+        """Return all security log entries, oldest first"""
+
+    @abstractmethod
+    def append_log(self, entry: Dict[str, Any]):
+        """Persist one security log entry"""
+
+    @abstractmethod
+    def query_logs(self, agent: str = None, action: str = None, success: bool = None, since: str = None,
+                   until: str = None, cursor: str = None, limit: Optional[int] = 50) -> Dict[str, Any]:
+        """Return {"logs": newest-first matches, "next_cursor": opaque cursor for the next page or None}.
+
+        since/until are inclusive ISO timestamps; limit=None returns every match.
+        Raises ValueError for a malformed cursor.
+        """
+
+    @abstractmethod
+    def log_stats(self) -> Dict[str, int]:
+        """Return {"total": n, "failures": n} over the whole security log"""
+
+    def count_recent_logs(self, agent: str, since: str, action: str = None) -> int:
+        """Log entries by agent (optionally for one action) at or after the ISO timestamp since
+        that count toward the UEBA rate limit (see counts_toward_rate_limit)"""
+        logs = self.query_logs(agent=agent, action=action, since=since, success=True, limit=None)["logs"]
+        return sum(counts_toward_rate_limit(entry) for entry in logs)
@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from utils.audit_log import FSYNC_ALWAYS, FSYNC_NEVER
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single process only
+    fcntl = None
+
+class BookingLedger:
+    """Durable, append-only JSON-lines ledger of slot bookings (used by the JSON backend).
+
+    Each line is one booking: {center_id, slot, vehicle_id, idempotency_key,
+    created_at}. record_booking() is a compare-and-set. It takes an
+    exclusive lock on the file (shared by every process using it), reads any
+    lines other processes appended since it last looked, and appends the
+    booking only if neither the (center, slot) pair nor the idempotency key
+    is taken. With fsync "always" (the default) the line is on disk before
+    the booking is confirmed. In-memory indexes keep reads O(1).
+    """
+
+    def __init__(self, path: str, fsync: str = FSYNC_ALWAYS):
+        if fsync not in (FSYNC_NEVER, FSYNC_ALWAYS):
+            raise ValueError(f"Unknown fsync policy for the booking ledger: {fsync}")
+        self.path = path
+        self.fsync = fsync
+        self._by_slot: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._by_key: Dict[str, Dict[str, Any]] = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Append mode: every write lands at the end, wherever reads have seeked to
+        self._file = open(path, 'a+b')
+        with self._lock:
+            self._catch_up()
+
+    def _catch_up(self):
+        # Caller holds self._lock. Only whole lines are applied; a line still being written is read next time.
+        self._file.seek(self._offset)
+        data = self._file.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line torn by a crash mid-write
+            self._by_slot[(record["center_id"], record["slot"])] = record
+            if record.get("idempotency_key"):
+                self._by_key[record["idempotency_key"]] = record
+        self._offset += end
+
+    def record_booking(self, center_id: str, slot: str, vehicle_id: str, idempotency_key: str = None) -> bool:
+        """Book (center_id, slot) for vehicle_id; False if the slot or the idempotency key is already taken"""
+        return self.record_bookings([(center_id, slot, vehicle_id, idempotency_key)])[0]
+
+    def record_bookings(self, bookings: List[Tuple[str, str, str, Optional[str]]]) -> List[bool]:
+        """record_booking() for many (center_id, slot, vehicle_id, idempotency_key); one lock, write and fsync"""
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                self._catch_up()
+                results, records = [], []
+                for center_id, slot, vehicle_id, idempotency_key in bookings:
+                    if (center_id, slot) in self._by_slot or (idempotency_key and idempotency_key in self._by_key):
+                        results.append(False)
+                        continue
+                    record = {"center_id": center_id, "slot": slot, "vehicle_id": vehicle_id,
+                              "idempotency_key": idempotency_key, "created_at": datetime.now().isoformat()}
+                    # Indexed right away so later entries of the same batch see it
+                    self._by_slot[(center_id, slot)] = record
+                    if idempotency_key:
+                        self._by_key[idempotency_key] = record
+                    records.append(record)
+                    results.append(True)
+                if not records:
+                    return results
+                size = os.fstat(self._file.fileno()).st_size
+                prefix = b"\n" if size > self._offset else b""  # terminate a torn last line first
+                data = prefix + b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records)
+                try:
+                    self._file.write(data)
+                    self._file.flush()
+                    if self.fsync == FSYNC_ALWAYS:
+                        os.fsync(self._file.fileno())
+                except OSError:
+                    for record in records:  # not confirmed, so not booked
+                        del self._by_slot[(record["center_id"], record["slot"])]
+                        self._by_key.pop(record["idempotency_key"], None)
+                    raise
+                # Nobody else can append while we hold the file lock
+                self._offset = size + len(data)
+                return results
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def get_booking(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._catch_up()
+            return self._by_key.get(idempotency_key)
+
+    def booked_slots(self, center_id: str = None) -> set:
+        """{(center_id, slot)} of every booking, optionally for one center"""
+        with self._lock:
+            self._catch_up()
+            return {pair for pair in self._by_slot if center_id is None or pair[0] == center_id}
+
+    def version(self) -> int:
+        """Changes whenever a booking is added, by this process or another"""
+        with self._lock:
+            self._catch_up()
+            return self._offset
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,51 @@
+"""One-shot importer from the flat JSON files in data/ into a SQLite store.
+
+Usage:
+    python -m storage.importer [--data-dir data] [--db data/automotive.db]
+
+Re-running it replaces centers, slots, history, RCA data and logs, and
+upserts vehicles (unchanged vehicles keep their version). The security logs
+are opened read-only, so it can run while a server uses the same data
+directory; log entries the server has not yet written out are not imported.
+"""
+import argparse
+from typing import Dict
+from storage.json_store import JSONStorage
+from storage.sqlite_store import SQLiteStorage
+
+def import_json(data_dir: str = 'data', db_path: str = 'data/automotive.db') -> Dict[str, int]:
+    source = JSONStorage(data_dir, log_read_only=True)
+    target = SQLiteStorage(db_path)
+
+    vehicles = source.list_vehicles()
+    centers = source.get_service_centers()
+    history = source.get_maintenance_history()
+    logs = source.load_logs()
+
+    target.upsert_vehicles(vehicles)
+    target.replace_service_centers(centers)
+    target.replace_maintenance_history(history)
+    target.replace_rca_capa_data(source.get_rca_capa_data())
+    target.replace_logs(logs)
+
+    return {
+        "vehicles": len(vehicles),
+        "service_centers": len(centers),
+        "slots": sum(len(c.get("available_slots", [])) for c in centers.values()),
+        "maintenance_records": len(history),
+        "security_logs": len(logs)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Import data/*.json into a SQLite store")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--db", default="data/automotive.db")
+    args = parser.parse_args()
+
+    counts = import_json(args.data_dir, args.db)
+    print(f"Imported into {args.db}:")
+    for name, count in counts.items():
+        print(f"  {name}: {count}")
+
+if __name__ == "__main__":
+    main()
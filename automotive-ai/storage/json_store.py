@@ -0,0 +1,244 @@
+import json
+import os
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from storage.base import StorageBackend, parse_slot_epoch
+from storage.booking_ledger import BookingLedger
+from utils.audit_log import SegmentedAuditLog, FSYNC_ALWAYS, FSYNC_FLUSH
+from utils.vehicle_repository import VehicleRepository
+
+DATASET_FILES = {
+    "service_centers": 'service_centers.json',
+    "rca_capa": 'rca_capa_data.json'
+}
+
+class JSONStorage(StorageBackend):
+    """Storage backed by the flat JSON files in data/.
+
+    Bookings go to an append-only ledger (data/bookings.jsonl) and are never
+    written into service_centers.json. With shared_state (a SQLiteStorage),
+    the mutable state (security logs and bookings) lives in that database
+    instead, so several worker processes can serve the same JSON data
+    without losing log entries or double-booking. With log_read_only the
+    security logs can be read while a server is using them, but not written.
+    """
+
+    def __init__(self, data_dir: str = 'data', log_batch_size: int = 64, log_flush_interval_ms: int = 200,
+                 log_fsync: str = FSYNC_FLUSH, log_segment_entries: int = 10000, shared_state=None,
+                 booking_fsync: str = FSYNC_ALWAYS, log_read_only: bool = False):
+        self.data_dir = data_dir
+        self.shared_state = shared_state
+        self.shared = shared_state is not None
+        self.booking_fsync = booking_fsync
+        self._ledger = None
+        self._ledger_lock = threading.Lock()
+        # (service_centers.json version, {center_id: frozenset of listed slots})
+        self._listed = (None, {})
+        self.vehicles = VehicleRepository(self._path('vehicles.json'))
+        self._log_options = {
+            "segment_max_entries": log_segment_entries,
+            "batch_size": log_batch_size,
+            "flush_interval_ms": log_flush_interval_ms,
+            "fsync": log_fsync,
+            "read_only": log_read_only
+        }
+        self._audit_log = None
+        self._audit_log_lock = threading.Lock()
+        # (file version, epoch, records) of the maintenance history last seen by maintenance_history_changes
+        self._history = (None, 0, [])
+        self._history_lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.data_dir, name)
+
+    def _load(self, name: str, default):
+        path = self._path(name)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+        return default
+
+    def data_version(self, dataset: str) -> Any:
+        if dataset == "vehicles":
+            return self.vehicles_version()
+        try:
+            stat = os.stat(self._path(DATASET_FILES[dataset]))
+            version = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            version = None
+        if dataset == "service_centers":
+            # Bookings (made by any worker) change slot availability
+            if self.shared_state:
+                return version, self.shared_state.data_version("service_centers")
+            return version, self._bookings().version()
+        return version
+
+    # ----- Vehicles -----
+
+    def get_vehicle(self, vehicle_id: str) -> Optional[Dict[str, Any]]:
+        return self.vehicles.get(vehicle_id)
+
+    def list_vehicles(self) -> List[Dict[str, Any]]:
+        return self.vehicles.all()
+
+    def vehicle_version(self, vehicle_id: str) -> Optional[int]:
+        return self.vehicles.record_version(vehicle_id)
+
+    def vehicle_versions(self) -> Dict[str, int]:
+        return self.vehicles.record_versions()
+
+    def vehicles_snapshot(self) -> Tuple[int, List[Dict[str, Any]]]:
+        return self.vehicles.snapshot()
+
+    # ----- Service centers and slots -----
+
+    def _bookings(self):
+        """Where bookings are recorded: the shared database, or this data directory's ledger"""
+        if self.shared_state:
+            return self.shared_state
+        if self._ledger is None:
+            with self._ledger_lock:
+                if self._ledger is None:
+                    self._ledger = BookingLedger(self._path('bookings.jsonl'), fsync=self.booking_fsync)
+        return self._ledger
+
+    def get_service_centers(self) -> Dict[str, Any]:
+        centers = self._load('service_centers.json', {})
+        booked = self._bookings().booked_slots()
+        for cid, center in centers.items():
+            center["available_slots"] = [slot for slot in center.get("available_slots", [])
+                                         if (cid, slot) not in booked]
+        return centers
+
+    def get_service_center(self, center_id: str) -> Optional[Dict[str, Any]]:
+        center = self._load('service_centers.json', {}).get(center_id)
+        if center:
+            booked = self._bookings().booked_slots(center_id)
+            center["available_slots"] = [slot for slot in center.get("available_slots", [])
+                                         if (center_id, slot) not in booked]
+        return center
+
+    def find_slots(self, center_id: str, start: float, end: float, limit: int = 1) -> List[str]:
+        center = self.get_service_center(center_id)
+        if not center:
+            return []
+        found = []
+        for slot in center.get("available_slots", []):
+            if start < parse_slot_epoch(slot) < end:
+                found.append(slot)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def _listed_slots(self, center_id: str) -> frozenset:
+        """Slots service_centers.json lists for a center (booked or not), re-read only when the file changes"""
+        try:
+            stat = os.stat(self._path('service_centers.json'))
+            version = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return frozenset()
+        if self._listed[0] != version:
+            centers = self._load('service_centers.json', {})
+            self._listed = (version, {cid: frozenset(center.get("available_slots", []))
+                                      for cid, center in centers.items()})
+        return self._listed[1].get(center_id, frozenset())
+
+    def reserve_slot(self, center_id: str, slot: str, vehicle_id: str, idempotency_key: str = None) -> bool:
+        if slot not in self._listed_slots(center_id):
+            return False
+        # A compare-and-set on (center, slot) and the key: the ledger's file lock, or the shared
+        # database's UNIQUE constraints, decide races between threads and workers
+        return self._bookings().record_booking(center_id, slot, vehicle_id, idempotency_key)
+
+    def reserve_slots(self, bookings: List[Tuple[str, str, str, Optional[str]]]) -> List[bool]:
+        listed = [slot in self._listed_slots(center_id) for center_id, slot, _, _ in bookings]
+        recorded = iter(self._bookings().record_bookings([b for b, ok in zip(bookings, listed) if ok]))
+        return [ok and next(recorded) for ok in listed]
+
+    def get_booking(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        return self._bookings().get_booking(idempotency_key)
+
+    def booked_slots(self, center_id: str = None) -> set:
+        return self._bookings().booked_slots(center_id)
+
+    # ----- Maintenance and manufacturing data -----
+
+    def get_maintenance_history(self, vehicle_id: str = None) -> List[Dict[str, Any]]:
+        history = self._load('maintenance_history.json', [])
+        if vehicle_id:
+            return [record for record in history if record.get("vehicle_id") == vehicle_id]
+        return history
+
+    def append_maintenance_history(self, records: List[Dict[str, Any]]):
+        with self._history_lock:
+            history = self._load('maintenance_history.json', []) + list(records)
+            path = self._path('maintenance_history.json')
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(history, f, indent=2)
+            os.replace(tmp_path, path)
+
+    def maintenance_history_changes(self, cursor: Any = None) -> Tuple[Any, List[Dict[str, Any]], bool]:
+        # The file is rewritten as a whole, so an append is recognized by the
+        # previously seen records still being an unchanged prefix
+        with self._history_lock:
+            try:
+                stat = os.stat(self._path('maintenance_history.json'))
+                version = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                version = None
+            if version != self._history[0]:
+                history = self._load('maintenance_history.json', [])
+                seen = self._history[2]
+                epoch = self._history[1]
+                if len(history) < len(seen) or history[:len(seen)] != seen:
+                    epoch += 1
+                self._history = (version, epoch, history)
+            _, epoch, history = self._history
+        if cursor is None or cursor[0] != epoch:
+            return (epoch, len(history)), history, True
+        return (epoch, len(history)), history[cursor[1]:], False
+
+    def get_rca_capa_data(self) -> Dict[str, Any]:
+        return self._load('rca_capa_data.json', {})
+
+    # ----- UEBA security logs -----
+
+    def _logs(self) -> SegmentedAuditLog:
+        if self._audit_log is None:
+            with self._audit_log_lock:
+                if self._audit_log is None:
+                    # The older single-file logs are migrated into segments the first time
+                    self._audit_log = SegmentedAuditLog(
+                        self._path('security_logs'),
+                        legacy_paths=(self._path('security_logs.jsonl'), self._path('security_logs.json')),
+                        **self._log_options
+                    )
+        return self._audit_log
+
+    def load_logs(self) -> List[Dict[str, Any]]:
+        if self.shared_state:
+            return self.shared_state.load_logs()
+        return list(self._logs().iter_all())
+
+    def append_log(self, entry: Dict[str, Any]):
+        if self.shared_state:
+            self.shared_state.append_log(entry)
+        else:
+            self._logs().append(entry)
+
+    def query_logs(self, agent: str = None, action: str = None, success: bool = None, since: str = None,
+                   until: str = None, cursor: str = None, limit: Optional[int] = 50) -> Dict[str, Any]:
+        if self.shared_state:
+            return self.shared_state.query_logs(agent, action, success, since, until, cursor, limit)
+        return self._logs().query(agent, action, success, since, until, cursor, limit)
+
+    def count_recent_logs(self, agent: str, since: str, action: str = None) -> int:
+        if self.shared_state:
+            return self.shared_state.count_recent_logs(agent, since, action)
+        return super().count_recent_logs(agent, since, action)
+
+    def log_stats(self) -> Dict[str, int]:
+        if self.shared_state:
+            return self.shared_state.log_stats()
+        return self._logs().stats()
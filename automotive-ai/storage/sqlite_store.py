@@ -0,0 +1,495 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+from storage.base import StorageBackend, parse_slot_epoch
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('vehicles_version', 0);
+
+CREATE TABLE IF NOT EXISTS vehicles (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TRIGGER IF NOT EXISTS vehicles_ins AFTER INSERT ON vehicles BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'vehicles_version';
+END;
+CREATE TRIGGER IF NOT EXISTS vehicles_upd AFTER UPDATE ON vehicles BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'vehicles_version';
+END;
+CREATE TRIGGER IF NOT EXISTS vehicles_del AFTER DELETE ON vehicles BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'vehicles_version';
+END;
+
+CREATE TABLE IF NOT EXISTS service_centers (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS slots (
+    center_id TEXT NOT NULL,
+    slot_time TEXT NOT NULL,
+    slot_epoch REAL NOT NULL,
+    PRIMARY KEY (center_id, slot_time)
+);
+CREATE INDEX IF NOT EXISTS idx_slots_center_epoch ON slots (center_id, slot_epoch);
+
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    center_id TEXT NOT NULL,
+    slot_time TEXT NOT NULL,
+    vehicle_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    idempotency_key TEXT,
+    UNIQUE (center_id, slot_time)
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_vehicle ON bookings (vehicle_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_key ON bookings (idempotency_key);
+
+-- Change counters for service centers (incl. slot availability) and documents
+INSERT OR IGNORE INTO meta (key, value) VALUES ('service_centers_version', 0);
+CREATE TRIGGER IF NOT EXISTS service_centers_chg_ins AFTER INSERT ON service_centers BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'service_centers_version';
+END;
+CREATE TRIGGER IF NOT EXISTS service_centers_chg_upd AFTER UPDATE ON service_centers BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'service_centers_version';
+END;
+CREATE TRIGGER IF NOT EXISTS service_centers_chg_del AFTER DELETE ON service_centers BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'service_centers_version';
+END;
+CREATE TRIGGER IF NOT EXISTS slots_chg_ins AFTER INSERT ON slots BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'service_centers_version';
+END;
+CREATE TRIGGER IF NOT EXISTS slots_chg_del AFTER DELETE ON slots BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'service_centers_version';
+END;
+CREATE TRIGGER IF NOT EXISTS bookings_chg_ins AFTER INSERT ON bookings BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'service_centers_version';
+END;
+
+CREATE TABLE IF NOT EXISTS maintenance_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vehicle_id TEXT,
+    date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_vehicle ON maintenance_history (vehicle_id, date);
+-- Bumped whenever history is rewritten rather than appended to (see maintenance_history_changes)
+INSERT OR IGNORE INTO meta (key, value) VALUES ('maintenance_history_epoch', 0);
+
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('documents_version', 0);
+CREATE TRIGGER IF NOT EXISTS documents_chg_ins AFTER INSERT ON documents BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'documents_version';
+END;
+CREATE TRIGGER IF NOT EXISTS documents_chg_upd AFTER UPDATE ON documents BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'documents_version';
+END;
+
+CREATE TABLE IF NOT EXISTS security_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    action TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON security_logs (timestamp);
+CREATE INDEX IF NOT EXISTS idx_logs_agent ON security_logs (agent, timestamp);
+-- Running totals for the security score; seeded from existing rows the first time
+INSERT OR IGNORE INTO meta (key, value) SELECT 'log_total', COUNT(*) FROM security_logs;
+INSERT OR IGNORE INTO meta (key, value) SELECT 'log_failures', COUNT(*) FROM security_logs WHERE success = 0;
+CREATE TRIGGER IF NOT EXISTS security_logs_ins AFTER INSERT ON security_logs BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'log_total';
+    UPDATE meta SET value = value + (NEW.success = 0) WHERE key = 'log_failures';
+END;
+CREATE TRIGGER IF NOT EXISTS security_logs_del AFTER DELETE ON security_logs BEGIN
+    UPDATE meta SET value = value - 1 WHERE key = 'log_total';
+    UPDATE meta SET value = value - (OLD.success = 0) WHERE key = 'log_failures';
+END;
+"""
+
+DATASET_VERSION_KEYS = {
+    "vehicles": "vehicles_version",
+    "service_centers": "service_centers_version",
+    "rca_capa": "documents_version"
+}
+
+class SQLiteStorage(StorageBackend):
+    """Storage backed by a local SQLite database in WAL mode.
+
+    Each thread gets its own connection; WAL lets readers proceed while a
+    writer commits, so request handlers never block each other on reads.
+    Writes take SQLite's file lock, so several worker processes can share
+    one database safely.
+    """
+
+    shared = True
+
+    def __init__(self, db_path: str = 'data/automotive.db'):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._vehicles_cache = (None, [])  # (version, vehicles) for list_vehicles/snapshot
+        self._cache_lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        # Databases created before per-vehicle versions existed get the column added in place
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'vehicles'").fetchone():
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(vehicles)")]
+            if "version" not in columns:
+                conn.execute("ALTER TABLE vehicles ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        # ... and bookings made before idempotency keys get a NULL key
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bookings'").fetchone():
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(bookings)")]
+            if "idempotency_key" not in columns:
+                conn.execute("ALTER TABLE bookings ADD COLUMN idempotency_key TEXT")
+        conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def data_version(self, dataset: str) -> Any:
+        key = DATASET_VERSION_KEYS[dataset]
+        return self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0]
+
+    # ----- Vehicles -----
+
+    def get_vehicle(self, vehicle_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT data FROM vehicles WHERE id = ?", (vehicle_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_vehicles(self) -> List[Dict[str, Any]]:
+        return self.vehicles_snapshot()[1]
+
+    def vehicle_version(self, vehicle_id: str) -> Optional[int]:
+        row = self._conn().execute("SELECT version FROM vehicles WHERE id = ?", (vehicle_id,)).fetchone()
+        return row[0] if row else None
+
+    def vehicle_versions(self) -> Dict[str, int]:
+        return dict(self._conn().execute("SELECT id, version FROM vehicles").fetchall())
+
+    def vehicles_version(self) -> int:
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'vehicles_version'").fetchone()[0]
+
+    def vehicles_snapshot(self) -> Tuple[int, List[Dict[str, Any]]]:
+        version = self.vehicles_version()
+        with self._cache_lock:
+            if self._vehicles_cache[0] == version:
+                return self._vehicles_cache
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            version = conn.execute("SELECT value FROM meta WHERE key = 'vehicles_version'").fetchone()[0]
+            vehicles = [json.loads(row[0]) for row in conn.execute("SELECT data FROM vehicles ORDER BY rowid")]
+        finally:
+            conn.execute("COMMIT")
+        with self._cache_lock:
+            self._vehicles_cache = (version, vehicles)
+        return version, vehicles
+
+    def upsert_vehicles(self, vehicles: List[Dict[str, Any]]):
+        conn = self._conn()
+        with self._transaction(conn):
+            conn.executemany(
+                "INSERT INTO vehicles (id, data) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, version = version + 1 "
+                "WHERE data != excluded.data",
+                [(v["id"], json.dumps(v)) for v in vehicles]
+            )
+
+    # ----- Service centers and slots -----
+
+    def _center_with_slots(self, conn: sqlite3.Connection, center_id: str, data: str) -> Dict[str, Any]:
+        center = json.loads(data)
+        center["available_slots"] = [row[0] for row in conn.execute(
+            "SELECT slot_time FROM slots WHERE center_id = ? ORDER BY slot_epoch", (center_id,)
+        )]
+        return center
+
+    def get_service_centers(self) -> Dict[str, Any]:
+        conn = self._conn()
+        rows = conn.execute("SELECT id, data FROM service_centers ORDER BY rowid").fetchall()
+        return {cid: self._center_with_slots(conn, cid, data) for cid, data in rows}
+
+    def get_service_center(self, center_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        row = conn.execute("SELECT data FROM service_centers WHERE id = ?", (center_id,)).fetchone()
+        return self._center_with_slots(conn, center_id, row[0]) if row else None
+
+    def find_slots(self, center_id: str, start: float, end: float, limit: int = 1) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT slot_time FROM slots WHERE center_id = ? AND slot_epoch > ? AND slot_epoch < ? "
+            "ORDER BY slot_epoch LIMIT ?",
+            (center_id, start, end, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def reserve_slot(self, center_id: str, slot: str, vehicle_id: str, idempotency_key: str = None) -> bool:
+        conn = self._conn()
+        try:
+            with self._transaction(conn):
+                removed = conn.execute(
+                    "DELETE FROM slots WHERE center_id = ? AND slot_time = ?", (center_id, slot)
+                ).rowcount
+                if not removed:
+                    return False
+                self._insert_booking(conn, center_id, slot, vehicle_id, idempotency_key)
+        except sqlite3.IntegrityError:
+            return False  # the idempotency key was used by another booking; the slot stays free
+        return True
+
+    def reserve_slots(self, bookings: List[Tuple[str, str, str, Optional[str]]]) -> List[bool]:
+        return self._book_all(bookings, remove_slots=True)
+
+    def record_booking(self, center_id: str, slot: str, vehicle_id: str, idempotency_key: str = None) -> bool:
+        """Record a booking for a slot listed elsewhere (the JSON files); False if already booked"""
+        try:
+            self._insert_booking(self._conn(), center_id, slot, vehicle_id, idempotency_key)
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def record_bookings(self, bookings: List[Tuple[str, str, str, Optional[str]]]) -> List[bool]:
+        """record_booking() for many (center_id, slot, vehicle_id, idempotency_key), in one transaction"""
+        return self._book_all(bookings, remove_slots=False)
+
+    def _book_all(self, bookings: List[Tuple[str, str, str, Optional[str]]], remove_slots: bool) -> List[bool]:
+        conn = self._conn()
+        results = []
+        with self._transaction(conn):
+            for center_id, slot, vehicle_id, idempotency_key in bookings:
+                # A savepoint per booking: a refused one is undone without losing the rest
+                conn.execute("SAVEPOINT booking")
+                try:
+                    booked = not remove_slots or conn.execute(
+                        "DELETE FROM slots WHERE center_id = ? AND slot_time = ?", (center_id, slot)
+                    ).rowcount > 0
+                    if booked:
+                        self._insert_booking(conn, center_id, slot, vehicle_id, idempotency_key)
+                except sqlite3.IntegrityError:
+                    conn.execute("ROLLBACK TO booking")
+                    booked = False
+                conn.execute("RELEASE booking")
+                results.append(booked)
+        return results
+
+    def _insert_booking(self, conn: sqlite3.Connection, center_id: str, slot: str, vehicle_id: str,
+                        idempotency_key: Optional[str]):
+        conn.execute(
+            "INSERT INTO bookings (center_id, slot_time, vehicle_id, created_at, idempotency_key) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (center_id, slot, vehicle_id, datetime.now().isoformat(), idempotency_key)
+        )
+
+    def get_booking(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT center_id, slot_time, vehicle_id, idempotency_key, created_at FROM bookings "
+            "WHERE idempotency_key = ?", (idempotency_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("center_id", "slot", "vehicle_id", "idempotency_key", "created_at"), row))
+
+    def booked_slots(self, center_id: str = None) -> set:
+        """{(center_id, slot_time)} of every booking, optionally for one center"""
+        if center_id:
+            rows = self._conn().execute("SELECT center_id, slot_time FROM bookings WHERE center_id = ?", (center_id,))
+        else:
+            rows = self._conn().execute("SELECT center_id, slot_time FROM bookings")
+        return set(rows)
+
+    def replace_service_centers(self, centers: Dict[str, Any]):
+        conn = self._conn()
+        with self._transaction(conn):
+            conn.execute("DELETE FROM service_centers")
+            conn.execute("DELETE FROM slots")
+            for cid, center in centers.items():
+                info = {k: v for k, v in center.items() if k != "available_slots"}
+                conn.execute("INSERT INTO service_centers (id, data) VALUES (?, ?)", (cid, json.dumps(info)))
+                # Slots that already have a booking stay unavailable across re-imports
+                conn.executemany(
+                    "INSERT OR IGNORE INTO slots (center_id, slot_time, slot_epoch) SELECT ?, ?, ? "
+                    "WHERE NOT EXISTS (SELECT 1 FROM bookings WHERE center_id = ? AND slot_time = ?)",
+                    [(cid, slot, parse_slot_epoch(slot), cid, slot) for slot in center.get("available_slots", [])]
+                )
+
+    # ----- Maintenance and manufacturing data -----
+
+    def get_maintenance_history(self, vehicle_id: str = None) -> List[Dict[str, Any]]:
+        if vehicle_id:
+            rows = self._conn().execute(
+                "SELECT data FROM maintenance_history WHERE vehicle_id = ? ORDER BY id", (vehicle_id,)
+            )
+        else:
+            rows = self._conn().execute("SELECT data FROM maintenance_history ORDER BY id")
+        return [json.loads(row[0]) for row in rows]
+
+    def replace_maintenance_history(self, history: List[Dict[str, Any]]):
+        conn = self._conn()
+        with self._transaction(conn):
+            conn.execute("DELETE FROM maintenance_history")
+            # Set here rather than by a trigger: a row trigger would fire once per deleted record
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'maintenance_history_epoch'")
+            self._insert_history(conn, history)
+
+    def append_maintenance_history(self, records: List[Dict[str, Any]]):
+        conn = self._conn()
+        with self._transaction(conn):
+            self._insert_history(conn, records)
+
+    def _insert_history(self, conn: sqlite3.Connection, records: List[Dict[str, Any]]):
+        conn.executemany(
+            "INSERT INTO maintenance_history (vehicle_id, date, data) VALUES (?, ?, ?)",
+            [(r.get("vehicle_id"), r.get("date"), json.dumps(r)) for r in records]
+        )
+
+    def maintenance_history_changes(self, cursor: Any = None) -> Tuple[Any, List[Dict[str, Any]], bool]:
+        conn = self._conn()
+        # One read transaction, so the epoch and the rows come from the same snapshot
+        conn.execute("BEGIN")
+        try:
+            epoch = conn.execute("SELECT value FROM meta WHERE key = 'maintenance_history_epoch'").fetchone()[0]
+            reset = cursor is None or cursor[0] != epoch
+            # Row ids only grow (AUTOINCREMENT), so new records are the ones past the cursor
+            rows = conn.execute("SELECT id, data FROM maintenance_history WHERE id > ? ORDER BY id",
+                                (0 if reset else cursor[1],)).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        last_id = rows[-1][0] if rows else (0 if reset else cursor[1])
+        return (epoch, last_id), [json.loads(data) for _, data in rows], reset
+
+    def get_rca_capa_data(self) -> Dict[str, Any]:
+        row = self._conn().execute("SELECT data FROM documents WHERE name = 'rca_capa'").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def replace_rca_capa_data(self, rca_data: Dict[str, Any]):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO documents (name, data) VALUES ('rca_capa', ?)", (json.dumps(rca_data),)
+        )
+
+    # ----- UEBA security logs -----
+
+    def load_logs(self) -> List[Dict[str, Any]]:
+        rows = self._conn().execute("SELECT timestamp, agent, action, data, success FROM security_logs ORDER BY id")
+        return [self._log_from_row(row) for row in rows]
+
+    def append_log(self, entry: Dict[str, Any]):
+        self.append_logs([entry])
+
+    def replace_logs(self, entries: List[Dict[str, Any]]):
+        conn = self._conn()
+        # One transaction, so readers never see the table emptied but not yet refilled
+        with self._transaction(conn):
+            conn.execute("DELETE FROM security_logs")
+            self._insert_logs(conn, entries)
+
+    def append_logs(self, entries: List[Dict[str, Any]]):
+        conn = self._conn()
+        with self._transaction(conn):
+            self._insert_logs(conn, entries)
+
+    def _insert_logs(self, conn: sqlite3.Connection, entries: List[Dict[str, Any]]):
+        conn.executemany(
+            "INSERT INTO security_logs (timestamp, agent, action, success, data) VALUES (?, ?, ?, ?, ?)",
+            [(e["timestamp"], e["agent"], e["action"], int(bool(e.get("success", True))),
+              json.dumps(e.get("data") or {})) for e in entries]
+        )
+
+    def query_logs(self, agent: str = None, action: str = None, success: bool = None, since: str = None,
+                   until: str = None, cursor: str = None, limit: Optional[int] = 50) -> Dict[str, Any]:
+        clauses, params = [], []
+        if cursor:
+            try:
+                clauses.append("id < ?")
+                params.append(int(cursor))
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {cursor}")
+        for column, value in (("agent", agent), ("action", action)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if success is not None:
+            clauses.append("success = ?")
+            params.append(int(success))
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+
+        sql = "SELECT id, timestamp, agent, action, data, success FROM security_logs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        rows = self._conn().execute(sql, params).fetchall()
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = str(rows[-1][0])
+        return {"logs": [self._log_from_row(row[1:]) for row in rows], "next_cursor": next_cursor}
+
+    def count_recent_logs(self, agent: str, since: str, action: str = None) -> int:
+        # The same entries as counts_toward_rate_limit()
+        sql = ("SELECT COUNT(*) FROM security_logs WHERE agent = ? AND timestamp >= ? AND success = 1 "
+               "AND json_extract(data, '$.fleet_authorized') IS NULL")
+        params = (agent, since)
+        if action is not None:
+            sql += " AND action = ?"
+            params += (action,)
+        return self._conn().execute(sql, params).fetchone()[0]
+
+    def log_stats(self) -> Dict[str, int]:
+        rows = dict(self._conn().execute("SELECT key, value FROM meta WHERE key IN ('log_total', 'log_failures')"))
+        return {"total": rows.get("log_total", 0), "failures": rows.get("log_failures", 0)}
+
+    def _log_from_row(self, row) -> Dict[str, Any]:
+        timestamp, agent, action, data, success = row
+        return {
+            "timestamp": timestamp,
+            "agent": agent,
+            "action": action,
+            "data": json.loads(data),
+            "success": bool(success)
+        }
+
+    # ----- Helpers -----
+
+    def _transaction(self, conn: sqlite3.Connection):
+        return _Transaction(conn)
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK around a block (connections run in autocommit mode)"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+# Offline stand-ins for the LLM and text-to-speech services
+os.environ.update(LLM_BACKEND="local", LOCAL_LLM_LATENCY_SECONDS="0", LOCAL_LLM_TOKENS_PER_SECOND="0",
+                  VOICE_BACKEND="local", LOCAL_TTS_LATENCY_SECONDS="0",
+                  VOICE_CACHE_DIR=tempfile.mkdtemp(prefix="voice-cache-"))
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A data directory with empty datasets; tests overwrite the files they need with write_json()"""
+    for name, empty in (("vehicles.json", []), ("service_centers.json", {}),
+                        ("maintenance_history.json", []), ("rca_capa_data.json", {})):
+        write_json(str(tmp_path), name, empty)
+    return str(tmp_path)
+
+def write_json(directory: str, name: str, data):
+    with open(os.path.join(directory, name), "w") as f:
+        json.dump(data, f)
+
+@pytest.fixture
+def master(data_dir, monkeypatch):
+    """A MasterAgent on data_dir; write the datasets a test needs before first using it"""
+    from agents.master_agent import MasterAgent
+    monkeypatch.setenv("DATA_DIR", data_dir)
+    monkeypatch.setenv("STORAGE_BACKEND", "json")
+    monkeypatch.setenv("JOB_QUEUE_PATH", os.path.join(data_dir, "jobs.db"))
+    agent = MasterAgent()
+    yield agent
+    agent.jobs.stop()
@@ -0,0 +1,61 @@
+import os
+
+from utils import audit_log
+from utils.audit_log import SegmentedAuditLog, FSYNC_FLUSH
+
+def entry(i: int) -> dict:
+    return {"timestamp": f"2026-01-01T00:00:{i:02d}", "agent": "DataAnalysisAgent", "action": "analyze", "success": True}
+
+def segment_path(directory) -> str:
+    return os.path.join(str(directory), "segment-000001.jsonl")
+
+def test_torn_line_is_cut_off_on_recovery(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path / "logs"), batch_size=1)
+    for i in range(3):
+        log.append(entry(i))
+    log.close()
+    path = segment_path(tmp_path / "logs")
+    with open(path, "ab") as f:
+        f.write(b'{"timestamp":"2026-01-01T00:00:03","agent":"Da')  # crash mid-write
+    log._process_lock.close()
+
+    log = SegmentedAuditLog(str(tmp_path / "logs"), batch_size=1)
+    assert log.stats()["total"] == 3
+    log.append(entry(4))
+    log.flush()
+
+    with open(path, "rb") as f:
+        assert f.read().count(b"\n") == 4
+    assert [e["timestamp"][-2:] for e in log.iter_all()] == ["00", "01", "02", "04"]
+    assert len(log.query(limit=None)["logs"]) == 4
+
+def test_entries_after_an_invalid_line_are_read(tmp_path):
+    directory = tmp_path / "logs"
+    directory.mkdir()
+    with open(segment_path(directory), "w") as f:
+        f.write('{"timestamp":"2026-01-01T00:00:00","agent":"A","action":"x"}\n')
+        f.write("not json\n")
+        f.write('{"timestamp":"2026-01-01T00:00:02","agent":"A","action":"x"}\n')
+
+    log = SegmentedAuditLog(str(directory))
+    assert log.stats()["total"] == 2
+    page = log.query(limit=1)
+    assert page["logs"][0]["timestamp"].endswith("02")
+    # Line numbers in cursors count the invalid line too
+    assert page["next_cursor"] == "1:2"
+    assert log.query(cursor=page["next_cursor"])["logs"][0]["timestamp"].endswith("00")
+
+def test_queries_see_buffered_entries_without_fsync(tmp_path, monkeypatch):
+    log = SegmentedAuditLog(str(tmp_path / "logs"), batch_size=2, flush_interval_ms=60000, fsync=FSYNC_FLUSH)
+    for i in range(3):
+        log.append(entry(i))  # two written, one still buffered
+
+    fsyncs = []
+    monkeypatch.setattr(audit_log.os, "fsync", fsyncs.append)
+    page = log.query(limit=None)
+    assert [e["timestamp"][-2:] for e in page["logs"]] == ["02", "01", "00"]
+    assert len(list(log.iter_all())) == 3
+    assert fsyncs == []
+    with open(segment_path(tmp_path / "logs"), "rb") as f:
+        assert f.read().count(b"\n") == 2
+    log.close()
@@ -0,0 +1,104 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import write_json
+from storage.booking_ledger import BookingLedger
+from storage.json_store import JSONStorage
+from storage.sqlite_store import SQLiteStorage
+
+SLOTS = [f"2026-03-0{day}T{hour:02d}:00:00" for day in range(1, 4) for hour in range(9, 13)]
+CENTERS = {"SC001": {"name": "AutoCare Pune", "location": "Pune", "capacity": 15, "available_slots": SLOTS}}
+
+def race(reserve, vehicles: int = 8) -> dict:
+    """Every vehicle tries every slot at once; {slot: vehicle} of the bookings that succeeded"""
+    won, lock = {}, threading.Lock()
+    start = threading.Barrier(vehicles)
+
+    def book(vehicle_id: str):
+        start.wait()
+        for slot in SLOTS:
+            if reserve("SC001", slot, vehicle_id):
+                with lock:
+                    assert slot not in won, f"{slot} booked twice"
+                    won[slot] = vehicle_id
+
+    threads = [threading.Thread(target=book, args=(f"VEH{i:03d}",)) for i in range(vehicles)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return won
+
+def test_ledger_is_a_compare_and_set(tmp_path):
+    ledger = BookingLedger(str(tmp_path / "bookings.jsonl"))
+    assert ledger.record_booking("SC001", SLOTS[0], "VEH001")
+    assert not ledger.record_booking("SC001", SLOTS[0], "VEH002")
+    assert ledger.record_bookings([("SC001", SLOTS[1], "VEH002", None), ("SC001", SLOTS[1], "VEH003", None)]) == [True, False]
+    assert ledger.booked_slots() == {("SC001", SLOTS[0]), ("SC001", SLOTS[1])}
+
+def test_idempotency_key_replays_the_first_booking(tmp_path):
+    ledger = BookingLedger(str(tmp_path / "bookings.jsonl"))
+    assert ledger.record_booking("SC001", SLOTS[0], "VEH001", "retry-1")
+    assert not ledger.record_booking("SC001", SLOTS[1], "VEH001", "retry-1")
+    ledger.close()
+
+    reopened = BookingLedger(str(tmp_path / "bookings.jsonl"))
+    assert reopened.get_booking("retry-1")["slot"] == SLOTS[0]
+    assert reopened.booked_slots() == {("SC001", SLOTS[0])}
+
+def test_ledgers_sharing_a_file_never_double_book(tmp_path):
+    # Two ledgers on one file stand in for two worker processes
+    ledgers = [BookingLedger(str(tmp_path / "bookings.jsonl"), fsync="never") for _ in range(2)]
+    won = race(lambda center_id, slot, vehicle_id: ledgers[int(vehicle_id[-1]) % 2].record_booking(
+        center_id, slot, vehicle_id))
+    assert sorted(won) == sorted(SLOTS)
+    assert ledgers[0].booked_slots() == ledgers[1].booked_slots()
+
+def test_torn_ledger_line_does_not_swallow_the_next_booking(tmp_path):
+    path = tmp_path / "bookings.jsonl"
+    BookingLedger(str(path)).record_booking("SC001", SLOTS[0], "VEH001")
+    with open(path, "ab") as f:
+        f.write(b'{"center_id": "SC001", "sl')  # crash mid-write
+    ledger = BookingLedger(str(path))
+    assert ledger.record_booking("SC001", SLOTS[1], "VEH002")
+    assert BookingLedger(str(path)).booked_slots() == {("SC001", SLOTS[0]), ("SC001", SLOTS[1])}
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_concurrent_reservations_never_double_book(backend, data_dir, tmp_path):
+    write_json(data_dir, "service_centers.json", CENTERS)
+    if backend == "json":
+        store = JSONStorage(data_dir, booking_fsync="never")
+    else:
+        store = SQLiteStorage(str(tmp_path / "automotive.db"))
+        store.replace_service_centers(CENTERS)
+    won = race(store.reserve_slot)
+    assert sorted(won) == sorted(SLOTS)
+    assert store.get_service_center("SC001")["available_slots"] == []
+
+@pytest.mark.parametrize("free_slots", [1, 0])
+def test_same_key_requests_agree_when_slots_run_out(master, data_dir, free_slots):
+    # Only one slot (or none: it was taken by another vehicle) inside the urgency window
+    write_json(data_dir, "vehicles.json", [{"id": "VEH001", "preferred_service_center": "SC001"}])
+    soon = (datetime.now() + timedelta(hours=2)).replace(minute=0, second=0, microsecond=0).isoformat()
+    write_json(data_dir, "service_centers.json",
+               {"SC001": {"name": "AutoCare Pune", "location": "Pune", "available_slots": [soon]}})
+    if not free_slots:
+        assert master.store.reserve_slot("SC001", soon, "VEH999")
+
+    results = []
+    start = threading.Barrier(8)
+
+    def book():
+        start.wait()
+        results.append(master.scheduling_agent.book_appointment("VEH001", {"risk_score": 90}, "retry-1"))
+
+    threads = [threading.Thread(target=book) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {result["appointment_booked"] for result in results} == {bool(free_slots)}
+    if free_slots:
+        assert {result["booking_details"]["date_time"] for result in results} == {soon}
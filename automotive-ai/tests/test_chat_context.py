@@ -0,0 +1,31 @@
+from conftest import write_json
+from test_master_agent import VEHICLE
+
+def test_cached_vehicle_section_is_still_checked(master, data_dir, monkeypatch):
+    import main
+    monkeypatch.setattr(main, "master_agent", master)
+    monkeypatch.setattr(main, "chat_context_cache", main.ChatContextCache(max_entries=8))
+    write_json(data_dir, "vehicles.json", [VEHICLE])
+
+    first = main._gather_chat_context("VEH001")["vehicle"]
+    assert first[0][0] == "Currently Selected Vehicle:"
+    assert main._gather_chat_context("VEH001")["vehicle"] == first
+    logged = [entry["action"] for entry in master.ueba.query_logs(limit=None)["logs"]]
+    assert logged.count("read_vehicle_data") == 2
+    assert logged.count("predict_failures") == 2
+
+    verify_action = master.ueba.verify_action
+    master.ueba.verify_action = lambda agent, action, data=None: (
+        {"allowed": False, "anomaly": {"message": f"{agent} denied"}} if agent == "Diagnosis"
+        else verify_action(agent, action, data))
+    assert main._gather_chat_context("VEH001")["vehicle"] == []
+
+def test_first_chat_waits_for_the_index_build(master, data_dir, monkeypatch):
+    import main
+    monkeypatch.setattr(main, "master_agent", master)
+    write_json(data_dir, "maintenance_history.json", [{"vehicle_id": "VEH001", "component": "brake pads"}])
+
+    assert not master.knowledge_index.built
+    snippets = main._retrieve_chat_snippets(main.ChatRequest(message="brake pads worn"))
+    assert master.knowledge_index.built
+    assert snippets[0] == "Relevant maintenance records and known defects:" and len(snippets) == 2
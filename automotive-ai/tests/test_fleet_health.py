@@ -0,0 +1,41 @@
+import random
+
+from agents.data_analysis import DataAnalysisAgent
+from conftest import write_json
+from storage.json_store import JSONStorage
+from utils.ueba_monitor import UEBAMonitor
+
+def random_vehicle(rng: random.Random, i: int) -> dict:
+    sensors = {
+        "oil_pressure": rng.uniform(20, 50),
+        "engine_temp": rng.uniform(85, 115),
+        "brake_pad_thickness": rng.uniform(1, 8),
+        "battery_voltage": rng.uniform(11, 13),
+        # Some vehicles report no tires, some more than four (trailers, spares)
+        "tire_pressure": [rng.uniform(24, 38) for _ in range(rng.choice([0, 2, 4, 4, 5, 6]))]
+    }
+    for name in ("oil_pressure", "engine_temp"):
+        if rng.random() < 0.1:
+            del sensors[name]  # missing readings fall back to SENSOR_DEFAULTS
+    return {"id": f"VEH{i:05d}", "sensors": sensors}
+
+def test_fleet_scores_match_per_vehicle_scores(data_dir):
+    rng = random.Random(5)
+    vehicles = [random_vehicle(rng, i) for i in range(2000)]
+    write_json(data_dir, "vehicles.json", vehicles)
+    store = JSONStorage(data_dir)
+    agent = DataAnalysisAgent(UEBAMonitor(store), store)
+
+    vehicle_ids, health_scores = agent.fleet_health_scores()
+
+    assert vehicle_ids == [v["id"] for v in vehicles]
+    assert health_scores.tolist() == [agent.vehicle_state(v)["health_score"] for v in vehicles]
+
+def test_more_than_four_tires_all_count(data_dir):
+    write_json(data_dir, "vehicles.json", [{"id": "VEH1", "sensors": {"tire_pressure": [32, 32, 32, 32, 20, 40]}}])
+    store = JSONStorage(data_dir)
+    agent = DataAnalysisAgent(UEBAMonitor(store), store)
+
+    _, health_scores = agent.fleet_health_scores()
+
+    assert health_scores.tolist() == [agent.vehicle_state(store.get_vehicle("VEH1"))["health_score"]] == [70]
@@ -0,0 +1,52 @@
+from collections import Counter
+
+from utils.fleet_planner import ANY_CENTER, PREFERRED_CENTER, SAME_LOCATION, FleetPlanner
+
+DAY = 86400
+CENTERS = {"A": {"location": "Pune"}, "B": {"location": "Pune"}, "C": {"location": "Delhi"}}
+
+def slots(*epochs) -> tuple:
+    """(epochs, ISO slots) with one slot per day, day number as the date"""
+    return list(epochs), [f"2026-01-{int(e // DAY) + 1:02d}T09:00:00" for e in epochs]
+
+def vehicle(vid: str, deadline: float, risk: int = 50, preferred: str = "A", location: str = "Pune") -> dict:
+    return {"vehicle_id": vid, "risk_score": risk, "deadline": deadline, "preferred_center": preferred,
+            "location": location}
+
+def test_urgent_vehicle_is_not_booked_behind_routine_ones():
+    # One slot before the urgent deadline has passed, then one a day
+    planner = FleetPlanner(CENTERS, {"A": slots(2 * DAY, 3 * DAY, 4 * DAY)})
+    routine = [vehicle(f"R{i}", 7 * DAY, risk=25) for i in range(2)]
+    urgent = vehicle("U", 1 * DAY, risk=90)
+    assignments, unassigned = planner.plan(routine + [urgent])
+
+    by_id = {a["vehicle_id"]: a for a in assignments}
+    assert not unassigned
+    assert by_id["U"]["slot_epoch"] == 2 * DAY and not by_id["U"]["within_deadline"]
+    assert all(by_id[v["vehicle_id"]]["within_deadline"] for v in routine)
+
+def test_vehicles_prefer_their_center_then_their_city():
+    planner = FleetPlanner(CENTERS, {"A": slots(1 * DAY), "B": slots(2 * DAY), "C": slots(0)})
+    assignments, _ = planner.plan([vehicle("V1", 3 * DAY), vehicle("V2", 3 * DAY, risk=40),
+                                   vehicle("V3", 3 * DAY, risk=30)])
+    matches = {a["vehicle_id"]: (a["center_id"], a["center_match"]) for a in assignments}
+    assert matches == {"V1": ("A", PREFERRED_CENTER), "V2": ("B", SAME_LOCATION), "V3": ("C", ANY_CENTER)}
+
+def test_capacity_caps_vehicles_per_day():
+    centers = {"A": {"location": "Pune", "capacity": 1}}
+    epochs = [0, 3600, DAY, DAY + 3600]
+    planner = FleetPlanner(centers, {"A": (epochs, ["2026-01-01T09:00:00", "2026-01-01T10:00:00",
+                                                   "2026-01-02T09:00:00", "2026-01-02T10:00:00"])})
+    assignments, unassigned = planner.plan([vehicle(f"V{i}", 7 * DAY) for i in range(3)])
+    assert sorted(a["slot"] for a in assignments) == ["2026-01-01T09:00:00", "2026-01-02T09:00:00"]
+    assert [v["vehicle_id"] for v in unassigned] == ["V2"]
+
+def test_capacity_counts_existing_bookings():
+    centers = {"A": {"location": "Pune", "capacity": 2}}
+    epochs = [0, 3600, DAY]
+    planner = FleetPlanner(centers, {"A": (epochs, ["2026-01-01T09:00:00", "2026-01-01T10:00:00",
+                                                   "2026-01-02T09:00:00"])},
+                           {"A": Counter({"2026-01-01": 1})})
+    assignments, unassigned = planner.plan([vehicle(f"V{i}", 7 * DAY) for i in range(3)])
+    assert sorted(a["slot"] for a in assignments) == ["2026-01-01T09:00:00", "2026-01-02T09:00:00"]
+    assert [v["vehicle_id"] for v in unassigned] == ["V2"]
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from utils.llm_cache import CachedLLMClient, LLMResponseCache, prompt_key
+from utils.local_llm import LocalLLM
+
+MESSAGES = [{"role": "system", "content": "You are a service advisor."},
+            {"role": "user", "content": "When should I replace my brake pads?"}]
+
+def content(response) -> str:
+    return response.choices[0].message.content
+
+def streamed(stream) -> str:
+    return "".join(chunk.choices[0].delta.content for chunk in stream)
+
+def test_prompt_key_ignores_formatting_only():
+    spaced = [{"role": " System", "content": "You are a  service\nadvisor. "}, MESSAGES[1]]
+    assert prompt_key("m", spaced) == prompt_key("m", MESSAGES)
+    assert prompt_key("m", MESSAGES, temperature=0.7) != prompt_key("m", MESSAGES)
+
+def test_repeat_requests_are_served_from_the_cache():
+    backend = LocalLLM(latency_seconds=0, tokens_per_second=0)
+    client = CachedLLMClient(backend, LLMResponseCache())
+    first = content(client.chat.completions.create(model="m", messages=MESSAGES))
+    assert content(client.chat.completions.create(model="m", messages=MESSAGES)) == first
+    assert streamed(client.chat.completions.create(model="m", messages=MESSAGES, stream=True)) == first
+    assert backend.calls == 1
+
+def test_concurrent_identical_requests_make_one_backend_call():
+    backend = LocalLLM(latency_seconds=0.1, tokens_per_second=0)
+    client = CachedLLMClient(backend, LLMResponseCache())
+    replies = []
+    threads = [threading.Thread(target=lambda: replies.append(
+        content(client.chat.completions.create(model="m", messages=MESSAGES)))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.calls == 1 and len(set(replies)) == 1 and len(replies) == 6
+
+def test_only_streams_read_to_the_end_are_cached():
+    backend = LocalLLM(latency_seconds=0, tokens_per_second=0)
+    client = CachedLLMClient(backend, LLMResponseCache())
+    stream = client.chat.completions.create(model="m", messages=MESSAGES, stream=True)
+    next(iter(stream))
+    stream.close()
+    text = streamed(client.chat.completions.create(model="m", messages=MESSAGES, stream=True))
+    assert backend.calls == 2
+    assert content(client.chat.completions.create(model="m", messages=MESSAGES)) == text
+    assert backend.calls == 2
+
+def test_disk_cache_is_shared_and_expires(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    LLMResponseCache(path=path).set("key", "m", "cached reply")
+    assert LLMResponseCache(path=path).get("key") == "cached reply"
+
+    expired = LLMResponseCache(path=path, ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert expired.get("key") is None
+    assert expired.purge_expired() == 1
@@ -0,0 +1,95 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils.llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailable, TokenBucket
+from utils.local_llm import LocalLLM
+
+MESSAGES = [{"role": "user", "content": "Is my car due for service?"}]
+
+class FailingBackend:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        raise self.error
+
+class TrickleBackend:
+    """Streams a chunk every interval seconds, each well within a per-read timeout"""
+
+    def __init__(self, interval: float, chunks: int):
+        self.interval = interval
+        self.chunks = chunks
+        self.closed = False
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, stream: bool = False, **kwargs):
+        if not stream:
+            time.sleep(self.interval * self.chunks)
+            return "reply"
+        return self
+
+    def __iter__(self):
+        for i in range(self.chunks):
+            time.sleep(self.interval)
+            yield i
+
+    def close(self):
+        self.closed = True
+
+def test_breaker_opens_and_recovers_through_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call while half-open
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+def test_gateway_stops_calling_a_failing_provider():
+    backend = FailingBackend(ConnectionError("provider down"))
+    gateway = LLMGateway(backend, failure_threshold=3, reset_timeout=60)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            gateway.chat.completions.create(model="m", messages=MESSAGES)
+    with pytest.raises(LLMUnavailable):
+        gateway.chat.completions.create(model="m", messages=MESSAGES)
+    assert backend.calls == 3
+    assert gateway.stats()["circuit_open"] == 1
+
+def test_token_bucket_allows_bursts_then_the_rate():
+    bucket = TokenBucket(rate_per_second=20, burst=3)
+    assert all(bucket.acquire(0) for _ in range(3))
+    assert not bucket.acquire(0)
+    started = time.monotonic()
+    assert bucket.acquire(1)
+    assert 0.02 <= time.monotonic() - started < 0.5
+
+def test_deadline_bounds_the_whole_call():
+    gateway = LLMGateway(LocalLLM(latency_seconds=0, tokens_per_second=0), deadline=0.2)
+    assert gateway.chat.completions.create(model="m", messages=MESSAGES).choices[0].message.content
+
+    gateway = LLMGateway(TrickleBackend(interval=0.05, chunks=20), deadline=0.2, max_concurrency=1,
+                         queue_timeout=0)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        gateway.chat.completions.create(model="m", messages=MESSAGES)
+    assert time.monotonic() - started < 0.5
+    assert gateway.stats()["timeouts"] == 1
+
+    backend = TrickleBackend(interval=0.05, chunks=20)
+    gateway = LLMGateway(backend, deadline=0.2)
+    received = []
+    with pytest.raises(TimeoutError):
+        for chunk in gateway.chat.completions.create(model="m", messages=MESSAGES, stream=True):
+            received.append(chunk)
+    assert backend.closed and len(received) < 20
+    assert gateway.stats()["in_flight"] == 0
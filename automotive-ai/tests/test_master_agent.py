@@ -0,0 +1,39 @@
+from conftest import write_json
+
+VEHICLE = {
+    "id": "VEH001", "model": "Tata Nexon", "year": 2021, "mileage": 40000, "last_service_km": 35000,
+    "sensors": {"oil_pressure": 25, "engine_temp": 92, "brake_pad_thickness": 6, "battery_voltage": 12.6,
+                "tire_pressure": [32, 32, 32, 32]},
+    "location": "Pune", "preferred_service_center": "SC001"
+}
+
+def test_cached_results_are_still_checked_and_logged(master, data_dir):
+    write_json(data_dir, "vehicles.json", [VEHICLE])
+    actions = []
+    verify_action = master.ueba.verify_action
+
+    def record(agent, action, data=None):
+        actions.append(action)
+        return verify_action(agent, action, data)
+    master.ueba.verify_action = record
+
+    first = master.get_diagnosis("VEH001")
+    second = master.get_diagnosis("VEH001")
+    assert second == first
+    assert actions == ["read_vehicle_data", "predict_failures"] * 2
+    assert master.ueba.query_logs(action="predict_failures", limit=None)["logs"][0]["success"]
+
+    master.ueba.verify_action = lambda agent, action, data=None: {
+        "allowed": False, "anomaly": {"message": f"{agent} denied"}}
+    assert master.get_analysis("VEH001") == {"error": "DataAnalysis denied"}
+
+def test_orchestration_checks_each_step_once(master, data_dir):
+    worn = {**VEHICLE, "owner": "Asha Rao", "phone": "+91-9000000000", "last_service_km": 20000,
+            "sensors": {**VEHICLE["sensors"], "oil_pressure": 20, "brake_pad_thickness": 2}}
+    write_json(data_dir, "vehicles.json", [worn])
+    result = master.orchestrate_maintenance_workflow("VEH001")
+    assert result["status"] == "completed"
+
+    logged = [(e["agent"], e["action"]) for e in reversed(master.ueba.query_logs(limit=None)["logs"])]
+    assert logged[:2] == [("DataAnalysis", "read_vehicle_data"), ("Diagnosis", "predict_failures")]
+    assert len(logged) == len(set(logged)) == len(result["steps"])
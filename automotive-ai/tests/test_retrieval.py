@@ -0,0 +1,46 @@
+from conftest import write_json
+from storage.json_store import JSONStorage
+from utils.knowledge_index import MaintenanceKnowledgeIndex
+from utils.text_index import BM25Index
+
+def test_bm25_ranks_matching_documents_first():
+    index = BM25Index()
+    index.add_many([
+        ("brakes", "brake pad worn brake noise", "brakes"),
+        ("battery", "battery voltage low", "battery"),
+        ("mixed", "brake fluid battery terminal", "mixed"),
+    ])
+    assert [key for key, _, _ in index.search("brake pads", k=2)] == ["brakes", "mixed"]
+    assert index.search("unknown words", k=2) == []
+
+def test_removed_documents_are_compacted_away():
+    index = BM25Index(min_merge=1)
+    index.add_many([(i, f"engine oil leak number{i}", i) for i in range(100)])
+    for i in range(60):
+        index.remove(i)
+    assert len(index) == 40
+    assert len(index._keys) < 100 and len(index._payloads) == len(index._keys)
+    assert sorted(key for key, _, _ in index.search("engine", k=100)) == list(range(60, 100))
+    assert index.search("number75", k=1)[0][2] == 75
+
+def test_unchanged_defects_are_not_reindexed(data_dir):
+    defects = [{"defect_id": f"D{i}", "component": "brake", "vehicle_model": "Nexon", "root_cause": "seal"}
+               for i in range(3)]
+    write_json(data_dir, "rca_capa_data.json", {"defects": defects})
+    knowledge = MaintenanceKnowledgeIndex(JSONStorage(data_dir))
+    assert knowledge.refresh() == 3
+
+    defects[1]["root_cause"] = "caliper corrosion"
+    write_json(data_dir, "rca_capa_data.json", {"defects": defects[:2] + [{"defect_id": "D9", "component": "clutch"}]})
+    assert knowledge.refresh() == 2  # D1 changed, D9 is new; D0 is unchanged and D2 was removed
+    assert knowledge.search("corrosion", k=1)[0].startswith("Known defect D1")
+    assert knowledge.stats()["documents"] == 3
+
+def test_ensure_fresh_uses_one_background_thread(data_dir):
+    write_json(data_dir, "maintenance_history.json", [{"vehicle_id": "VEH001", "component": "brake pads"}])
+    knowledge = MaintenanceKnowledgeIndex(JSONStorage(data_dir))
+    knowledge.ensure_fresh()
+    worker = knowledge._worker
+    assert knowledge.ensure_fresh(timeout=5)
+    assert knowledge._worker is worker and worker.is_alive()
+    assert knowledge.search("brake", k=1)
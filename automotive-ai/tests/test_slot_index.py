@@ -0,0 +1,59 @@
+import threading
+
+from conftest import write_json
+from storage.base import parse_slot_epoch
+from storage.json_store import JSONStorage
+from utils.slot_index import SlotIndex
+
+SLOTS = ["2026-03-02T09:00:00", "2026-03-01T10:00:00", "2026-03-01T09:00:00", "2026-03-02T10:00:00"]
+CENTERS = {"SC001": {"name": "AutoCare Pune", "location": "Pune", "available_slots": SLOTS}}
+
+def slot_index(data_dir) -> SlotIndex:
+    write_json(data_dir, "service_centers.json", CENTERS)
+    return SlotIndex(JSONStorage(data_dir, booking_fsync="never"), refresh_seconds=0)
+
+def test_claims_are_earliest_first_and_within_the_window(data_dir):
+    index = slot_index(data_dir)
+    start = parse_slot_epoch("2026-03-01T09:00:00")
+    assert index.claim("SC001", start) == "2026-03-01T10:00:00"  # start itself is excluded
+    assert index.claim("SC001", 0, end=parse_slot_epoch("2026-03-02T00:00:00")) == "2026-03-01T09:00:00"
+    assert index.claim("SC001", 0, end=parse_slot_epoch("2026-03-02T00:00:00")) is None
+    assert index.claim("SC404", 0) is None
+
+def test_concurrent_claims_get_distinct_slots(data_dir):
+    index = slot_index(data_dir)
+    claimed, lock = [], threading.Lock()
+
+    def claim():
+        slot = index.claim("SC001", 0)
+        with lock:
+            claimed.append(slot)
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(slot for slot in claimed if slot) == sorted(SLOTS)
+    assert claimed.count(None) == 4
+
+def test_release_and_booked_report_back(data_dir):
+    index = slot_index(data_dir)
+    slot = index.claim("SC001", 0)
+    index.release("SC001", slot)
+    assert index.find("SC001", 0, limit=10) == sorted(SLOTS)
+
+    assert index.take("SC001", slot) and not index.take("SC001", slot)
+    assert index.store.reserve_slot("SC001", slot, "VEH001")
+    index.booked("SC001", slot)
+    assert slot not in index.find("SC001", 0, limit=10)
+    assert index.calendar("SC001").free_per_day == {"2026-03-01": 1, "2026-03-02": 2}
+    assert index.booked_per_day() == {"SC001": {"2026-03-01": 1}}
+
+def test_bookings_made_elsewhere_are_picked_up(data_dir):
+    index = slot_index(data_dir)
+    assert len(index.find("SC001", 0, limit=10)) == 4
+    # Another worker books through its own store on the same data directory
+    JSONStorage(data_dir, booking_fsync="never").reserve_slot("SC001", "2026-03-01T09:00:00", "VEH002")
+    assert index.find("SC001", 0) == ["2026-03-01T10:00:00"]
+    assert index.booked_per_day() == {"SC001": {"2026-03-01": 1}}
@@ -0,0 +1,30 @@
+import pytest
+
+from storage.importer import import_json
+from storage.json_store import JSONStorage
+from storage.sqlite_store import SQLiteStorage
+
+def log_entry(i: int) -> dict:
+    return {"timestamp": f"2026-01-01T00:00:{i:02d}", "agent": "Scheduling", "action": "book_appointment",
+            "data": {}, "success": True}
+
+def test_import_while_a_server_holds_the_audit_log(data_dir, tmp_path):
+    server = JSONStorage(data_dir, log_batch_size=1)
+    for i in range(3):
+        server.append_log(log_entry(i))
+
+    counts = import_json(data_dir, str(tmp_path / "automotive.db"))
+    assert counts["security_logs"] == 3
+    server.append_log(log_entry(3))  # the server keeps its lock and keeps logging
+    assert server.log_stats()["total"] == 4
+
+    with pytest.raises(ValueError):
+        JSONStorage(data_dir, log_read_only=True).append_log(log_entry(4))
+
+def test_replace_logs_is_one_transaction(tmp_path):
+    store = SQLiteStorage(str(tmp_path / "automotive.db"))
+    store.replace_logs([log_entry(0), log_entry(1)])
+    # A bad entry rolls back the delete as well
+    with pytest.raises(KeyError):
+        store.replace_logs([log_entry(2), {"timestamp": "2026-01-01T00:00:03"}])
+    assert [e["timestamp"][-2:] for e in store.load_logs()] == ["00", "01"]
@@ -0,0 +1,49 @@
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from conftest import write_json
+
+def fleet(count: int) -> list:
+    vehicles = []
+    for i in range(count):
+        worn = i % 2 == 0  # half the fleet needs service, so the workflow runs every step for them
+        vehicles.append({
+            "id": f"VEH{i:03d}", "owner": f"Owner {i}", "phone": "+91-9000000000", "model": "Tata Nexon",
+            "year": 2020, "mileage": 60000, "last_service_km": 40000 if worn else 58000,
+            "sensors": {"oil_pressure": 20 if worn else 45, "engine_temp": 92,
+                        "brake_pad_thickness": 2 if worn else 7, "battery_voltage": 12.6,
+                        "tire_pressure": [32, 32, 32, 32]},
+            "location": "Pune", "preferred_service_center": "SC001"
+        })
+    return vehicles
+
+def centers() -> dict:
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    slots = [(start + timedelta(hours=h)).isoformat() for h in range(24 * 14)]
+    return {"SC001": {"name": "AutoCare Pune", "location": "Pune", "capacity": 400, "available_slots": slots}}
+
+def test_fleet_run_works_with_the_default_rate_limit(master, data_dir):
+    assert master.ueba.rate_limit == 50  # conftest leaves UEBA_RATE_LIMIT at its default
+    write_json(data_dir, "vehicles.json", fleet(200))
+    write_json(data_dir, "service_centers.json", centers())
+    for name in ("maintenance_history.json", "rca_capa_data.json"):
+        shutil.copy(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", name), data_dir)
+
+    vehicle_ids = master.select_vehicles()
+    records = [json.loads(json.dumps(r, default=str))
+               for r in master.orchestrate_fleet(vehicle_ids, workers=8, scope=master.authorize_fleet(vehicle_ids))]
+    summary = records[-1]["summary"]
+    assert summary["vehicles"] == 200 and summary["failed"] == 0, [r.get("error") for r in records if r.get("status") == "failed"][:2]
+
+    # The run did not use up the frequency window: single-vehicle calls still go through
+    assert "error" not in master.data_agent.analyze_vehicle("VEH001")
+    assert master.ueba.get_security_score() == 100.0
+
+def test_denied_attempts_do_not_count_toward_the_rate_window(master, data_dir):
+    write_json(data_dir, "vehicles.json", fleet(1))
+    master.ueba.rate_limit = 3
+    results = [master.data_agent.analyze_vehicle("VEH000") for _ in range(10)]
+    assert ["error" in result for result in results] == [False] * 4 + [True] * 6
+    assert master.ueba.recent_action_count("DataAnalysis") == 4
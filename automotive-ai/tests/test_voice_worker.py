@@ -0,0 +1,20 @@
+import asyncio
+
+from utils.voice_worker import VoiceWorker, audio_key, split_turns, transcript_text
+
+TRANSCRIPT = "Maya: Hello Ravi. Your brakes are worn.\nCustomer: Please book a service."
+
+def test_list_and_dict_transcripts_become_turns():
+    turns = [{"speaker": "Maya", "text": "Hello Ravi. Your brakes are worn."},
+             {"role": "Customer", "content": "Please book a service."}]
+    assert transcript_text(turns) == TRANSCRIPT
+    assert transcript_text(TRANSCRIPT.splitlines()) == TRANSCRIPT
+    assert transcript_text({"lines": TRANSCRIPT.splitlines()}) == TRANSCRIPT
+    assert split_turns(transcript_text(turns)) == [
+        ("Maya", "Hello Ravi. Your brakes are worn."), ("Customer", "Please book a service.")]
+
+def test_list_transcript_is_synthesized_like_its_text(tmp_path):
+    worker = VoiceWorker(cache_dir=str(tmp_path))
+    key = worker.submit(TRANSCRIPT.splitlines())
+    assert key == audio_key(TRANSCRIPT, f"{worker.agent_voice}|{worker.customer_voice}")
+    assert asyncio.run(worker.wait(key, timeout=10))["status"] == "ready"
@@ -0,0 +1,423 @@
+import atexit
+import json
+import os
+import threading
+from typing import Dict, List, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single process only
+    fcntl = None
+
+FSYNC_NEVER = "never"    # leave durability to the OS page cache
+FSYNC_FLUSH = "flush"    # fsync once per group commit
+FSYNC_ALWAYS = "always"  # write and fsync every entry before log() returns
+
+class AuditLogWriter:
+    """Append-only JSON-lines writer with group commit.
+
+    Entries are buffered and written in one append when the buffer reaches
+    batch_size or when flush_interval_ms has passed, so the cost of logging
+    an action does not depend on how much history is already on disk.
+    offset is the size of the file once the written entries are in it.
+    """
+
+    def __init__(self, path: str, batch_size: int = 64, flush_interval_ms: int = 200,
+                 fsync: str = FSYNC_FLUSH):
+        if fsync not in (FSYNC_NEVER, FSYNC_FLUSH, FSYNC_ALWAYS):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(1, flush_interval_ms) / 1000.0
+        self.fsync = fsync
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'ab')
+        self.offset = os.fstat(self._file.fileno()).st_size
+
+        self._flusher = threading.Thread(target=self._flush_periodically, name="audit-log-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._closed:
+                raise ValueError("Audit log is closed")
+            self._buffer.append(line)
+            if self.fsync == FSYNC_ALWAYS or len(self._buffer) >= self.batch_size:
+                self._write_buffer()
+
+    def flush(self):
+        with self._lock:
+            self._write_buffer()
+
+    def snapshot(self):
+        """(offset, buffered lines): the file up to offset plus these lines are every entry appended so far"""
+        with self._lock:
+            return self.offset, list(self._buffer)
+
+    def rotate(self, path: str):
+        """Flush pending entries and continue appending to a new file"""
+        with self._lock:
+            self._write_buffer()
+            self._file.close()
+            self.path = path
+            self._file = open(path, 'ab')
+            self.offset = os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._write_buffer()
+            self._closed = True
+            self._file.close()
+            self._wakeup.notify_all()
+
+    def _write_buffer(self):
+        # Caller holds self._lock
+        if not self._buffer or self._file.closed:
+            return
+        data = ''.join(self._buffer).encode('utf-8')
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync != FSYNC_NEVER:
+            os.fsync(self._file.fileno())
+        self.offset += len(data)
+        self._buffer.clear()
+
+    def _flush_periodically(self):
+        with self._lock:
+            while not self._closed:
+                self._wakeup.wait(self.flush_interval)
+                self._write_buffer()
+
+def load_audit_log(path: str, legacy_path: str = None) -> List[Dict[str, Any]]:
+    """Read entries from a JSON-lines log, preceded by an optional legacy JSON-array log"""
+    entries = []
+    if legacy_path and os.path.exists(legacy_path):
+        with open(legacy_path, 'r') as f:
+            entries.extend(json.load(f))
+
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write; everything before it is intact
+                    continue
+    return entries
+
+def _complete_lines(data: bytes) -> List[bytes]:
+    """The newline-terminated lines of data (without the newline); a torn last line is left out"""
+    return data[:data.rfind(b"\n") + 1].split(b"\n")[:-1]
+
+def _parse_line(line) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+def _new_segment_stats(seq: int) -> Dict[str, Any]:
+    return {
+        "seq": seq,
+        "file": f"segment-{seq:06d}.jsonl",
+        "count": 0,
+        "failures": 0,
+        "first_ts": None,
+        "last_ts": None,
+        "agents": {},
+        "actions": {}
+    }
+
+def _add_to_stats(stats: Dict[str, Any], entry: Dict[str, Any]):
+    timestamp = entry.get("timestamp")
+    stats["count"] += 1
+    if not entry.get("success", True):
+        stats["failures"] += 1
+    if timestamp:
+        if stats["first_ts"] is None or timestamp < stats["first_ts"]:
+            stats["first_ts"] = timestamp
+        if stats["last_ts"] is None or timestamp > stats["last_ts"]:
+            stats["last_ts"] = timestamp
+    agent = entry.get("agent", "")
+    action = entry.get("action", "")
+    stats["agents"][agent] = stats["agents"].get(agent, 0) + 1
+    stats["actions"][action] = stats["actions"].get(action, 0) + 1
+
+class SegmentedAuditLog:
+    """Audit log split into rotating JSON-lines segments with a small index.
+
+    Each sealed segment has an entry in index.json with its time range,
+    entry/failure counts and the agents and actions it contains. Queries
+    consult the index first and only open segments that can match, and
+    totals come straight from the index, so nothing has to be loaded into
+    memory at startup. The active (newest) segment is rescanned on open,
+    which bounds recovery work to one segment. A line torn by a crash is cut
+    off then, so the next entry starts on a line of its own. Line numbers
+    (used by cursors) count every line, including any that is not valid
+    JSON; counts in the index only include valid entries.
+
+    The directory is locked to one process: a second process opening it
+    fails fast instead of interleaving segments and clobbering the index.
+    With read_only the directory is neither locked nor written, so it can be
+    read (by iter_all) while a server keeps appending; entries the server has
+    not written out yet are not seen.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, directory: str, segment_max_entries: int = 10000, batch_size: int = 64,
+                 flush_interval_ms: int = 200, fsync: str = FSYNC_FLUSH, legacy_paths: tuple = (),
+                 read_only: bool = False):
+        self.directory = directory
+        self.segment_max_entries = max(1, segment_max_entries)
+        self.read_only = read_only
+        self._writer_options = {"batch_size": batch_size, "flush_interval_ms": flush_interval_ms, "fsync": fsync}
+        self._lock = threading.RLock()
+        self._writer = None
+        self._unimported_legacy = ()
+        if read_only:
+            self._process_lock = None
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self._process_lock = self._lock_directory()
+
+        index = self._read_index()
+        self._sealed: List[Dict[str, Any]] = index.get("segments", [])
+        self._legacy_imported = index.get("legacy_imported", False)
+        next_seq = self._sealed[-1]["seq"] + 1 if self._sealed else 1
+        self._active = self._scan_segment(_new_segment_stats(next_seq))
+
+        if not self._legacy_imported and legacy_paths:
+            if read_only:
+                self._unimported_legacy = legacy_paths  # read ahead of the segments instead
+            else:
+                self._import_legacy(*legacy_paths)
+
+    # ----- Writing -----
+
+    def append(self, entry: Dict[str, Any]):
+        if self.read_only:
+            raise ValueError("Audit log is read-only")
+        with self._lock:
+            if self._active["count"] >= self.segment_max_entries:
+                self._rotate()
+            if self._writer is None:
+                self._writer = AuditLogWriter(self._segment_path(self._active), **self._writer_options)
+            self._writer.append(entry)
+            _add_to_stats(self._active, entry)
+
+    def flush(self):
+        with self._lock:
+            if self._writer:
+                self._writer.flush()
+
+    def close(self):
+        with self._lock:
+            if self._writer:
+                self._writer.close()
+                self._writer = None
+
+    def _rotate(self):
+        # Caller holds self._lock
+        self._sealed.append(self._active)
+        self._active = _new_segment_stats(self._active["seq"] + 1)
+        if self._writer:
+            self._writer.rotate(self._segment_path(self._active))
+        self._write_index()
+
+    # ----- Reading -----
+
+    def stats(self) -> Dict[str, int]:
+        """Total and failed entry counts, from the index alone"""
+        with self._lock:
+            segments = self._sealed + [self._active]
+            return {
+                "total": sum(seg["count"] for seg in segments),
+                "failures": sum(seg["failures"] for seg in segments)
+            }
+
+    def query(self, agent: str = None, action: str = None, success: bool = None, since: str = None,
+              until: str = None, cursor: str = None, limit: Optional[int] = 50) -> Dict[str, Any]:
+        """Newest-first filtered page of entries plus a cursor for the next (older) page.
+
+        since/until are ISO timestamps (inclusive); limit=None returns every match.
+        """
+        segments, active_lines = self._snapshot()
+
+        before_seq, before_line = self._parse_cursor(cursor)
+        results = []
+        last_cursor = None
+        for seg in reversed(segments):
+            if before_seq is not None and seg["seq"] > before_seq:
+                continue
+            if not self._segment_may_match(seg, agent, action, success, since, until):
+                continue
+
+            lines = active_lines() if seg is segments[-1] else self._read_segment_lines(seg)
+            end = len(lines)
+            if before_seq == seg["seq"]:
+                end = min(end, before_line)
+            for line_no in range(end - 1, -1, -1):
+                entry = lines[line_no]
+                if entry is None or not self._entry_matches(entry, agent, action, success, since, until):
+                    continue
+                if limit is not None and len(results) == limit:
+                    return {"logs": results, "next_cursor": last_cursor}
+                results.append(entry)
+                last_cursor = f"{seg['seq']}:{line_no}"
+        return {"logs": results, "next_cursor": None}
+
+    def iter_all(self):
+        """Yield every entry oldest first (used for exports and migrations)"""
+        if self._unimported_legacy:
+            yield from load_audit_log(*self._unimported_legacy)
+        segments, active_lines = self._snapshot()
+        for seg in segments:
+            for entry in active_lines() if seg is segments[-1] else self._read_segment_lines(seg):
+                if entry is not None:
+                    yield entry
+
+    def _snapshot(self):
+        """(segments, active_lines): the segments as of now, and a function reading the active one's lines.
+
+        The active segment is read up to what the writer has written, plus
+        the entries still in its buffer. Readers neither flush nor fsync.
+        """
+        with self._lock:
+            segments = self._sealed + [dict(self._active)]
+            offset, pending = self._writer.snapshot() if self._writer else (None, [])
+        active = segments[-1]
+        return segments, lambda: self._read_segment_lines(active, offset) + [_parse_line(line) for line in pending]
+
+    # ----- Helpers -----
+
+    def _lock_directory(self):
+        if fcntl is None:
+            return None
+        lock_file = open(os.path.join(self.directory, ".lock"), 'a')
+        try:
+            # Held until the process exits
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Audit log {self.directory} is in use by another process. To run several workers, "
+                "set SHARED_STATE_DB (or STORAGE_BACKEND=sqlite) so logs go to a shared SQLite database."
+            )
+        return lock_file
+
+    def _segment_path(self, seg: Dict[str, Any]) -> str:
+        return os.path.join(self.directory, seg["file"])
+
+    def _read_segment_lines(self, seg: Dict[str, Any], end: int = None) -> List[Optional[Dict[str, Any]]]:
+        """Entries by line number (None for a line that is not valid JSON), from the first end bytes if given"""
+        path = self._segment_path(seg)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'rb') as f:
+            data = f.read() if end is None else f.read(end)
+        return [_parse_line(line) for line in _complete_lines(data)]
+
+    def _scan_segment(self, seg: Dict[str, Any]) -> Dict[str, Any]:
+        path = self._segment_path(seg)
+        if os.path.exists(path):
+            with open(path, 'rb' if self.read_only else 'rb+') as f:
+                data = f.read()
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data) and not self.read_only:
+                    f.truncate(complete)  # a line torn by a crash mid-write
+            for line in _complete_lines(data):
+                entry = _parse_line(line)
+                if entry is not None:
+                    _add_to_stats(seg, entry)
+        return seg
+
+    def _import_legacy(self, path: str, legacy_path: str = None):
+        with self._lock:
+            entries = load_audit_log(path, legacy_path)
+            if entries:
+                # Legacy history goes in ahead of anything already in the active segment
+                pending = [e for e in self._read_segment_lines(self._active) if e is not None]
+                self._active = _new_segment_stats(self._active["seq"])
+                f = open(self._segment_path(self._active), 'w', encoding='utf-8')
+                try:
+                    for entry in entries + pending:
+                        if self._active["count"] >= self.segment_max_entries:
+                            f.close()
+                            self._sealed.append(self._active)
+                            self._active = _new_segment_stats(self._active["seq"] + 1)
+                            f = open(self._segment_path(self._active), 'w', encoding='utf-8')
+                        f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+                        _add_to_stats(self._active, entry)
+                finally:
+                    f.close()
+            self._legacy_imported = True
+            self._write_index()
+
+    def _read_index(self) -> Dict[str, Any]:
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def _write_index(self):
+        # Written to a temp file and renamed so readers never see a partial index
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"segments": self._sealed, "legacy_imported": self._legacy_imported}, f)
+        os.replace(tmp_path, path)
+
+    def _parse_cursor(self, cursor: Optional[str]):
+        if not cursor:
+            return None, None
+        try:
+            seq, line = cursor.split(":")
+            return int(seq), int(line)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    def _segment_may_match(self, seg, agent, action, success, since, until) -> bool:
+        if seg["count"] == 0:
+            return False
+        if agent is not None and agent not in seg["agents"]:
+            return False
+        if action is not None and action not in seg["actions"]:
+            return False
+        if success is False and seg["failures"] == 0:
+            return False
+        if success is True and seg["failures"] == seg["count"]:
+            return False
+        if since is not None and seg["last_ts"] is not None and seg["last_ts"] < since:
+            return False
+        if until is not None and seg["first_ts"] is not None and seg["first_ts"] > until:
+            return False
+        return True
+
+    def _entry_matches(self, entry, agent, action, success, since, until) -> bool:
+        if agent is not None and entry.get("agent") != agent:
+            return False
+        if action is not None and entry.get("action") != action:
+            return False
+        if success is not None and bool(entry.get("success", True)) != success:
+            return False
+        timestamp = entry.get("timestamp", "")
+        if since is not None and timestamp < since:
+            return False
+        if until is not None and timestamp > until:
+            return False
+        return True
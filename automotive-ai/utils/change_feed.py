@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from storage.base import StorageBackend
+
+class FleetChangeFeed:
+    """Change feed of per-vehicle health state, shared by every subscriber.
+
+    A single background thread watches the store's vehicle version. When
+    it changes, only the records whose own version moved are re-scored
+    with compute_state(vehicle), and each vehicle whose state differs is
+    published once as a compact delta. Deltas carry increasing ids and the
+    most recent ones are kept in a ring buffer so clients can resume.
+    """
+
+    def __init__(self, store: StorageBackend, compute_state: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 poll_interval: float = 2.0, buffer_size: int = 1000):
+        self.store = store
+        self.compute_state = compute_state
+        self.poll_interval = poll_interval
+        self._events: deque = deque(maxlen=max(1, buffer_size))  # (event id, delta)
+        # Ids start from the wall clock so they keep increasing across restarts
+        self._last_id = int(time.time() * 1000)
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._store_version = None
+        self._subscribers: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+        self._lock = threading.Lock()        # guards events, states and subscribers
+        self._poll_lock = threading.Lock()   # one diff at a time
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    # ----- Subscribers -----
+
+    def subscribe(self) -> Tuple[int, asyncio.Event]:
+        """Register the calling event loop; the returned Event is set whenever new deltas arrive.
+
+        Call start() (it blocks while the baseline is computed) before subscribing.
+        """
+        wakeup = asyncio.Event()
+        with self._lock:
+            token = id(wakeup)
+            self._subscribers[token] = (asyncio.get_running_loop(), wakeup)
+        return token, wakeup
+
+    def unsubscribe(self, token: int):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def events_since(self, last_id: Optional[int]) -> Optional[List[Tuple[int, Dict[str, Any]]]]:
+        """Buffered deltas newer than last_id, or None if last_id is older than the buffer"""
+        with self._lock:
+            if last_id is None:
+                return []
+            if last_id > self._last_id:
+                # Not an id this process issued (e.g. from another worker): resync with a snapshot
+                return None
+            if last_id < self._last_id and (not self._events or self._events[0][0] > last_id + 1):
+                return None
+            return [(event_id, delta) for event_id, delta in self._events if event_id > last_id]
+
+    def snapshot(self) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+        """(id of the newest delta included, {vehicle_id: state}) for clients starting fresh"""
+        with self._lock:
+            return self._last_id, self._states
+
+    def last_event_id(self) -> int:
+        with self._lock:
+            return self._last_id
+
+    # ----- Feed thread -----
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            # The baseline is computed up front so snapshots and deltas line up
+            self.poll()
+            self._thread = threading.Thread(target=self._run, name="fleet-change-feed", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Fleet change feed error: {e}")
+
+    def poll(self) -> int:
+        """Diff the store against the last seen state and publish deltas; returns how many"""
+        with self._poll_lock:
+            store_version = self.store.vehicles_version()
+            if store_version == self._store_version:
+                return 0
+            baseline = self._store_version is None
+            versions = self.store.vehicle_versions()
+            states = dict(self._states)
+
+            deltas = []
+            for vehicle_id, version in versions.items():
+                if self._versions.get(vehicle_id) == version:
+                    continue
+                vehicle = self.store.get_vehicle(vehicle_id)
+                if vehicle is None:
+                    continue
+                state = self.compute_state(vehicle)
+                previous = states.get(vehicle_id)
+                states[vehicle_id] = state
+                if baseline:
+                    continue
+                changed = {key: value for key, value in state.items()
+                           if previous is None or previous.get(key) != value}
+                if changed:
+                    deltas.append({"vehicle_id": vehicle_id, **changed})
+            for vehicle_id in set(states) - set(versions):
+                del states[vehicle_id]
+                deltas.append({"vehicle_id": vehicle_id, "removed": True})
+
+            self._versions = versions
+            self._store_version = store_version
+            self._publish(states, deltas)
+            return len(deltas)
+
+    def _publish(self, states: Dict[str, Dict[str, Any]], deltas: List[Dict[str, Any]]):
+        with self._lock:
+            # states is a fresh dict, so snapshots handed out earlier are never mutated
+            self._states = states
+            for delta in deltas:
+                self._last_id += 1
+                self._events.append((self._last_id, delta))
+            subscribers = list(self._subscribers.values()) if deltas else []
+        for loop, wakeup in subscribers:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass  # the subscriber's loop has shut down
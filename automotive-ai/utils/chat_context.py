@@ -0,0 +1,70 @@
+import os
+from typing import Any, Callable, Dict, Hashable, List
+from utils.result_cache import LRUCache
+
+# Upper bound on the tokens sent to the LLM per /chat call (system prompt + history + message)
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "2048"))
+# Maintenance records / known defects retrieved into each /chat prompt
+CHAT_RETRIEVAL_TOP_K = int(os.getenv("CHAT_RETRIEVAL_TOP_K", "5"))
+# How long a /chat waits for the retrieval index when it has not been built yet (just after startup)
+CHAT_RETRIEVAL_FIRST_BUILD_WAIT_SECONDS = float(os.getenv("CHAT_RETRIEVAL_FIRST_BUILD_WAIT_SECONDS", "2"))
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about 4 characters per token for English text"""
+    return (len(text) + 3) // 4
+
+class ChatContextCache:
+    """Pre-rendered prompt sections keyed by (key, data version).
+
+    A section is a list of lines whose first line is its heading; an entry
+    holds one section or several. Each is rendered once per version of the
+    data behind it, so a /chat call only looks up versions and joins strings.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        # Entries are invalidated by version, so the TTL is only a backstop
+        self._sections = LRUCache(max_entries=max_entries, ttl_seconds=24 * 3600)
+
+    def get_or_build(self, key: Hashable, version: Any, build: Callable[[], Any]) -> Any:
+        entry = self._sections.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        lines = build()
+        self._sections.set(key, (version, lines))
+        return lines
+
+    def stats(self) -> dict:
+        return self._sections.stats()
+
+def fit_sections(sections: List[List[str]], budget: int) -> List[List[str]]:
+    """Trim sections (highest priority first) to whole lines within budget tokens.
+
+    A section is dropped entirely when not even its heading and first line fit.
+    """
+    kept = []
+    for lines in sections:
+        if len(lines) < 2:
+            continue
+        used = estimate_tokens(lines[0]) + 1
+        taken = [lines[0]]
+        for line in lines[1:]:
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                break
+            taken.append(line)
+            used += cost
+        if len(taken) > 1:
+            kept.append(taken)
+            budget -= used
+    return kept
+
+def fit_history(history: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """The most recent messages whose combined content fits in budget tokens, oldest first"""
+    kept = []
+    for message in reversed(history):
+        cost = estimate_tokens(message["content"]) + 4  # role and message framing
+        if cost > budget:
+            break
+        kept.append(message)
+        budget -= cost
+    return kept[::-1]
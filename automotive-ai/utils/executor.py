@@ -0,0 +1,28 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Bounded pool for the slow, blocking parts of the agent pipeline (LLM calls).
+# Kept separate from FastAPI's own threadpool so cheap endpoints never queue behind them.
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "8"))
+
+# Per-call deadline for remote LLM requests, in seconds
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_agent_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=AGENT_POOL_SIZE, thread_name_prefix="agent-worker")
+    return _pool
+
+async def run_in_agent_pool(func, *args, **kwargs):
+    """Run a blocking agent call on the bounded agent pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_agent_pool(), functools.partial(func, *args, **kwargs))
@@ -0,0 +1,135 @@
+import heapq
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# How well the center a vehicle is sent to matches it, best first
+PREFERRED_CENTER, SAME_LOCATION, ANY_CENTER = "preferred", "same_location", "other"
+
+def center_match(center_id: str, preferred: Optional[str], location: Optional[str],
+                 centers: Dict[str, Dict[str, Any]]) -> str:
+    if center_id == preferred:
+        return PREFERRED_CENTER
+    if location is not None and centers.get(center_id, {}).get("location") == location:
+        return SAME_LOCATION
+    return ANY_CENTER
+
+class _CenterQueue:
+    """One center's free slots in time order, handed out earliest first.
+
+    Every vehicle sent to a center takes its earliest slot that is left, so
+    the slots are consumed front to back and a position is all the state
+    needed. Days that have reached capacity, counting the bookings the
+    center already has, are skipped.
+    """
+
+    def __init__(self, epochs: List[float], slots: List[str], capacity: Optional[int],
+                 booked_per_day: Optional[Counter] = None):
+        self.epochs = epochs
+        self.slots = slots
+        self.capacity = capacity
+        self.per_day = Counter(booked_per_day or {})
+        self.pos = 0
+        self._skip_full_days()
+
+    def head(self) -> Optional[float]:
+        """Time of the slot the next vehicle would get; None when the center is full"""
+        return self.epochs[self.pos] if self.pos < len(self.slots) else None
+
+    def take(self) -> Tuple[str, float]:
+        slot, epoch = self.slots[self.pos], self.epochs[self.pos]
+        self.per_day[slot[:10]] += 1
+        self.pos += 1
+        self._skip_full_days()
+        return slot, epoch
+
+    def _skip_full_days(self):
+        if self.capacity is None:
+            return
+        while self.pos < len(self.slots) and self.per_day[self.slots[self.pos][:10]] >= self.capacity:
+            self.pos += 1
+
+class FleetPlanner:
+    """Assigns many vehicles to service-center slots in one greedy pass.
+
+    Vehicles are served in priority order: earliest deadline first, then
+    highest risk score. Each takes the cheapest slot still free that meets
+    its deadline, where cost ranks the center (preferred, then same
+    location, then any) ahead of time. A vehicle no center can see in time
+    takes the earliest slot left anywhere, in its turn, and is flagged
+    late; it still goes ahead of every vehicle with a later deadline. This
+    is a priority heuristic, not an optimal solve of a cost objective.
+    Centers sit in heaps keyed by their next free slot (one heap per
+    location and one overall), so a choice costs O(log centers).
+
+    capacity, when a center has it, caps the vehicles it takes per day,
+    including those already booked there (booked_per_day, {center_id:
+    Counter({day: bookings})}). It only constrains the plan when it is
+    below the number of slots the center lists for a day.
+    """
+
+    def __init__(self, centers: Dict[str, Dict[str, Any]], free_slots: Dict[str, Tuple[List[float], List[str]]],
+                 booked_per_day: Optional[Dict[str, Counter]] = None):
+        self.centers = centers
+        booked_per_day = booked_per_day or {}
+        self.queues = {cid: _CenterQueue(epochs, slots, centers.get(cid, {}).get("capacity"), booked_per_day.get(cid))
+                       for cid, (epochs, slots) in free_slots.items()}
+        self._all: List[Tuple[float, str, int]] = []
+        self._by_location: Dict[str, List[Tuple[float, str, int]]] = defaultdict(list)
+        for cid in self.queues:
+            self._push(cid)
+
+    def _push(self, cid: str):
+        queue = self.queues[cid]
+        epoch = queue.head()
+        if epoch is None:
+            return
+        entry = (epoch, cid, queue.pos)
+        heapq.heappush(self._all, entry)
+        heapq.heappush(self._by_location[self.centers.get(cid, {}).get("location")], entry)
+
+    def _earliest(self, heap: List[Tuple[float, str, int]]) -> Optional[str]:
+        """Center with the earliest free slot in heap; entries left behind by a taken slot are dropped"""
+        while heap:
+            _, cid, pos = heap[0]
+            if self.queues[cid].pos == pos and self.queues[cid].head() is not None:
+                return cid
+            heapq.heappop(heap)
+        return None
+
+    def _choose(self, deadline: float, preferred: Optional[str], location: Optional[str]) -> Optional[str]:
+        """The best center with a free slot by deadline, or None"""
+        queue = self.queues.get(preferred)
+        if queue is not None and queue.head() is not None and queue.head() <= deadline:
+            return preferred
+        for heap in (self._by_location.get(location), self._all):
+            cid = self._earliest(heap) if heap else None
+            if cid is not None and self.queues[cid].head() <= deadline:
+                return cid
+        return None
+
+    def _assign(self, vehicle: Dict[str, Any], cid: str) -> Dict[str, Any]:
+        slot, epoch = self.queues[cid].take()
+        self._push(cid)
+        return {**vehicle, "center_id": cid, "slot": slot, "slot_epoch": epoch,
+                "center_match": center_match(cid, vehicle.get("preferred_center"), vehicle.get("location"), self.centers),
+                "within_deadline": epoch <= vehicle["deadline"]}
+
+    def plan(self, vehicles: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """(assignments, unassigned) for vehicles {vehicle_id, risk_score, deadline, preferred_center, location}.
+
+        An assignment is the vehicle plus center_id, slot, slot_epoch,
+        center_match (PREFERRED_CENTER, SAME_LOCATION or ANY_CENTER) and
+        within_deadline. Vehicles are left unassigned only when every center
+        is full.
+        """
+        assignments, unassigned = [], []
+        for vehicle in sorted(vehicles, key=lambda v: (v["deadline"], -v["risk_score"], v["vehicle_id"])):
+            cid = self._choose(vehicle["deadline"], vehicle.get("preferred_center"), vehicle.get("location"))
+            if cid is None:
+                # Too late everywhere: as little late as possible, before less urgent vehicles take the slots
+                cid = self._earliest(self._all)
+            if cid is None:
+                unassigned.append(vehicle)
+            else:
+                assignments.append(self._assign(vehicle, cid))
+        return assignments, unassigned
@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+import threading
+import traceback
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    subject TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    current_step TEXT,
+    steps TEXT NOT NULL DEFAULT '[]',
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_subject ON jobs (subject, created_at);
+"""
+
+class JobQueue:
+    """Persistent background job queue backed by SQLite.
+
+    Jobs survive restarts: anything left 'running' by a crashed process is
+    re-queued on startup. A fixed number of worker threads claim jobs one
+    at a time, which also caps how much LLM/TTS work runs concurrently.
+    Handlers receive (payload, report) and call report(step, progress) as
+    they go; their return value is stored as the job result.
+    """
+
+    def __init__(self, db_path: str = 'data/jobs.db', workers: int = 2, poll_interval: float = 1.0):
+        self.db_path = db_path
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, Callable] = {}
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # Jobs that were running when the previous process died go back in the queue
+        conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], Callable[[str, int], None]], Any]):
+        self._handlers[kind] = handler
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+
+    def submit(self, kind: str, payload: Dict[str, Any], subject: str = None) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, subject, payload, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+            (job_id, kind, subject, json.dumps(payload), datetime.now().isoformat())
+        )
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def latest_for_subject(self, subject: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM jobs WHERE subject = ? ORDER BY created_at DESC LIMIT 1", (subject,)
+        ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    # ----- Workers -----
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                    (datetime.now().isoformat(), row["id"])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _work(self):
+        while True:
+            with self._wakeup:
+                if self._stopping:
+                    return
+            job = self._claim()
+            if job is None:
+                with self._wakeup:
+                    # Also poll, so jobs submitted by other processes are picked up
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            self._run(job)
+
+    def _run(self, job: sqlite3.Row):
+        conn = self._conn()
+        steps = []
+
+        def report(step: str, progress: int):
+            steps.append(step)
+            conn.execute(
+                "UPDATE jobs SET current_step = ?, progress = ?, steps = ? WHERE id = ?",
+                (step, progress, json.dumps(steps), job["id"])
+            )
+
+        try:
+            result = self._handlers[job["kind"]](json.loads(job["payload"]), report)
+            conn.execute(
+                "UPDATE jobs SET status = 'completed', progress = 100, result = ?, finished_at = ? WHERE id = ?",
+                (json.dumps(result, default=str), datetime.now().isoformat(), job["id"])
+            )
+        except Exception as e:
+            traceback.print_exc()
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (str(e), datetime.now().isoformat(), job["id"])
+            )
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["steps"] = json.loads(job["steps"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
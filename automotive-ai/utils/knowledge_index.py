@@ -0,0 +1,133 @@
+import threading
+from typing import Dict, List, Any, Tuple
+from storage.base import StorageBackend
+from utils.text_index import BM25Index
+
+class MaintenanceKnowledgeIndex:
+    """Lexical retrieval over maintenance history records and RCA/CAPA defects.
+
+    refresh() keeps the BM25 index in step with the store. Only history
+    records appended since the last refresh are indexed. When the RCA
+    document's version changes, only defects that were added, changed or
+    removed are re-indexed. When the history was rewritten, a new index is
+    built and swapped in, so searches keep using the old one in the
+    meantime. ensure_fresh() asks one long-lived background thread to
+    refresh, so callers never wait for it. search() returns ready-to-use
+    one-line snippets for the chat prompt.
+    """
+
+    # Documents indexed per lock hold, so searches are not held up by a large batch
+    BATCH_SIZE = 1000
+
+    def __init__(self, store: StorageBackend, **index_options):
+        self.store = store
+        self.index_options = index_options
+        self.index = BM25Index(**index_options)
+        self._history_cursor = None
+        self._history_count = 0
+        self._rca_version = None
+        self._rca_documents: Dict[Any, Tuple[str, str]] = {}  # key -> (text, snippet) as indexed
+        self._refresh_lock = threading.Lock()
+        # Refresh requests for the background thread: requested counts calls to ensure_fresh(),
+        # completed the requests the last finished refresh covered
+        self._requests = threading.Condition()
+        self._requested = 0
+        self._completed = 0
+        self._worker = None
+
+    @property
+    def built(self) -> bool:
+        """True once a background refresh has completed, i.e. the index has been built at least once"""
+        with self._requests:
+            return self._completed > 0
+
+    def ensure_fresh(self, timeout: float = 0) -> bool:
+        """Ask the background thread to refresh, waiting at most timeout seconds; True if it has.
+
+        Requests made while a refresh runs are served by one more refresh,
+        and callers search the current index in the meantime.
+        """
+        with self._requests:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._refresh_on_request, name="knowledge-index-refresh",
+                                                daemon=True)
+                self._worker.start()
+            self._requested += 1
+            request = self._requested
+            self._requests.notify_all()
+            return self._requests.wait_for(lambda: self._completed >= request, timeout)
+
+    def _refresh_on_request(self):
+        while True:
+            with self._requests:
+                self._requests.wait_for(lambda: self._requested > self._completed)
+                request = self._requested
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Knowledge index refresh failed: {e}")
+            with self._requests:
+                self._completed = request
+                self._requests.notify_all()
+
+    def refresh(self) -> int:
+        """Index whatever changed in the store; returns how many documents were (re)indexed"""
+        with self._refresh_lock:
+            cursor, records, reset = self.store.maintenance_history_changes(self._history_cursor)
+            index = BM25Index(**self.index_options) if reset else self.index
+            if reset:
+                self._history_count = 0
+                self._rca_version = None
+                self._rca_documents = {}
+            documents = []
+            for record in records:
+                documents.append((("history", self._history_count), _history_text(record), _history_snippet(record)))
+                self._history_count += 1
+
+            rca_version = self.store.data_version("rca_capa")
+            if rca_version is None or rca_version != self._rca_version:
+                defects = self.store.get_rca_capa_data().get("defects", [])
+                rca_documents = {("rca", defect.get("defect_id", i)): (_defect_text(defect), _defect_snippet(defect))
+                                 for i, defect in enumerate(defects)}
+                for key in self._rca_documents.keys() - rca_documents.keys():
+                    index.remove(key)
+                documents += [(key, text, snippet) for key, (text, snippet) in rca_documents.items()
+                              if self._rca_documents.get(key) != (text, snippet)]
+                self._rca_documents = rca_documents
+                self._rca_version = rca_version
+
+            for start in range(0, len(documents), self.BATCH_SIZE):
+                index.add_many(documents[start:start + self.BATCH_SIZE])
+            if reset:
+                index.merge()
+                self.index = index
+            self._history_cursor = cursor
+            return len(documents)
+
+    def search(self, query: str, k: int = 5) -> List[str]:
+        """Snippets of the k records and defects most relevant to query, best first"""
+        return [snippet for _, _, snippet in self.index.search(query, k)]
+
+    def stats(self) -> Dict[str, int]:
+        return self.index.stats()
+
+def _history_text(record: Dict[str, Any]) -> str:
+    return " ".join(str(record.get(field, "")) for field in
+                    ("vehicle_id", "model", "component", "failure_type", "service_center", "date"))
+
+def _history_snippet(record: Dict[str, Any]) -> str:
+    return (f"{record.get('date', 'N/A')} {record.get('vehicle_id', '')} ({record.get('model', 'N/A')}): "
+            f"{record.get('component', 'N/A')}, {record.get('failure_type', 'N/A')}, "
+            f"₹{record.get('cost', 'N/A')} at {record.get('service_center', 'N/A')}")
+
+def _defect_text(defect: Dict[str, Any]) -> str:
+    return " ".join(str(defect.get(field, "")) for field in
+                    ("defect_id", "component", "vehicle_model", "manufacturing_batch", "failure_rate", "root_cause",
+                     "corrective_action", "preventive_action", "status", "severity"))
+
+def _defect_snippet(defect: Dict[str, Any]) -> str:
+    return (f"Known defect {defect.get('defect_id', '')}: {defect.get('component', 'N/A')} on "
+            f"{defect.get('vehicle_model', 'N/A')} (batch {defect.get('manufacturing_batch', 'N/A')}), "
+            f"{defect.get('failure_rate', 'N/A')}; root cause: {defect.get('root_cause', 'N/A')}; "
+            f"corrective action: {defect.get('corrective_action', 'N/A')}; "
+            f"status {defect.get('status', 'N/A')}, severity {defect.get('severity', 'N/A')}")
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Any, Optional
+from utils.result_cache import LRUCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+def prompt_key(model: str, messages: List[Dict[str, str]], temperature: Any = None, max_tokens: Any = None) -> str:
+    """Hash of a completion request, normalized so formatting-only differences share an entry"""
+    normalized = [
+        {"role": m["role"].strip().lower(), "content": re.sub(r"\s+", " ", m["content"]).strip()}
+        for m in messages
+    ]
+    request = {"model": model, "temperature": temperature, "max_tokens": max_tokens, "messages": normalized}
+    return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """Completion texts keyed by prompt_key(), in an LRU with a TTL.
+
+    With a path, entries are also written through to a SQLite file, so
+    responses survive restarts and are shared by worker processes.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600, path: Optional[str] = None):
+        self.ttl = ttl_seconds
+        self.path = path
+        self._entries = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._local = threading.local()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        response = self._entries.get(key)
+        if response is not None or not self.path:
+            return response
+        row = self._conn().execute(
+            "SELECT response FROM llm_responses WHERE key = ? AND created_at > ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        self._entries.set(key, row[0])
+        return row[0]
+
+    def set(self, key: str, model: str, response: str):
+        self._entries.set(key, response)
+        if self.path:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, response, created_at) VALUES (?, ?, ?, ?)",
+                (key, model, response, time.time())
+            )
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the disk store; returns how many"""
+        if not self.path:
+            return 0
+        return self._conn().execute("DELETE FROM llm_responses WHERE created_at <= ?",
+                                    (time.time() - self.ttl,)).rowcount
+
+    def clear(self):
+        self._entries.clear()
+        if self.path:
+            self._conn().execute("DELETE FROM llm_responses")
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+class CachedLLMClient:
+    """Wraps a Groq-compatible client so identical completion requests are answered from the cache.
+
+    Exposes the same client.chat.completions.create(...) call, streaming
+    included: a cached reply is replayed as a stream, and a streamed reply
+    is cached once it has been read to the end. Concurrent identical
+    non-streaming requests make a single backend call.
+    """
+
+    def __init__(self, backend, cache: LLMResponseCache):
+        self.backend = backend
+        self.cache = cache
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._in_flight_lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict[str, str]], temperature: Any = None,
+                max_tokens: Any = None, stream: bool = False, **kwargs):
+        key = prompt_key(model, messages, temperature, max_tokens)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return _ReplayStream(cached) if stream else completion_from_text(model, cached)
+        if not stream:
+            with self._in_flight_lock:
+                leader = self._in_flight.get(key)
+                if leader is None:
+                    self._in_flight[key] = threading.Event()
+            if leader is not None:
+                # The same request is already being answered: wait for it, then read the cache
+                leader.wait()
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return completion_from_text(model, cached)
+            else:
+                try:
+                    return self._call_backend(key, model, messages, temperature, max_tokens, stream, kwargs)
+                finally:
+                    with self._in_flight_lock:
+                        self._in_flight.pop(key).set()
+        return self._call_backend(key, model, messages, temperature, max_tokens, stream, kwargs)
+
+    def _call_backend(self, key: str, model: str, messages: List[Dict[str, str]], temperature: Any,
+                      max_tokens: Any, stream: bool, kwargs: Dict[str, Any]):
+        # Unset options are left out so the backend applies its own defaults
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        response = self.backend.chat.completions.create(model=model, messages=messages, stream=stream, **kwargs)
+        if stream:
+            return _RecordingStream(response, lambda text: self.cache.set(key, model, text))
+        text = response.choices[0].message.content
+        if text:
+            self.cache.set(key, model, text)
+        return response
+
+def split_tokens(text: str) -> List[str]:
+    """Word-sized pieces (with their trailing whitespace) standing in for model tokens"""
+    return re.findall(r"\S+\s*|\s+", text)
+
+def completion_from_text(model: str, text: str):
+    """A non-streaming completion object shaped like the Groq client's"""
+    message = SimpleNamespace(role="assistant", content=text)
+    return SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")])
+
+def chunk_from_text(text: str):
+    """One streaming chunk shaped like the Groq client's"""
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=text))])
+
+class _ReplayStream:
+    """A cached reply served through the streaming interface, one word at a time"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __iter__(self):
+        for piece in split_tokens(self.text):
+            yield chunk_from_text(piece)
+
+    def close(self):
+        pass
+
+class _RecordingStream:
+    """Passes a backend stream through and hands the full text to on_complete if it is read to the end"""
+
+    def __init__(self, stream, on_complete):
+        self.stream = stream
+        self.on_complete = on_complete
+
+    def __iter__(self):
+        parts = []
+        for chunk in self.stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        if parts:
+            self.on_complete("".join(parts))
+
+    def close(self):
+        self.stream.close()
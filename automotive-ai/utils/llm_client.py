@@ -0,0 +1,77 @@
+import os
+import threading
+from typing import Any, Dict
+from utils.executor import AGENT_POOL_SIZE, LLM_TIMEOUT_SECONDS
+
+# Idle pooled connections to the LLM API are kept open this long (seconds) for reuse
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "120"))
+
+_shared_client = None
+_shared_gateway = None
+_shared_lock = threading.Lock()
+
+def new_llm_client(http_client=None, max_retries: int = 2):
+    """Build a Groq client; groq (and httpx under it) are only imported on first use"""
+    from groq import Groq
+    return Groq(api_key=os.getenv("GROQ_API_KEY"), timeout=LLM_TIMEOUT_SECONDS, http_client=http_client,
+                max_retries=max_retries)
+
+def _new_backend():
+    """The completion backend named by LLM_BACKEND: groq (default) or the offline local stand-in"""
+    backend = os.getenv("LLM_BACKEND", "groq").lower()
+    if backend == "local":
+        from utils.local_llm import LocalLLM
+        return LocalLLM(latency_seconds=float(os.getenv("LOCAL_LLM_LATENCY_SECONDS", "0.5")),
+                        tokens_per_second=float(os.getenv("LOCAL_LLM_TOKENS_PER_SECOND", "50")))
+    if backend != "groq":
+        raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+    import httpx
+    limits = httpx.Limits(max_keepalive_connections=AGENT_POOL_SIZE, keepalive_expiry=LLM_KEEPALIVE_SECONDS)
+    # No client-side retries: the gateway's deadline is per call and its breaker needs to see each failure
+    return new_llm_client(httpx.Client(limits=limits, timeout=LLM_TIMEOUT_SECONDS), max_retries=0)
+
+def _new_gateway(backend):
+    from utils.llm_gateway import LLMGateway
+    return LLMGateway(backend,
+                      max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", str(AGENT_POOL_SIZE))),
+                      queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "2")),
+                      deadline=LLM_TIMEOUT_SECONDS,
+                      rate_per_second=float(os.getenv("LLM_RATE_PER_SECOND", "0")),
+                      burst=int(os.getenv("LLM_RATE_BURST", "10")),
+                      failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                      reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")))
+
+def get_llm_client():
+    """The process-wide LLM client, built once on first use.
+
+    The Groq backend owns one httpx connection pool that keeps up to one
+    idle connection per agent-pool thread alive, so repeat requests reuse
+    an open TLS connection instead of handshaking again. Every call that
+    reaches the backend passes through the LLM gateway (concurrency limit,
+    deadline, rate limit, circuit breaker). Unless LLM_CACHE_SIZE is 0,
+    identical requests are answered from the response cache (persisted to
+    LLM_CACHE_PATH when set) before they reach the gateway.
+    """
+    global _shared_client, _shared_gateway
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                client = _shared_gateway = _new_gateway(_new_backend())
+                cache_size = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+                if cache_size > 0:
+                    from utils.llm_cache import CachedLLMClient, LLMResponseCache
+                    cache = LLMResponseCache(max_entries=cache_size,
+                                             ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600")),
+                                             path=os.getenv("LLM_CACHE_PATH") or None)
+                    client = CachedLLMClient(client, cache)
+                _shared_client = client
+    return _shared_client
+
+def llm_metrics() -> Dict[str, Any]:
+    """Gateway and response-cache counters of the shared client"""
+    client = get_llm_client()
+    cache = getattr(client, "cache", None)
+    return {
+        "gateway": _shared_gateway.stats(),
+        "cache": cache.stats() if cache is not None else None
+    }
@@ -0,0 +1,257 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from types import SimpleNamespace
+from typing import Any, Dict
+
+class LLMUnavailable(Exception):
+    """Raised instead of calling the provider (circuit open, rate limited or no free slot); callers fall back"""
+
+class TokenBucket:
+    """Allows rate_per_second calls on average, with bursts of up to burst calls"""
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        """Take one token, waiting at most timeout seconds for it"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def available(self) -> float:
+        with self._lock:
+            return min(self.capacity, self._tokens + (time.monotonic() - self._updated) * self.rate)
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive provider failures.
+
+    While open, calls are refused without contacting the provider. After
+    reset_timeout seconds a single trial call is let through (half-open);
+    its outcome closes the breaker again or re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def cancel_trial(self):
+        """The allowed call never reached the provider; let another caller make the trial"""
+        with self._lock:
+            self._trial_in_flight = False
+
+class LLMGateway:
+    """Admission control in front of an LLM backend, shared by every caller in the process.
+
+    Calls go through client.chat.completions.create(...) like the backend's,
+    and are subject to:
+    - a circuit breaker that refuses calls while the provider is failing;
+    - a token bucket (rate_per_second, 0 = unlimited);
+    - a semaphore of max_concurrency in-flight calls. Callers queue for a
+      slot for at most queue_timeout seconds;
+    - a wall-clock deadline per call, counted from the moment it is made.
+      The backend's own timeout is per phase (connect, each read), so a
+      slowly trickling reply could otherwise run far past it. A call
+      still running at the deadline raises TimeoutError. A streamed reply
+      is closed at the first chunk after its deadline.
+    Refused calls raise LLMUnavailable at once, so callers reach their
+    fallback without waiting on an unhealthy provider.
+    """
+
+    def __init__(self, backend, max_concurrency: int = 8, queue_timeout: float = 2.0, deadline: float = 20.0,
+                 rate_per_second: float = 0, burst: int = 10, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0):
+        self.backend = backend
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.deadline = deadline
+        self.bucket = TokenBucket(rate_per_second, burst) if rate_per_second > 0 else None
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        # Runs non-streamed calls so the caller can stop waiting at the deadline; each holds a slot,
+        # so the pool never queues
+        self._calls = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm-call")
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "completed": 0, "failures": 0, "timeouts": 0,
+                          "circuit_open": 0, "rate_limited": 0, "queue_timeout": 0}
+        self._in_flight = 0
+        self._waiting = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _count(self, name: str, delta: int = 1):
+        with self._lock:
+            self._counters[name] += delta
+
+    def _create(self, stream: bool = False, **kwargs):
+        expires = time.monotonic() + self.deadline
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("circuit_open")
+            raise LLMUnavailable("LLM provider unavailable (circuit open)")
+
+        admitted_by = time.monotonic() + self.queue_timeout
+        if self.bucket is not None and not self.bucket.acquire(self.queue_timeout):
+            self.breaker.cancel_trial()
+            self._count("rate_limited")
+            raise LLMUnavailable("LLM rate limit reached")
+        with self._lock:
+            self._waiting += 1
+        acquired = self._slots.acquire(timeout=max(0.0, admitted_by - time.monotonic()))
+        with self._lock:
+            self._waiting -= 1
+            if acquired:
+                self._in_flight += 1
+        if not acquired:
+            self.breaker.cancel_trial()
+            self._count("queue_timeout")
+            raise LLMUnavailable("LLM busy: no free slot")
+
+        # Bounds each phase of the request as well; expires bounds the whole of it
+        kwargs.setdefault("timeout", max(0.0, expires - time.monotonic()))
+        if stream:
+            try:
+                response = self.backend.chat.completions.create(stream=True, **kwargs)
+            except Exception as e:
+                self._finish(e)
+                raise
+            return _GatedStream(response, expires, self._finish)
+
+        call = self._calls.submit(self.backend.chat.completions.create, stream=False, **kwargs)
+        try:
+            response = call.result(timeout=max(0.0, expires - time.monotonic()))
+        except FutureTimeout:
+            # The caller falls back now; the slot stays taken until the provider call returns
+            error = TimeoutError(f"LLM call exceeded its {self.deadline}s deadline")
+            self._record(error)
+            call.add_done_callback(lambda _: self._release())
+            raise error
+        except Exception as e:
+            self._finish(e)
+            raise
+        self._finish(None)
+        return response
+
+    def _finish(self, error):
+        """Release the call's slot and feed its outcome to the breaker"""
+        self._release()
+        self._record(error)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _record(self, error):
+        if error is None:
+            self._count("completed")
+            self.breaker.record_success()
+            return
+        self._count("failures")
+        if isinstance(error, TimeoutError) or "Timeout" in type(error).__name__:
+            self._count("timeouts")
+        # Requests the provider rejected as invalid say nothing about its health
+        status = getattr(error, "status_code", None)
+        if status is None or status == 429 or status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.cancel_trial()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight, waiting = self._in_flight, self._waiting
+        rejected = counters["circuit_open"] + counters["rate_limited"] + counters["queue_timeout"]
+        return {
+            "circuit": self.breaker.state,
+            "in_flight": in_flight,
+            "queue_depth": waiting,
+            "max_concurrency": self.max_concurrency,
+            "rate_tokens_available": round(self.bucket.available(), 2) if self.bucket else None,
+            **counters,
+            "rejected": rejected,
+            # Share of calls that ended in the callers' fallback (failed or refused)
+            "fallback_rate": round((counters["failures"] + rejected) / counters["calls"], 4) if counters["calls"] else 0.0
+        }
+
+class _GatedStream:
+    """Holds the gateway slot while a streamed reply is read; reports the outcome once.
+
+    Past expires (a time.monotonic() value) the stream is closed and
+    iteration raises TimeoutError.
+    """
+
+    def __init__(self, stream, expires: float, on_finish):
+        self.stream = stream
+        self.expires = expires
+        self.on_finish = on_finish
+        self._done = False
+
+    def _finish(self, error):
+        if not self._done:
+            self._done = True
+            self.on_finish(error)
+
+    def __iter__(self):
+        try:
+            for chunk in self.stream:
+                if time.monotonic() > self.expires:
+                    self.stream.close()
+                    raise TimeoutError("LLM reply exceeded its deadline")
+                yield chunk
+        except Exception as e:
+            self._finish(e)
+            raise
+        self._finish(None)
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            # Closed early by the caller (e.g. client disconnected): the provider itself was fine
+            self._finish(None)
@@ -0,0 +1,81 @@
+import json
+import re
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from utils.llm_cache import chunk_from_text, completion_from_text, split_tokens
+
+class LocalLLM:
+    """Offline stand-in for the Groq client that returns canned replies.
+
+    Selected with LLM_BACKEND=local. It waits latency_seconds before the
+    first token and then emits tokens_per_second (0 means all at once), so
+    caching, streaming and throughput can be exercised without network
+    access or an API key. A reply that would take longer than the call's
+    timeout raises TimeoutError once the timeout has passed, as the real
+    client does.
+    """
+
+    def __init__(self, latency_seconds: float = 0.5, tokens_per_second: float = 50):
+        self.latency_seconds = latency_seconds
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict[str, str]], stream: bool = False,
+                timeout: Optional[float] = None, **kwargs):
+        self.calls += 1
+        text = self._reply(messages)
+        pieces = split_tokens(text)
+        duration = self.latency_seconds
+        if not stream and self.tokens_per_second:
+            duration += len(pieces) / self.tokens_per_second
+        if timeout is not None and duration > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Local LLM reply not ready within {timeout}s")
+        if stream:
+            return _LocalStream(text, self.latency_seconds, self.tokens_per_second)
+        time.sleep(duration)
+        return completion_from_text(model, text)
+
+    def _reply(self, messages: List[Dict[str, str]]) -> str:
+        prompt = messages[-1]["content"]
+        if '"transcript"' in prompt:
+            # Engagement call: the same JSON shape the real model is asked for
+            name = _field(prompt, "Name") or "there"
+            vehicle = _field(prompt, "Vehicle") or "vehicle"
+            return json.dumps({
+                "transcript": f"Agent Maya: Hello {name}, this is Maya from AutoCare. Our monitoring shows your "
+                              f"{vehicle} needs attention soon.\n\nCustomer: I'm busy this week.\n\n"
+                              f"Agent Maya: We can pick the car up and return it the same day.\n\n"
+                              f"Customer: Okay, book it.\n\nAgent Maya: Done, you'll get a confirmation shortly.",
+                "appointment_booked": True,
+                "booking_details": "Next available slot at your preferred center",
+                "objections_handled": ["I'm busy"],
+                "persuasion_techniques_used": ["urgency", "convenience"]
+            })
+        return (f"(Local model) You asked: \"{prompt.strip()[:200]}\". Based on the vehicle data I have, "
+                f"I recommend checking the predicted issues and booking a service if the risk is high.")
+
+class _LocalStream:
+    def __init__(self, text: str, latency_seconds: float, tokens_per_second: float):
+        self.text = text
+        self.latency_seconds = latency_seconds
+        self.tokens_per_second = tokens_per_second
+        self.closed = False
+
+    def __iter__(self):
+        time.sleep(self.latency_seconds)
+        for piece in split_tokens(self.text):
+            if self.closed:
+                return
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield chunk_from_text(piece)
+
+    def close(self):
+        self.closed = True
+
+def _field(prompt: str, label: str) -> str:
+    match = re.search(rf"^- {label}: (.+)$", prompt, re.MULTILINE)
+    return match.group(1).strip() if match else ""
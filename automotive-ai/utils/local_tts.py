@@ -0,0 +1,32 @@
+import asyncio
+from typing import Optional
+
+# One MPEG-1 Layer III frame (32 kbps, 44.1 kHz, mono) of silence: header, then all-zero side info and data
+SILENT_FRAME = bytes([0xFF, 0xFB, 0x10, 0xC0]) + bytes(100)
+FRAME_SECONDS = 1152 / 44100
+
+class LocalSynthesizer:
+    """Offline stand-in for the Edge TTS synthesizer.
+
+    Selected with VOICE_BACKEND=local. It waits latency_seconds per call and
+    returns a valid MP3 of silence lasting about as long as the text would
+    take to speak at chars_per_second, so the voice pipeline can be exercised
+    without network access.
+    """
+
+    def __init__(self, voice: str = "local", latency_seconds: float = 0.3, chars_per_second: float = 15):
+        self.voice = voice
+        self.latency_seconds = latency_seconds
+        self.chars_per_second = chars_per_second
+        self.calls = 0
+
+    async def synthesize(self, text: str, voice: Optional[str] = None) -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self.latency_seconds)
+        frames = max(1, round(len(text) / self.chars_per_second / FRAME_SECONDS))
+        return SILENT_FRAME * frames
+
+    async def synthesize_text(self, text: str, output_file: str) -> bool:
+        with open(output_file, "wb") as f:
+            f.write(await self.synthesize(text))
+        return True
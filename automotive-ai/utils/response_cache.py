@@ -0,0 +1,53 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Callable, Hashable
+from fastapi.encoders import jsonable_encoder
+from utils.result_cache import LRUCache
+
+class CachedResponse:
+    """A serialized JSON body, its gzip encoding and a strong ETag"""
+
+    __slots__ = ("body", "gzipped", "etag")
+
+    def __init__(self, payload: Any, min_gzip_bytes: int = 1024):
+        self.body = json.dumps(jsonable_encoder(payload), separators=(',', ':')).encode('utf-8')
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        # Tiny bodies are not worth the gzip framing overhead
+        self.gzipped = gzip.compress(self.body, compresslevel=6) if len(self.body) >= min_gzip_bytes else None
+
+    def matches(self, if_none_match: str) -> bool:
+        """True if an If-None-Match header value covers this response (weak comparison, per RFC 9110)"""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*' or tag.removeprefix('W/') == self.etag:
+                return True
+        return False
+
+class ResponseCache:
+    """Serialized, precompressed responses keyed by (key, data version).
+
+    build() only runs when the data version behind a key changes, so repeat
+    polls cost a dictionary lookup and, with a matching ETag, an empty 304.
+    """
+
+    def __init__(self, max_entries: int = 256, min_gzip_bytes: int = 1024):
+        self.min_gzip_bytes = min_gzip_bytes
+        # Entries are invalidated by version, so the TTL is only a backstop
+        self._entries = LRUCache(max_entries=max_entries, ttl_seconds=24 * 3600)
+
+    def get_or_build(self, key: Hashable, version: Any, build: Callable[[], Any]) -> CachedResponse:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        response = CachedResponse(build(), self.min_gzip_bytes)
+        self._entries.set(key, (version, response))
+        return response
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return self._entries.stats()
@@ -0,0 +1,37 @@
+import time
+from collections import deque
+from typing import Optional
+
+class SlidingWindowCounter:
+    """Event count over the last window_seconds, kept in fixed-width time buckets.
+
+    add() and count() are amortized O(1): a running total is maintained and
+    whole buckets are dropped as they fall out of the window.
+    """
+
+    def __init__(self, window_seconds: float = 60, bucket_seconds: float = 1):
+        self.window = window_seconds
+        self.bucket_width = bucket_seconds
+        self._buckets = deque()  # (bucket_start, count), oldest first
+        self._total = 0
+
+    def add(self, n: int = 1, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        bucket_start = now - (now % self.bucket_width)
+        self._expire(now)
+        # An out-of-order (older) event is folded into the newest bucket
+        if self._buckets and bucket_start <= self._buckets[-1][0]:
+            start, count = self._buckets[-1]
+            self._buckets[-1] = (start, count + n)
+        else:
+            self._buckets.append((bucket_start, n))
+        self._total += n
+
+    def count(self, now: Optional[float] = None) -> int:
+        self._expire(time.time() if now is None else now)
+        return self._total
+
+    def _expire(self, now: float):
+        cutoff = now - self.window
+        while self._buckets and self._buckets[0][0] + self.bucket_width <= cutoff:
+            self._total -= self._buckets.popleft()[1]
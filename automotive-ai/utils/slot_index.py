@@ -0,0 +1,188 @@
+import bisect
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from storage.base import StorageBackend, parse_slot_epoch
+
+# A changed service-center version (bookings by other workers, re-imports) is re-read at most this often
+SLOT_INDEX_REFRESH_SECONDS = float(os.getenv("SLOT_INDEX_REFRESH_SECONDS", "5"))
+
+class SlotCalendar:
+    """One center's free slots, parsed once and kept sorted by time.
+
+    epochs[i] is the epoch-seconds time of slots[i], so a time window is
+    two bisects. free_per_day counts the free slots of each day
+    ("YYYY-MM-DD") for capacity queries.
+    """
+
+    def __init__(self, slots: List[str], epoch_of):
+        pairs = sorted((epoch_of(slot), slot) for slot in slots)
+        self.epochs = [epoch for epoch, _ in pairs]
+        self.slots = [slot for _, slot in pairs]
+        self.free_per_day = Counter(slot[:10] for slot in self.slots)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def find(self, start: float, end: float = float("inf"), limit: int = 1) -> List[str]:
+        """Up to limit free slots with start < time < end, earliest first"""
+        i = bisect.bisect_right(self.epochs, start)
+        j = bisect.bisect_left(self.epochs, end, i)
+        return self.slots[i:min(j, i + max(limit, 0))]
+
+    def days_with_capacity(self, start: float, end: float) -> Dict[str, int]:
+        """{day: free slots} for the days between start and end that still have a free slot"""
+        first = datetime.fromtimestamp(start).strftime("%Y-%m-%d")
+        last = datetime.fromtimestamp(end).strftime("%Y-%m-%d")
+        return {day: free for day, free in sorted(self.free_per_day.items()) if first <= day <= last and free}
+
+    def add(self, slot: str, epoch: float) -> bool:
+        """Put a slot (back) into the free list; False if it was already there"""
+        i = bisect.bisect_left(self.epochs, epoch)
+        if slot in self.slots[i:bisect.bisect_right(self.epochs, epoch, i)]:
+            return False
+        self.epochs.insert(i, epoch)
+        self.slots.insert(i, slot)
+        self.free_per_day[slot[:10]] += 1
+        return True
+
+    def remove(self, slot: str, epoch: float) -> bool:
+        """Take a slot out of the free list; False if it was not free"""
+        i = bisect.bisect_left(self.epochs, epoch)
+        while i < len(self.epochs) and self.epochs[i] == epoch:
+            if self.slots[i] == slot:
+                del self.epochs[i]
+                del self.slots[i]
+                self.free_per_day[slot[:10]] -= 1
+                return True
+            i += 1
+        return False
+
+class SlotIndex:
+    """Sorted, per-center slot calendars over a store, for bisect availability lookups.
+
+    Calendars are built from store.get_service_centers(). claim() takes the
+    first free slot of a window out of the calendar, so concurrent requests
+    in this process never race for the same slot. The caller then reserves
+    it in the store and reports back with booked() or release(). A
+    service-center version change from elsewhere triggers a rebuild, at
+    most every refresh_seconds. In between, a slot someone else has booked
+    can still be claimed, and reserve_slot() then rejects it. Slot strings
+    are parsed once per process, so a rebuild only re-sorts. Booked slots
+    are kept per center too, for the capacity a center has left per day.
+    """
+
+    def __init__(self, store: StorageBackend, refresh_seconds: float = SLOT_INDEX_REFRESH_SECONDS):
+        self.store = store
+        self.refresh_seconds = refresh_seconds
+        self._calendars: Dict[str, SlotCalendar] = {}
+        self._centers: Dict[str, Dict[str, Any]] = {}
+        self._booked: Dict[str, set] = {}
+        self._version: Any = None
+        self._built_at: Optional[float] = None
+        self._epochs: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def _epoch(self, slot: str) -> float:
+        epoch = self._epochs.get(slot)
+        if epoch is None:
+            epoch = self._epochs[slot] = parse_slot_epoch(slot)
+        return epoch
+
+    def _ensure_fresh(self):
+        version = self.store.data_version("service_centers")
+        if self._built_at is not None and (version == self._version or
+                                           time.monotonic() - self._built_at < self.refresh_seconds):
+            return
+        with self._lock:
+            centers = self.store.get_service_centers()
+            self._calendars = {cid: SlotCalendar(center.get("available_slots", []), self._epoch)
+                               for cid, center in centers.items()}
+            self._centers = {cid: {k: v for k, v in center.items() if k != "available_slots"}
+                             for cid, center in centers.items()}
+            self._booked = {}
+            for cid, slot in self.store.booked_slots():
+                self._booked.setdefault(cid, set()).add(slot)
+            self._version = version
+            self._built_at = time.monotonic()
+
+    def refresh(self):
+        """Rebuild from the store now, e.g. after reserve_slot() found slots the index still lists"""
+        with self._lock:
+            self._built_at = None
+            self._ensure_fresh()
+
+    def centers(self) -> Dict[str, Dict[str, Any]]:
+        """{center_id: center info without its slot list}"""
+        with self._lock:
+            self._ensure_fresh()
+            return self._centers
+
+    def calendar(self, center_id: str) -> Optional[SlotCalendar]:
+        with self._lock:
+            self._ensure_fresh()
+            return self._calendars.get(center_id)
+
+    def find(self, center_id: str, start: float, end: float = float("inf"), limit: int = 1) -> List[str]:
+        with self._lock:
+            calendar = self.calendar(center_id)
+            return calendar.find(start, end, limit) if calendar else []
+
+    def upcoming(self, limit: int, now: float = None) -> Dict[str, List[str]]:
+        """{center_id: its next limit free slots} for every center"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._ensure_fresh()
+            return {cid: calendar.find(now, limit=limit) for cid, calendar in self._calendars.items()}
+
+    def free_slots(self, start: float) -> Dict[str, Tuple[List[float], List[str]]]:
+        """{center_id: (epochs, slots)}: copies of every center's free slots after start, for planning"""
+        with self._lock:
+            self._ensure_fresh()
+            free = {}
+            for cid, calendar in self._calendars.items():
+                i = bisect.bisect_right(calendar.epochs, start)
+                free[cid] = (calendar.epochs[i:], calendar.slots[i:])
+            return free
+
+    def booked_per_day(self) -> Dict[str, Counter]:
+        """{center_id: Counter({day: slots booked})} for every center with a booking"""
+        with self._lock:
+            self._ensure_fresh()
+            return {cid: Counter(slot[:10] for slot in slots) for cid, slots in self._booked.items()}
+
+    def claim(self, center_id: str, start: float, end: float = float("inf")) -> Optional[str]:
+        """Take the first free slot with start < time < end out of the calendar; None if there is none"""
+        with self._lock:
+            calendar = self.calendar(center_id)
+            found = calendar.find(start, end, 1) if calendar else []
+            if not found:
+                return None
+            calendar.remove(found[0], self._epoch(found[0]))
+            return found[0]
+
+    def take(self, center_id: str, slot: str) -> bool:
+        """Claim a given slot, as claim() does the first free one; False if it is no longer free"""
+        with self._lock:
+            calendar = self.calendar(center_id)
+            return calendar is not None and calendar.remove(slot, self._epoch(slot))
+
+    def booked(self, center_id: str, slot: str):
+        """A claimed slot was reserved in the store"""
+        with self._lock:
+            calendar = self._calendars.get(center_id)
+            if calendar is not None:
+                calendar.remove(slot, self._epoch(slot))  # in case a rebuild brought it back
+            self._booked.setdefault(center_id, set()).add(slot)
+            # Our own booking changed the store's version; that change is already applied here
+            self._version = self.store.data_version("service_centers")
+
+    def release(self, center_id: str, slot: str):
+        """A claimed slot was not reserved after all and is still free"""
+        with self._lock:
+            calendar = self._calendars.get(center_id)
+            if calendar is not None:
+                calendar.add(slot, self._epoch(slot))
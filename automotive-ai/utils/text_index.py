@@ -0,0 +1,210 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it me my of on or should "
+    "that the this to was what when which why will with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """Incremental BM25 index over short text documents.
+
+    Sealed postings use a term-major CSR layout in NumPy arrays: term_ptr
+    gives each term a slice of post_docs and post_tfs. Within a slice the
+    postings are ordered by BM25 impact, so a query scores at most
+    max_postings_per_term postings per term, and its cost does not grow
+    with the corpus. New documents go to a small pending segment. That
+    segment is merged in once it reaches merge_ratio of the sealed size, so
+    adding a document is amortized O(its length). Removed documents are
+    masked out right away. A merge drops them from the postings and
+    renumbers the remaining documents, so their keys and payloads are freed
+    too. Removals alone force a merge once they reach merge_ratio of the
+    indexed documents.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_postings_per_term: int = 20000,
+                 merge_ratio: float = 0.25, min_merge: int = 4096):
+        self.k1 = k1
+        self.b = b
+        self.max_postings_per_term = max_postings_per_term
+        self.merge_ratio = merge_ratio
+        self.min_merge = min_merge
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._vocab: Dict[str, int] = {}
+            self._df: List[int] = []                 # documents per term (may count removed ones until a merge)
+            self._keys: List[Hashable] = []          # doc number -> key
+            self._payloads: List[Any] = []           # doc number -> payload returned by search()
+            self._positions: Dict[Hashable, int] = {}
+            self._doc_len = np.zeros(1024, dtype=np.int32)
+            self._alive = np.zeros(1024, dtype=bool)
+            self._total_len = 0                      # token count of live documents
+            self._term_ptr = np.zeros(1, dtype=np.int64)
+            self._post_docs = np.zeros(0, dtype=np.int32)
+            self._post_tfs = np.zeros(0, dtype=np.int32)
+            self._pending: Dict[int, Tuple[List[int], List[int]]] = {}  # term -> (docs, tfs)
+            self._pending_postings = 0
+            self._removed_since_merge = 0
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def add(self, key: Hashable, text: str, payload: Any = None):
+        self.add_many([(key, text, payload)])
+
+    def add_many(self, documents: Iterable[Tuple[Hashable, str, Any]]):
+        """Index (key, text, payload) documents; a key that is already indexed is replaced"""
+        with self._lock:
+            for key, text, payload in documents:
+                if key in self._positions:
+                    self._remove(key)
+                doc = len(self._keys)
+                if doc >= len(self._alive):
+                    self._doc_len = np.concatenate([self._doc_len, np.zeros_like(self._doc_len)])
+                    self._alive = np.concatenate([self._alive, np.zeros_like(self._alive)])
+                tokens = tokenize(text)
+                self._keys.append(key)
+                self._payloads.append(payload)
+                self._positions[key] = doc
+                self._doc_len[doc] = len(tokens)
+                self._alive[doc] = True
+                self._total_len += len(tokens)
+                for term, tf in Counter(tokens).items():
+                    term_id = self._vocab.get(term)
+                    if term_id is None:
+                        term_id = self._vocab[term] = len(self._df)
+                        self._df.append(0)
+                    self._df[term_id] += 1
+                    docs, tfs = self._pending.setdefault(term_id, ([], []))
+                    docs.append(doc)
+                    tfs.append(tf)
+                    self._pending_postings += 1
+            if (self._pending_postings >= max(self.min_merge, self.merge_ratio * len(self._post_docs))
+                    or self._too_many_removed()):
+                self.merge()
+
+    def remove(self, key: Hashable):
+        with self._lock:
+            self._remove(key)
+            if self._too_many_removed():
+                self.merge()
+
+    def _too_many_removed(self) -> bool:
+        return self._removed_since_merge > self.merge_ratio * len(self._keys)
+
+    def _remove(self, key: Hashable):
+        doc = self._positions.pop(key, None)
+        if doc is None:
+            return
+        self._alive[doc] = False
+        self._total_len -= int(self._doc_len[doc])
+        self._payloads[doc] = None
+        self._removed_since_merge += 1
+
+    def merge(self):
+        """Fold the pending segment into the sealed CSR arrays, dropping and renumbering removed documents"""
+        with self._lock:
+            if not self._pending and not self._removed_since_merge:
+                return
+            terms = [np.repeat(np.arange(len(self._term_ptr) - 1), np.diff(self._term_ptr))]
+            docs, tfs = [self._post_docs], [self._post_tfs]
+            for term_id, (term_docs, term_tfs) in self._pending.items():
+                terms.append(np.full(len(term_docs), term_id, dtype=np.int64))
+                docs.append(np.array(term_docs, dtype=np.int32))
+                tfs.append(np.array(term_tfs, dtype=np.int32))
+            terms, docs, tfs = np.concatenate(terms), np.concatenate(docs), np.concatenate(tfs)
+
+            keep = self._alive[docs]
+            terms, docs, tfs = terms[keep], docs[keep], tfs[keep]
+            docs = self._compact()[docs]
+            # Within each term, highest-impact postings first (impact ignores idf, which is per term)
+            order = np.lexsort((-self._impact(tfs, docs), terms))
+            counts = np.bincount(terms, minlength=len(self._df))
+
+            self._term_ptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            self._post_docs = docs[order]
+            self._post_tfs = tfs[order]
+            self._df = counts.tolist()
+            self._pending = {}
+            self._pending_postings = 0
+            self._removed_since_merge = 0
+
+    def _compact(self) -> np.ndarray:
+        """Renumber live documents 0..n-1 in order; returns old -> new doc numbers (-1 for removed ones)"""
+        live = np.flatnonzero(self._alive[:len(self._keys)])
+        renumber = np.full(len(self._keys), -1, dtype=np.int32)
+        renumber[live] = np.arange(len(live), dtype=np.int32)
+        self._keys = [self._keys[doc] for doc in live.tolist()]
+        self._payloads = [self._payloads[doc] for doc in live.tolist()]
+        self._positions = {key: doc for doc, key in enumerate(self._keys)}
+        doc_len = np.zeros_like(self._doc_len)
+        doc_len[:len(live)] = self._doc_len[live]
+        self._doc_len = doc_len
+        self._alive = np.zeros_like(self._alive)
+        self._alive[:len(live)] = True
+        return renumber
+
+    def _impact(self, tfs: np.ndarray, docs: np.ndarray) -> np.ndarray:
+        avgdl = self._total_len / len(self._positions) if self._positions else 1.0
+        norm = self.k1 * (1 - self.b + self.b * self._doc_len[docs] / max(avgdl, 1e-9))
+        return tfs * (self.k1 + 1) / (tfs + norm)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Hashable, float, Any]]:
+        """Top k (key, score, payload) for query, best first"""
+        with self._lock:
+            n_docs = len(self._positions)
+            term_ids = {self._vocab[t] for t in tokenize(query) if t in self._vocab}
+            if not n_docs or not term_ids or k <= 0:
+                return []
+            doc_parts, score_parts = [], []
+            for term_id in term_ids:
+                docs, tfs = self._postings(term_id)
+                if not len(docs):
+                    continue
+                df = self._df[term_id]
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                doc_parts.append(docs)
+                score_parts.append(idf * self._impact(tfs, docs))
+            if not doc_parts:
+                return []
+            docs, scores = np.concatenate(doc_parts), np.concatenate(score_parts)
+            live = self._alive[docs]
+            docs, scores = docs[live], scores[live]
+            if not len(docs):
+                return []
+            # Sum per document over the query terms
+            unique_docs, inverse = np.unique(docs, return_inverse=True)
+            totals = np.bincount(inverse, weights=scores)
+            top = np.argpartition(-totals, min(k, len(totals)) - 1)[:k]
+            # Ties go to the earlier document, so equal questions get equal snippets
+            top = top[np.lexsort((unique_docs[top], -totals[top]))]
+            return [(self._keys[d], float(totals[i]), self._payloads[d])
+                    for i, d in zip(top, unique_docs[top].tolist())]
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        docs, tfs = self._post_docs[:0], self._post_tfs[:0]
+        if term_id < len(self._term_ptr) - 1:
+            start, end = self._term_ptr[term_id], self._term_ptr[term_id + 1]
+            end = min(end, start + self.max_postings_per_term)
+            docs, tfs = self._post_docs[start:end], self._post_tfs[start:end]
+        pending = self._pending.get(term_id)
+        if pending:
+            docs = np.concatenate([docs, np.array(pending[0], dtype=np.int32)])
+            tfs = np.concatenate([tfs, np.array(pending[1], dtype=np.int32)])
+        return docs, tfs
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"documents": len(self._positions), "terms": len(self._vocab),
+                    "sealed_postings": int(len(self._post_docs)), "pending_postings": self._pending_postings}
@@ -1,11 +1,27 @@
-import json
 import os
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+from storage.base import counts_toward_rate_limit
+from utils.sliding_window import SlidingWindowCounter
+
+# (agent, action) pairs authorized for the fleet run the current thread is working on (see FleetScope)
+_fleet_scope: ContextVar[Optional[frozenset]] = ContextVar("ueba_fleet_scope", default=None)
 
 class UEBAMonitor:
-    def __init__(self):
-        self.logs = []
+    def __init__(self, store):
+        self.store = store
+        # Frequency rule: more than rate_limit actions by one agent within rate_window seconds.
+        # Denied attempts and the per-vehicle actions of an authorized fleet run are not counted.
+        self.rate_window = float(os.getenv("UEBA_RATE_WINDOW_SECONDS", "60"))
+        self.rate_limit = int(os.getenv("UEBA_RATE_LIMIT", "50"))
+        self._lock = threading.Lock()
+        self._action_counters: Dict[str, Dict[str, SlidingWindowCounter]] = defaultdict(dict)
+        self._total_actions = 0
+        self._failed_actions = 0
         self.permissions = {
             "DataAnalysis": ["read_vehicle_data", "analyze_sensors", "detect_anomalies"],
             "Diagnosis": ["read_vehicle_data", "predict_failures", "calculate_risk"],
@@ -14,17 +30,57 @@ class UEBAMonitor:
             "Feedback": ["read_service_history", "collect_feedback", "send_surveys"],
             "ManufacturingInsights": ["read_maintenance_history", "analyze_patterns", "generate_reports"]
         }
-        self.load_logs()
-
-    def load_logs(self):
-        if os.path.exists('data/security_logs.json'):
-            with open('data/security_logs.json', 'r') as f:
-                self.logs = json.load(f)
-
-    def save_logs(self):
-        os.makedirs('data', exist_ok=True)
-        with open('data/security_logs.json', 'w') as f:
-            json.dump(self.logs, f, indent=2)
+        # Counters are seeded from the log on first use, not at construction
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self.load_counters()
+
+    def load_counters(self):
+        """Initialise totals and sliding windows from the store without reading the whole log"""
+        stats = self.store.log_stats()
+        since = datetime.fromtimestamp(time.time() - self.rate_window).isoformat()
+        recent = self.store.query_logs(since=since, limit=None)["logs"]
+        with self._lock:
+            self._action_counters.clear()
+            self._total_actions = stats["total"]
+            self._failed_actions = stats["failures"]
+            # Seed the sliding windows with the entries that are still inside the window
+            for log in reversed(recent):
+                if not counts_toward_rate_limit(log):
+                    continue
+                try:
+                    ts = datetime.fromisoformat(log["timestamp"]).timestamp()
+                except (KeyError, ValueError):
+                    continue
+                self._counter(log["agent"], log["action"]).add(now=ts)
+            self._loaded = True
+
+    def _counter(self, agent: str, action: str) -> SlidingWindowCounter:
+        # Caller holds self._lock
+        counter = self._action_counters[agent].get(action)
+        if counter is None:
+            counter = SlidingWindowCounter(self.rate_window)
+            self._action_counters[agent][action] = counter
+        return counter
+
+    def recent_action_count(self, agent: str, action: str = None) -> int:
+        """Actions by agent (optionally of one type) within the last rate_window seconds"""
+        if self.store.shared:
+            # Other worker processes log too, so count from the shared log rather than local windows
+            since = datetime.fromtimestamp(time.time() - self.rate_window).isoformat()
+            return self.store.count_recent_logs(agent, since, action)
+        self._ensure_loaded()
+        with self._lock:
+            counters = self._action_counters.get(agent, {})
+            if action is not None:
+                counter = counters.get(action)
+                return counter.count() if counter else 0
+            return sum(counter.count() for counter in counters.values())
 
     def log_action(self, agent: str, action: str, data: Dict[str, Any] = None, success: bool = True):
         log_entry = {
@@ -34,8 +90,14 @@ class UEBAMonitor:
             "data": data or {},
             "success": success
         }
-        self.logs.append(log_entry)
-        self.save_logs()
+        self._ensure_loaded()
+        with self._lock:
+            if counts_toward_rate_limit(log_entry):
+                self._counter(agent, action).add()
+            self._total_actions += 1
+            if not success:
+                self._failed_actions += 1
+        self.store.append_log(log_entry)
         print(f"Logged action: {agent} - {action}")
 
     def check_permission(self, agent: str, action: str) -> bool:
@@ -52,8 +114,13 @@ class UEBAMonitor:
             self.log_action(agent, action, data, success=False)
             return {"allowed": False, "anomaly": anomaly}
 
+        # Within an authorized fleet run the frequency rule was applied to the run as a whole
+        in_fleet_run = (agent, action) in (_fleet_scope.get() or ())
+        if in_fleet_run:
+            data = {**(data or {}), "fleet_authorized": True}
+
         # Check for anomalies
-        anomaly = self.detect_anomaly(agent, action, data)
+        anomaly = self.detect_anomaly(agent, action, data, check_frequency=not in_fleet_run)
         if anomaly:
             self.log_action(agent, action, data, success=False)
             return {"allowed": False, "anomaly": anomaly}
@@ -61,12 +128,23 @@ class UEBAMonitor:
         self.log_action(agent, action, data, success=True)
         return {"allowed": True, "anomaly": None}
 
-    def detect_anomaly(self, agent: str, action: str, data: Dict[str, Any] = None) -> Dict[str, Any]:
-        # Simple anomaly detection
-        recent_logs = [log for log in self.logs[-100:] if log['agent'] == agent]  # Last 100 actions
-
-        # Check frequency
-        if len(recent_logs) > 50:  # If agent has done many actions recently
+    def authorize_fleet(self, actions: Iterable[Tuple[str, str]], vehicle_count: int) -> "FleetScope":
+        """One check of each (agent, action) for a run over vehicle_count vehicles; PermissionError if denied.
+
+        Run the per-vehicle work through the returned scope: its checks are
+        still made and logged, but do not count toward the frequency rule.
+        """
+        actions = frozenset(actions)
+        for agent, action in sorted(actions):
+            permission_check = self.verify_action(agent, action, {"scope": "fleet", "vehicles": vehicle_count})
+            if not permission_check["allowed"]:
+                raise PermissionError(permission_check["anomaly"]["message"])
+        return FleetScope(actions)
+
+    def detect_anomaly(self, agent: str, action: str, data: Dict[str, Any] = None,
+                       check_frequency: bool = True) -> Dict[str, Any]:
+        # Check frequency: N actions in the last T seconds
+        if check_frequency and self.recent_action_count(agent) > self.rate_limit:
             anomaly = {
                 "type": "high_frequency",
                 "message": f"{agent} showing unusually high activity",
@@ -86,20 +164,44 @@ class UEBAMonitor:
         return None
 
     def get_security_score(self) -> float:
-        total_actions = len(self.logs)
+        if self.store.shared:
+            # Totals kept by the shared store cover every worker process
+            stats = self.store.log_stats()
+            total_actions, failed_actions = stats["total"], stats["failures"]
+        else:
+            self._ensure_loaded()
+            with self._lock:
+                total_actions = self._total_actions
+                failed_actions = self._failed_actions
         if total_actions == 0:
             return 100.0
 
-        failed_actions = len([log for log in self.logs if not log.get('success', True)])
         score = 100 - (failed_actions / total_actions * 100)
         return max(0, score)
 
     def get_logs(self, limit: int = 50) -> List[Dict[str, Any]]:
-        return self.logs[-limit:]
+        # Most recent entries, oldest first
+        return list(reversed(self.store.query_logs(limit=limit)["logs"]))
+
+    def query_logs(self, agent: str = None, action: str = None, success: bool = None, since: str = None,
+                   until: str = None, cursor: str = None, limit: int = 50) -> Dict[str, Any]:
+        """Filtered, cursor-paginated log query (newest first)"""
+        return self.store.query_logs(agent, action, success, since, until, cursor, limit)
 
     def get_anomalies(self) -> List[Dict[str, Any]]:
-        anomalies = []
-        for log in self.logs:
-            if not log.get('success', True):
-                anomalies.append(log)
-        return anomalies[-10:]  # Last 10 anomalies
\ No newline at end of file
+        failures = self.store.query_logs(success=False, limit=10)["logs"]
+        return list(reversed(failures))  # Last 10 anomalies
+
+class FleetScope:
+    """(agent, action) pairs authorized once for a fleet run, by UEBAMonitor.authorize_fleet()"""
+
+    def __init__(self, actions: frozenset):
+        self.actions = actions
+
+    def run(self, fn, *args):
+        """fn(*args) with the scope's actions authorized (call it on the thread doing the work)"""
+        token = _fleet_scope.set(self.actions)
+        try:
+            return fn(*args)
+        finally:
+            _fleet_scope.reset(token)
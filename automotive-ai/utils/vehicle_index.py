@@ -0,0 +1,93 @@
+import numpy as np
+from bisect import bisect_right
+from typing import Dict, List, Any, Optional, Sequence
+
+# Vehicle attributes that can be filtered on through a posting list
+INDEXED_FIELDS = ("location", "model", "preferred_service_center")
+
+class VehicleIndex:
+    """Read-only index over one version of the vehicle data.
+
+    Vehicles are kept sorted by id so a page is a bisect plus a slice, and
+    each indexed field maps value -> sorted array of positions. Filtered
+    queries intersect those arrays (and a health-score mask) with NumPy, so
+    the cost of a page depends on the page size and the number of matches,
+    never on a scan of every record.
+    """
+
+    def __init__(self, version: Any, vehicles: List[Dict[str, Any]], health_scores: Dict[str, int]):
+        self.version = version
+        self.records = sorted(vehicles, key=lambda v: v["id"])
+        self.ids = [v["id"] for v in self.records]
+        self.health = np.array([health_scores.get(vid, 100) for vid in self.ids], dtype=np.int64)
+
+        postings: Dict[str, Dict[Any, List[int]]] = {field: {} for field in INDEXED_FIELDS}
+        for position, vehicle in enumerate(self.records):
+            for field in INDEXED_FIELDS:
+                postings[field].setdefault(vehicle.get(field), []).append(position)
+        self.postings = {
+            field: {value: np.array(positions, dtype=np.int64) for value, positions in values.items()}
+            for field, values in postings.items()
+        }
+
+    def query(self, filters: Dict[str, Any] = None, min_health: int = None, max_health: int = None,
+              cursor: str = None, limit: Optional[int] = None, fields: Sequence[str] = None) -> Dict[str, Any]:
+        """Page of vehicles (ordered by id) after cursor, matching every filter.
+
+        cursor is the last id of the previous page; fields projects each
+        record onto the given top-level keys (id is always included, and
+        "health_score" adds the computed score).
+        """
+        start = bisect_right(self.ids, cursor) if cursor else 0
+
+        matches = None  # None means "every position"
+        for field, value in (filters or {}).items():
+            if value is None:
+                continue
+            positions = self.postings[field].get(value)
+            if positions is None:
+                matches = np.empty(0, dtype=np.int64)
+                break
+            matches = positions if matches is None else np.intersect1d(matches, positions, assume_unique=True)
+
+        if min_health is not None or max_health is not None:
+            candidates = np.arange(len(self.ids)) if matches is None else matches
+            scores = self.health[candidates]
+            keep = np.ones(len(candidates), dtype=bool)
+            if min_health is not None:
+                keep &= scores >= min_health
+            if max_health is not None:
+                keep &= scores <= max_health
+            matches = candidates[keep]
+
+        if matches is None:
+            total = len(self.ids)
+            end = len(self.ids) if limit is None else min(len(self.ids), start + limit)
+            page = range(start, end)
+            has_more = end < len(self.ids)
+        else:
+            total = len(matches)
+            remaining = matches[np.searchsorted(matches, start):]
+            page = remaining if limit is None else remaining[:limit]
+            has_more = len(remaining) > len(page)
+
+        vehicles = [self._project(int(position), fields) for position in page]
+        return {
+            "vehicles": vehicles,
+            "count": len(vehicles),
+            "total": total,
+            "next_cursor": vehicles[-1]["id"] if has_more and vehicles else None
+        }
+
+    def _project(self, position: int, fields: Sequence[str]) -> Dict[str, Any]:
+        vehicle = self.records[position]
+        if not fields:
+            return vehicle
+        projected = {"id": vehicle["id"]}
+        for field in fields:
+            if field in vehicle:
+                projected[field] = vehicle[field]
+            elif field == "health_score":
+                # Computed, not stored: served from the index's score column
+                projected[field] = int(self.health[position])
+        return projected
@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+_UNLOADED = object()
+
+class VehicleRepository:
+    """Process-wide, indexed view of data/vehicles.json.
+
+    The file is parsed once and kept in memory with an id -> record index.
+    Every access compares the file's mtime/size with the last load and
+    re-parses only when the file has actually changed on disk. Each record
+    also carries its own version, bumped only when that record's content
+    changes between loads.
+    """
+
+    def __init__(self, path: str = 'data/vehicles.json'):
+        self.path = path
+        self._lock = threading.RLock()
+        self._vehicles: List[Dict[str, Any]] = []
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._record_versions: Dict[str, int] = {}
+        self._stamp = _UNLOADED
+        self.version = 0
+
+    def get(self, vehicle_id: str) -> Optional[Dict[str, Any]]:
+        """Return the vehicle record for vehicle_id, or None"""
+        self._refresh()
+        return self._index.get(vehicle_id)
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return all vehicle records in file order"""
+        self._refresh()
+        return self._vehicles
+
+    def record_version(self, vehicle_id: str) -> Optional[int]:
+        """Version of a single vehicle record, or None if it does not exist"""
+        self._refresh()
+        return self._record_versions.get(vehicle_id)
+
+    def record_versions(self) -> Dict[str, int]:
+        """{vehicle_id: record version} for every vehicle"""
+        self._refresh()
+        with self._lock:
+            return dict(self._record_versions)
+
+    def snapshot(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return (version, vehicles) read consistently under the lock"""
+        self._refresh()
+        with self._lock:
+            return self.version, self._vehicles
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._vehicles)
+
+    def invalidate(self):
+        """Force a reload on the next access"""
+        with self._lock:
+            self._stamp = _UNLOADED
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self):
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            stamp = self._file_stamp()
+            if stamp == self._stamp:
+                return
+
+            vehicles = []
+            if stamp is not None:
+                with open(self.path, 'r') as f:
+                    vehicles = json.load(f)
+
+            index = {v["id"]: v for v in vehicles}
+            version = self.version + 1
+            record_versions = {}
+            for vehicle_id, record in index.items():
+                previous = self._index.get(vehicle_id)
+                if previous is not None and previous == record:
+                    record_versions[vehicle_id] = self._record_versions[vehicle_id]
+                else:
+                    record_versions[vehicle_id] = version
+
+            self._vehicles = vehicles
+            self._index = index
+            self._record_versions = record_versions
+            self._stamp = stamp
+            self.version = version
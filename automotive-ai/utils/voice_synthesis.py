@@ -1,4 +1,3 @@
-import edge_tts
 import asyncio
 import os
 from typing import Optional
@@ -9,6 +8,7 @@ class VoiceSynthesizer:
 
     async def synthesize_text(self, text: str, output_file: str) -> bool:
         try:
+            import edge_tts  # deferred: it pulls in aiohttp and is only needed when speaking
             communicate = edge_tts.Communicate(text, self.voice)
             await communicate.save(output_file)
             print(f"Voice synthesized and saved to {output_file}")
@@ -17,6 +17,18 @@ class VoiceSynthesizer:
             print(f"Error synthesizing voice: {e}")
             return False
 
+    async def synthesize(self, text: str, voice: Optional[str] = None) -> bytes:
+        """MP3 audio of text spoken by voice (default: this synthesizer's voice); raises on failure"""
+        import edge_tts
+        communicate = edge_tts.Communicate(text, voice or self.voice)
+        audio = bytearray()
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio += chunk["data"]
+        if not audio:
+            raise RuntimeError("No audio received from Edge TTS")
+        return bytes(audio)
+
     def generate_voice(self, text: str, output_file: str = "conversation.mp3") -> bool:
         """Synchronous wrapper for voice synthesis"""
         try:
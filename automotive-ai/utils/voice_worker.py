@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from utils.result_cache import LRUCache
+
+# Synthesized audio files, named by audio_key(), so identical transcripts are spoken once
+VOICE_CACHE_DIR = os.getenv("VOICE_CACHE_DIR", "conversations/audio")
+# Phrases synthesized at the same time on the voice worker
+VOICE_MAX_CONCURRENCY = int(os.getenv("VOICE_MAX_CONCURRENCY", "4"))
+# Voices for the agent's and the customer's lines
+VOICE_AGENT = os.getenv("VOICE_AGENT", "en-IN-NeerjaNeural")
+VOICE_CUSTOMER = os.getenv("VOICE_CUSTOMER", "en-IN-PrabhatNeural")
+# Recently used phrase audio kept in memory (greetings, sign-offs and other recurring lines)
+VOICE_PHRASE_CACHE_SIZE = int(os.getenv("VOICE_PHRASE_CACHE_SIZE", "512"))
+
+TURN_RE = re.compile(r"^([A-Z][\w .'-]{0,40}):\s*(.*)$")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+_shared_worker = None
+_shared_lock = threading.Lock()
+
+def audio_key(transcript: str, voice: str) -> str:
+    """Content address of the audio for transcript spoken by voice"""
+    return hashlib.sha256(f"{voice}\0{transcript}".encode("utf-8")).hexdigest()
+
+def transcript_text(transcript: Any) -> str:
+    """A generated transcript as "Speaker: text" lines; models sometimes return a list of turns or a dict"""
+    if transcript is None:
+        return ""
+    if isinstance(transcript, str):
+        return transcript
+    if isinstance(transcript, (list, tuple)):
+        return "\n".join(transcript_text(item) for item in transcript)
+    if isinstance(transcript, dict):
+        speaker = transcript.get("speaker") or transcript.get("role")
+        text = next((transcript[field] for field in ("text", "message", "content") if field in transcript), None)
+        if speaker and text is not None:
+            return f"{speaker}: {transcript_text(text)}"
+        return "\n".join(transcript_text(value) for value in transcript.values())
+    return str(transcript)
+
+def split_turns(transcript: str) -> List[Tuple[str, str]]:
+    """(speaker, text) dialogue turns of a "Speaker: text" transcript; unlabelled lines continue the last turn"""
+    turns: List[Tuple[str, str]] = []
+    for line in transcript.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = TURN_RE.match(line)
+        if match:
+            turns.append((match.group(1), match.group(2)))
+        elif turns:
+            turns[-1] = (turns[-1][0], f"{turns[-1][1]} {line}")
+        else:
+            turns.append(("", line))
+    return [(speaker, text.strip()) for speaker, text in turns if text.strip()]
+
+def split_phrases(text: str) -> List[str]:
+    """Sentences of a turn: the unit of synthesis, so recurring sentences are cached across conversations"""
+    return [sentence for sentence in SENTENCE_RE.split(text.strip()) if sentence]
+
+def new_synthesizer():
+    """The synthesizer named by VOICE_BACKEND: edge (default) or the offline local stand-in"""
+    backend = os.getenv("VOICE_BACKEND", "edge").lower()
+    if backend == "local":
+        from utils.local_tts import LocalSynthesizer
+        return LocalSynthesizer(latency_seconds=float(os.getenv("LOCAL_TTS_LATENCY_SECONDS", "0.3")))
+    if backend != "edge":
+        raise ValueError(f"Unknown VOICE_BACKEND: {backend}")
+    from utils.voice_synthesis import VoiceSynthesizer
+    return VoiceSynthesizer(VOICE_AGENT)
+
+class VoiceWorker:
+    """Background text-to-speech with content-addressed audio caches.
+
+    submit() returns the transcript's audio key at once. The transcript is
+    split into dialogue turns (agent and customer get their own voice) and
+    the turns into sentences. All sentences are synthesized concurrently on
+    an asyncio loop owned by a daemon thread, at most max_concurrency at a
+    time. stream() yields the audio in order as each sentence is ready, and
+    the complete conversation is written to cache_dir/<key>.mp3.
+
+    Sentence audio is cached too: in memory for recently used phrases and on
+    disk under cache_dir/phrases. Greetings, sign-offs and other recurring
+    lines are therefore synthesized once, and so is a repeated transcript.
+    """
+
+    def __init__(self, synthesizer=None, cache_dir: str = VOICE_CACHE_DIR,
+                 max_concurrency: int = VOICE_MAX_CONCURRENCY, agent_voice: str = VOICE_AGENT,
+                 customer_voice: str = VOICE_CUSTOMER, phrase_cache_size: int = VOICE_PHRASE_CACHE_SIZE):
+        self.synthesizer = synthesizer or new_synthesizer()
+        self.cache_dir = cache_dir
+        self.max_concurrency = max(1, max_concurrency)
+        self.agent_voice = agent_voice
+        self.customer_voice = customer_voice
+        self.phrases = LRUCache(max_entries=phrase_cache_size, ttl_seconds=float("inf"))
+        self._jobs: Dict[str, Future] = {}
+        self._parts: Dict[str, List[Future]] = {}      # conversation key -> phrase futures, in order
+        self._phrase_jobs: Dict[str, Future] = {}      # phrase key -> future of its audio
+        # Reentrant: a future that is already done runs its done-callback (which locks) right away
+        self._lock = threading.RLock()
+        self._loop = None
+        self._slots = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            loop = asyncio.new_event_loop()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            threading.Thread(target=loop.run_forever, name="voice-worker", daemon=True).start()
+            self._loop = loop
+        return self._loop
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _phrase_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, "phrases", f"{key}.mp3")
+
+    def voice_for(self, speaker: str) -> str:
+        return self.customer_voice if speaker.lower().startswith("customer") else self.agent_voice
+
+    def submit(self, transcript: Any) -> str:
+        """Queue synthesis of transcript (unless cached or already queued) and return its audio key"""
+        transcript = transcript_text(transcript)
+        key = audio_key(transcript, f"{self.agent_voice}|{self.customer_voice}")
+        if os.path.exists(self.path_for(key)):
+            return key
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or _failed(job):
+                # New, or a previous attempt failed: (re)try
+                loop = self._ensure_loop()
+                parts = [self._phrase_future(phrase, self.voice_for(speaker))
+                         for speaker, text in split_turns(transcript) for phrase in split_phrases(text)]
+                self._parts[key] = parts
+                job = self._jobs[key] = asyncio.run_coroutine_threadsafe(self._assemble(key, parts), loop)
+                job.add_done_callback(lambda done: self._forget(key, done))
+        return key
+
+    def _phrase_future(self, phrase: str, voice: str) -> Future:
+        # Called with self._lock held; a phrase already being synthesized is shared
+        key = audio_key(phrase, voice)
+        job = self._phrase_jobs.get(key)
+        if job is None or _failed(job):
+            job = self._phrase_jobs[key] = asyncio.run_coroutine_threadsafe(
+                self._synthesize_phrase(key, phrase, voice), self._loop)
+            job.add_done_callback(lambda done: self._forget_phrase(key, done))
+        return job
+
+    async def _synthesize_phrase(self, key: str, phrase: str, voice: str) -> bytes:
+        audio = self.phrases.get(key)
+        if audio is not None:
+            return audio
+        path = self._phrase_path(key)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                audio = f.read()
+        else:
+            async with self._slots:
+                audio = await self.synthesizer.synthesize(phrase, voice)
+            _write_atomic(path, audio)
+        self.phrases.set(key, audio)
+        return audio
+
+    async def _assemble(self, key: str, parts: List[Future]) -> bool:
+        # MP3 frames concatenate, so the conversation file is its phrases back to back
+        audio = b"".join([await asyncio.wrap_future(part) for part in parts])
+        if not audio:
+            return False
+        _write_atomic(self.path_for(key), audio)
+        return True
+
+    def _forget(self, key: str, job: Future):
+        # Once the file exists it is the record of the synthesis; failures stay so status() can report them
+        if not _failed(job):
+            with self._lock:
+                if self._jobs.get(key) is job:
+                    del self._jobs[key]
+                    self._parts.pop(key, None)
+
+    def _forget_phrase(self, key: str, job: Future):
+        with self._lock:
+            if self._phrase_jobs.get(key) is job:
+                del self._phrase_jobs[key]
+
+    def status(self, key: str) -> Dict[str, Any]:
+        """{"key", "status": ready | pending | failed | unknown, "audio_url", "stream_url"}"""
+        if os.path.exists(self.path_for(key)):
+            state = "ready"
+        else:
+            with self._lock:
+                job = self._jobs.get(key)
+            if job is None:
+                state = "unknown"
+            elif not job.done():
+                state = "pending"
+            else:
+                state = "failed" if _failed(job) else "ready"
+        return {"key": key, "status": state, "audio_url": f"/audio/{key}.mp3" if state == "ready" else None,
+                "stream_url": f"/audio/{key}/stream" if state in ("ready", "pending") else None}
+
+    async def wait(self, key: str, timeout: float) -> Dict[str, Any]:
+        """status(key), waiting up to timeout seconds for a pending synthesis to finish"""
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is not None and not job.done() and timeout > 0:
+            try:
+                # Shielded: giving up on the wait must not cancel the synthesis
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout)
+            except Exception:
+                pass
+        return self.status(key)
+
+    def stream(self, key: str) -> Optional[AsyncIterator[bytes]]:
+        """The conversation's audio, phrase by phrase as soon as each is ready; None if the key is unknown"""
+        path = self.path_for(key)
+        with self._lock:
+            parts = self._parts.get(key)
+        if parts is None and not os.path.exists(path):
+            return None
+        return _stream_file(path) if parts is None else _stream_parts(parts)
+
+async def _stream_parts(parts: List[Future]) -> AsyncIterator[bytes]:
+    for part in parts:
+        try:
+            yield await asyncio.shield(asyncio.wrap_future(part))
+        except Exception:
+            return  # a phrase failed: end the audio here rather than skip a line
+
+async def _stream_file(path: str, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _failed(job: Future) -> bool:
+    return job.done() and (job.cancelled() or job.exception() is not None or not job.result())
+
+def get_voice_worker() -> VoiceWorker:
+    """The process-wide voice worker, created on first use"""
+    global _shared_worker
+    if _shared_worker is None:
+        with _shared_lock:
+            if _shared_worker is None:
+                _shared_worker = VoiceWorker()
+    return _shared_worker
@@ -1,6 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { ArrowRight, Mic, Loader2, RotateCcw, Sparkles } from 'lucide-react';
-import { sendMessageToAI, resetConversation } from '../services/aiService';
+import { streamMessageToAI, resetConversation } from '../services/aiService';
 
 // Simple markdown parser for chat messages
 const formatMessage = (text) => {
@@ -116,6 +116,8 @@ const AssistantCard = ({ selectedVehicle = null }) => {
     ]);
     const [inputValue, setInputValue] = useState('');
     const [isLoading, setIsLoading] = useState(false);
+    // Id of the reply currently being streamed in (the "thinking" bubble is hidden meanwhile)
+    const [streamingId, setStreamingId] = useState(null);
     const messagesEndRef = useRef(null);
 
     const scrollToBottom = () => {
@@ -144,9 +146,20 @@ const AssistantCard = ({ selectedVehicle = null }) => {
         setInputValue('');
         setIsLoading(true);
 
+        // The reply is rendered progressively in a placeholder message
+        const replyId = Date.now() + 1;
+        const showReply = (reply) => {
+            setMessages(prev => prev.some(msg => msg.id === replyId)
+                ? prev.map(msg => msg.id === replyId ? { ...reply, id: replyId } : msg)
+                : [...prev, { ...reply, id: replyId }]);
+        };
+
         try {
-            const response = await sendMessageToAI(textToSend, selectedVehicle);
-            setMessages(prev => [...prev, response]);
+            const response = await streamMessageToAI(textToSend, selectedVehicle, (partialText) => {
+                setStreamingId(replyId);
+                showReply({ text: partialText, sender: 'ai' });
+            });
+            showReply(response);
         } catch (error) {
             console.error("Failed to get AI response", error);
             setMessages(prev => [...prev, {
@@ -156,6 +169,7 @@ const AssistantCard = ({ selectedVehicle = null }) => {
                 error: true
             }]);
         } finally {
+            setStreamingId(null);
             setIsLoading(false);
         }
     };
@@ -215,7 +229,7 @@ const AssistantCard = ({ selectedVehicle = null }) => {
                         </div>
                     </div>
                 ))}
-                {isLoading && (
+                {isLoading && !streamingId && (
                     <div className="p-4 rounded-2xl border border-white/5 bg-white/10 backdrop-blur-md rounded-tl-none self-start mr-auto">
                         <div className="flex items-center gap-2">
                             <Loader2 className="w-4 h-4 text-primary animate-spin" />
@@ -52,6 +52,88 @@ export const sendMessageToAI = async (message, vehicleId = null) => {
     }
 };
 
+// Stream a reply from /chat/stream, calling onToken(partialText) as tokens arrive.
+// Resolves to the same message shape as sendMessageToAI once the reply is complete.
+export const streamMessageToAI = async (message, vehicleId = null, onToken = () => {}) => {
+    let text = '';
+    try {
+        const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                message: message,
+                history: conversationHistory,
+                vehicle_id: vehicleId
+            }),
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error('Failed to get AI response');
+        }
+
+        // Newline-delimited JSON: token events, then one done or error event
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let final = null;
+        while (!final) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const event = JSON.parse(line);
+                if (event.type === 'token') {
+                    text += event.text;
+                    onToken(text);
+                } else {
+                    final = event;
+                }
+            }
+        }
+
+        if (!final) {
+            throw new Error('AI response stream ended early');
+        }
+        if (final.type === 'error') {
+            // Same fallback text as /chat; keep whatever part of the reply already arrived
+            return {
+                text: text ? `${text}\n\n${final.response}` : final.response,
+                sender: 'ai',
+                id: Date.now(),
+                error: true
+            };
+        }
+
+        // Update conversation history
+        conversationHistory.push({ role: 'user', content: message });
+        conversationHistory.push({ role: 'assistant', content: final.response });
+
+        // Keep history manageable (last 20 messages)
+        if (conversationHistory.length > 20) {
+            conversationHistory = conversationHistory.slice(-20);
+        }
+
+        return {
+            text: final.response,
+            sender: 'ai',
+            id: Date.now(),
+            contextUsed: final.context_used
+        };
+    } catch (error) {
+        console.error('AI Service Error:', error);
+        if (text) {
+            return { text, sender: 'ai', id: Date.now(), error: true };
+        }
+        // Nothing arrived: fall back to the non-streaming endpoint
+        return sendMessageToAI(message, vehicleId);
+    }
+};
+
 // Reset conversation history
 export const resetConversation = () => {
     conversationHistory = [];
@@ -169,5 +169,18 @@ export const apiService = {
             console.error('Error fetching feedback summary:', error);
             throw error;
         }
+    },
+
+    // Subscribe to fleet health/risk/anomaly changes (server-sent events).
+    // EventSource reconnects on its own and resumes from the last event id.
+    // Returns a function that closes the stream.
+    subscribeFleetEvents: (onDelta, onSnapshot) => {
+        const source = new EventSource(`${API_BASE_URL}/fleet/events${onSnapshot ? '?snapshot=true' : ''}`);
+        source.addEventListener('delta', (event) => onDelta(JSON.parse(event.data)));
+        source.addEventListener('snapshot', (event) => {
+            if (onSnapshot) onSnapshot(JSON.parse(event.data).vehicles);
+        });
+        source.onerror = (error) => console.error('Fleet event stream error:', error);
+        return () => source.close();
     }
 };